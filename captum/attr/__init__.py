@@ -9,6 +9,11 @@ from ._core.gradient_shap import GradientShap  # noqa
 from ._core.guided_backprop_deconvnet import GuidedBackprop, Deconvolution  # noqa
 from ._core.guided_grad_cam import GuidedGradCam  # noqa
 from ._core.feature_ablation import FeatureAblation  # noqa
+from ._core.occlusion import Occlusion  # noqa
+from ._core.hierarchical_feature_ablation import HierarchicalFeatureAblation  # noqa
+from ._core.shapley_value import ShapleyValueSampling  # noqa
+from ._core.lime import Lime  # noqa
+from ._core.kernel_shap import KernelShap  # noqa
 from ._core.layer.layer_conductance import LayerConductance  # noqa
 from ._core.layer.layer_gradient_x_activation import LayerGradientXActivation  # noqa
 from ._core.layer.layer_activation import LayerActivation  # noqa
@@ -37,6 +42,12 @@ from ._utils.attribution import Attribution  # noqa
 from ._utils.attribution import GradientAttribution  # noqa
 from ._utils.attribution import LayerAttribution  # noqa
 from ._utils.attribution import NeuronAttribution  # noqa
+from ._utils.sampling import (  # noqa
+    Sampler,
+    RandomSampler,
+    StratifiedSampler,
+    SobolSampler,
+)
 from ._utils import visualization  # noqa
 
 __all__ = [
@@ -44,6 +55,10 @@ __all__ = [
     "GradientAttribution",
     "NeuronAttribution",
     "LayerAttribution",
+    "Sampler",
+    "RandomSampler",
+    "StratifiedSampler",
+    "SobolSampler",
     "IntegratedGradients",
     "DeepLift",
     "InputXGradient",
@@ -52,6 +67,11 @@ __all__ = [
     "Deconvolution",
     "GuidedGradCam",
     "FeatureAblation",
+    "Occlusion",
+    "HierarchicalFeatureAblation",
+    "ShapleyValueSampling",
+    "Lime",
+    "KernelShap",
     "LayerConductance",
     "LayerGradientXActivation",
     "LayerActivation",
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
+import hashlib
 import warnings
 import torch
+from collections import OrderedDict
+from contextlib import contextmanager
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -13,15 +16,19 @@ from .._utils.common import (
     _format_attributions,
     _format_tensor_into_tuples,
     _run_forward,
+    _select_targets,
     _validate_input,
     _expand_target,
     _expand_additional_forward_args,
+    _format_additional_forward_args,
     _tensorize_baseline,
     _call_custom_attribution_func,
     _compute_conv_delta_and_format_attrs,
+    _ForwardOutputRecorder,
     ExpansionTypes,
 )
 from .._utils.attribution import GradientAttribution
+from .._utils.batching import _tuple_splice_range
 from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
 
 
@@ -36,12 +43,73 @@ def _check_valid_module(inputs, outputs):
         return False
 
 
+def _fingerprint(value):
+    r"""
+    Returns a hashable fingerprint of a tensor, based on its shape, type,
+    device and content, or of a tuple or list of values. Other values are
+    fingerprinted by themselves if they are hashable, otherwise by identity.
+    """
+    if isinstance(value, torch.Tensor):
+        data = value.detach().cpu().contiguous().reshape(-1).view(torch.uint8)
+        return (
+            tuple(value.shape),
+            value.dtype,
+            value.device,
+            hashlib.sha1(data.numpy().tobytes()).hexdigest(),
+        )
+    if isinstance(value, (tuple, list)):
+        return tuple(_fingerprint(elem) for elem in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return id(value)
+
+
+class _ReferenceActivationCache:
+    r"""
+    A least recently used cache of the activations of a model at the
+    baselines, which holds at most `max_size` entries.
+    """
+
+    def __init__(self, max_size):
+        assert max_size > 0, "The size of the cache must be greater than 0."
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
 class DeepLift(GradientAttribution):
-    def __init__(self, model):
+    def __init__(self, model, reference_cache_size=0):
         r"""
         Args:
 
             model (nn.Module):  The reference to PyTorch model instance.
+            reference_cache_size (int, optional): The maximum number of
+                        baselines, for which the activations of the model are
+                        cached. If the same baselines and additional forward
+                        arguments are attributed again, and the parameters and
+                        buffers of the model have not been modified in the
+                        meantime, the forward pass at the baselines is skipped
+                        and the cached activations are used instead. Baselines
+                        are identified by their shape, type, device and content.
+                        The cache is not used if `single_forward` is True.
+                        If it is 0, no activations are cached.
+                        Default: 0
         """
         GradientAttribution.__init__(self, model)
         if isinstance(model, nn.DataParallel):
@@ -53,8 +121,18 @@ class DeepLift(GradientAttribution):
         else:
             self.model = model
         self.forward_handles = []
-        self.forward_handles_refs = []
         self.backward_handles = []
+        # the supported non-linear modules of the model, indexed once
+        self._hookable_modules = None
+        # one of "reference", "input" or "concatenated" while the hooks
+        # record a forward pass, otherwise None and the hooks are inactive
+        self._hook_mode = None
+        self._prepared = False
+        self._reference_cache = (
+            _ReferenceActivationCache(reference_cache_size)
+            if reference_cache_size > 0
+            else None
+        )
 
     def attribute(
         self,
@@ -64,6 +142,7 @@ class DeepLift(GradientAttribution):
         additional_forward_args=None,
         return_convergence_delta=False,
         custom_attribution_func=None,
+        single_forward=False,
     ):
         r""""
         Implements DeepLIFT algorithm based on the following paper:
@@ -193,6 +272,17 @@ class DeepLift(GradientAttribution):
                         `inputs`.
 
                         Default: None
+            single_forward (bool, optional): Indicates whether to evaluate the
+                        inputs and the baselines in a single forward pass over
+                        one batch, in which the baselines are concatenated to the
+                        inputs, instead of in two separate forward passes. The
+                        hooks on the non-linear modules split each activation
+                        into its input and reference half. This requires that
+                        the activations of all non-linear modules have examples
+                        along their first dimension and that the model treats
+                        examples independently, e.g. that it contains no batch
+                        normalization in training mode.
+                        Default: False
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -226,6 +316,9 @@ class DeepLift(GradientAttribution):
             >>> input = torch.randn(2, 3, 32, 32, requires_grad=True)
             >>> # Computes deeplift attribution scores for class 3.
             >>> attribution = dl.attribute(input, target=3)
+            >>> # Computes the same attribution scores with a single forward
+            >>> # pass over the inputs and baselines.
+            >>> attribution = dl.attribute(input, target=3, single_forward=True)
         """
 
         # Keeps track whether original input is a tuple or not before
@@ -239,33 +332,53 @@ class DeepLift(GradientAttribution):
 
         _validate_input(inputs, baselines)
 
-        # set hooks for baselines
-        warnings.warn(
-            """Setting forward, backward hooks and attributes on non-linear
-               activations. The hooks and attributes will be removed
-            after the attribution is finished"""
-        )
-        self.model.apply(self._register_hooks_ref)
-
         baselines = _tensorize_baseline(inputs, baselines)
 
-        _run_forward(
-            self.model,
-            baselines,
-            target=target,
-            additional_forward_args=additional_forward_args,
-        )
-        # remove forward hook set for baselines
-        for forward_handles_ref in self.forward_handles_refs:
-            forward_handles_ref.remove()
-
-        self.model.apply(self._register_hooks)
-        gradients = self.gradient_func(
-            self.model,
-            inputs,
-            target_ind=target,
-            additional_forward_args=additional_forward_args,
-        )
+        with self._hooked_model():
+            if single_forward:
+                (
+                    gradients,
+                    baselines_output,
+                    inputs_output,
+                ) = self._concatenated_forward_gradients(
+                    inputs,
+                    baselines,
+                    target,
+                    additional_forward_args,
+                    return_convergence_delta,
+                )
+            else:
+                # the output at the baselines is kept for the convergence delta
+                baselines_output = _select_targets(
+                    self._reference_forward(
+                        lambda: _run_forward(
+                            self.model,
+                            baselines,
+                            additional_forward_args=additional_forward_args,
+                        ).detach(),
+                        baselines,
+                        additional_forward_args,
+                    ),
+                    target,
+                )
+
+                self._hook_mode = "input"
+                # records the output at the inputs, if needed for the convergence
+                # delta, during the forward pass of the gradient computation
+                forward_fn = (
+                    _ForwardOutputRecorder(self.model)
+                    if return_convergence_delta
+                    else self.model
+                )
+                gradients = self.gradient_func(
+                    forward_fn,
+                    inputs,
+                    target_ind=target,
+                    additional_forward_args=additional_forward_args,
+                )
+                inputs_output = (
+                    forward_fn.pop(target) if return_convergence_delta else None
+                )
 
         if custom_attribution_func is None:
             attributions = tuple(
@@ -277,9 +390,6 @@ class DeepLift(GradientAttribution):
                 custom_attribution_func, gradients, inputs, baselines
             )
 
-        # remove hooks from all activations
-        self._remove_hooks()
-
         undo_gradient_requirements(inputs, gradient_mask)
         return _compute_conv_delta_and_format_attrs(
             self,
@@ -290,16 +400,157 @@ class DeepLift(GradientAttribution):
             additional_forward_args,
             target,
             is_inputs_tuple,
+            start_point_output=baselines_output,
+            end_point_output=inputs_output,
+        )
+
+    def _reference_forward(
+        self, forward_fn, baselines, additional_forward_args, key=()
+    ):
+        r"""
+        Calls `forward_fn`, which runs the forward pass at the baselines, while
+        the hooks record the reference activations of the non-linear modules,
+        and returns its result. If the reference cache is enabled and contains
+        the activations for the given baselines, additional forward arguments
+        and `key`, which identifies any further state of the forward pass,
+        these are restored and the cached result is returned instead.
+        """
+        cache_key = None
+        if self._reference_cache is not None:
+            cache_key = (
+                _fingerprint(baselines),
+                _fingerprint(additional_forward_args),
+                self.model.training,
+                tuple(
+                    (id(tensor), tensor._version)
+                    for tensor in (*self.model.parameters(), *self.model.buffers())
+                ),
+                key,
+            )
+            entry = self._reference_cache.get(cache_key)
+            if entry is not None:
+                for module, (input_ref, output_ref) in entry["references"].items():
+                    module.input_ref = input_ref
+                    module.output_ref = output_ref
+                return entry["output"]
+
+        # the hooks record the activations at the baselines
+        self._hook_mode = "reference"
+        output = forward_fn()
+
+        if cache_key is not None:
+            self._reference_cache.put(
+                cache_key,
+                {
+                    "references": {
+                        module: (module.input_ref, module.output_ref)
+                        for module in self._hookable()
+                        if hasattr(module, "input_ref")
+                    },
+                    "output": output,
+                },
+            )
+        return output
+
+    def clear_reference_cache(self):
+        r"""
+        Removes all reference activations from the cache. This is necessary
+        if the model is modified in a way, which is not reflected by the
+        versions of its parameters and buffers, e.g. if its forward function
+        depends on a global state.
+        """
+        if self._reference_cache is not None:
+            self._reference_cache.clear()
+
+    def _concatenated_forward_gradients(
+        self, inputs, baselines, target, additional_forward_args, record_outputs
+    ):
+        r"""
+        Computes the DeepLift multipliers with respect to the inputs with a
+        single forward and backward pass over a batch, which consists of the
+        inputs followed by the baselines. The hooks on the non-linear modules
+        split each activation into the input half and the reference half, and
+        the gradients of the reference half are set to zero.
+
+        Returns the multipliers, and the outputs of the model at the baselines
+        and at the inputs if `record_outputs` is True, otherwise None.
+        """
+        num_examples = inputs[0].shape[0]
+        with torch.no_grad():
+            concatenated = tuple(
+                torch.cat([input, baseline.expand_as(input)]).requires_grad_()
+                for input, baseline in zip(inputs, baselines)
+            )
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
         )
+        if additional_forward_args is not None:
+            additional_forward_args = _expand_additional_forward_args(
+                additional_forward_args, 2
+            )
+        target = _expand_target(target, 2)
+
+        self._hook_mode = "concatenated"
+        forward_fn = (
+            _ForwardOutputRecorder(self.model) if record_outputs else self.model
+        )
+        gradients = self.gradient_func(
+            forward_fn,
+            concatenated,
+            target_ind=target,
+            additional_forward_args=additional_forward_args,
+        )
+        gradients = tuple(gradient[:num_examples] for gradient in gradients)
+        if not record_outputs:
+            return gradients, None, None
+        output = forward_fn.pop(target)
+        return gradients, output[num_examples:], output[:num_examples]
 
     def _is_non_linear(self, module):
         return type(module) in SUPPORTED_NON_LINEAR.keys()
 
+    # the pre-forward hook prepares the modules of the rules, which need state
+    # from the forward pass, for recording it
+    def _forward_pre_hook(self, module, inputs):
+        if self._hook_mode in ("input", "concatenated"):
+            FORWARD_STATE[type(module)][0](module)
+
     # we need forward hook to access and detach the inputs and outputs of a neuron
     def _forward_hook(self, module, inputs, outputs):
+        if self._hook_mode is None:
+            return
+        if self._hook_mode == "reference":
+            self._detach_tensors("input_ref", "output_ref", module, inputs, outputs)
+            return
+        returned_outputs = None
+        if type(module) in FORWARD_STATE:
+            outputs, module.forward_state = FORWARD_STATE[type(module)][1](
+                module, outputs
+            )
+            returned_outputs = outputs
         input_attr_name = "input"
         output_attr_name = "output"
         self._detach_tensors(input_attr_name, output_attr_name, module, inputs, outputs)
+        if self._hook_mode == "concatenated":
+            # inputs and baselines were evaluated in one batch, in which the
+            # first half belongs to the inputs and the second to the baselines
+            for attr_name in [input_attr_name, output_attr_name]:
+                tensors = getattr(module, attr_name)
+                setattr(
+                    module,
+                    attr_name,
+                    tuple(tensor[: tensor.shape[0] // 2] for tensor in tensors),
+                )
+                setattr(
+                    module,
+                    attr_name + "_ref",
+                    tuple(tensor[tensor.shape[0] // 2 :] for tensor in tensors),
+                )
+            if returned_outputs is not None:
+                module.forward_state = {
+                    name: state[: state.shape[0] // 2]
+                    for name, state in module.forward_state.items()
+                }
         if not _check_valid_module(inputs, outputs):
             module.is_invalid = True
             module.saved_grad = None
@@ -320,11 +571,7 @@ class DeepLift(GradientAttribution):
             inputs[0].register_hook(tensor_backward_hook)
         else:
             module.is_invalid = False
-
-    def _forward_hook_ref(self, module, inputs, outputs):
-        input_attr_name = "input_ref"
-        output_attr_name = "output_ref"
-        self._detach_tensors(input_attr_name, output_attr_name, module, inputs, outputs)
+        return returned_outputs
 
     def _detach_tensors(
         self, input_attr_name, output_attr_name, module, inputs, outputs
@@ -341,7 +588,21 @@ class DeepLift(GradientAttribution):
           we can override `grad_input` according to chain rule with.
          `grad_output` * delta_out / delta_in.
 
+         If the inputs and baselines were evaluated in one `concatenated` batch,
+         the multipliers are computed for the input half of the gradients and
+         the gradients of the reference half are set to zero.
          """
+        if self._hook_mode is None or not hasattr(module, "input"):
+            return None
+        concatenated = self._hook_mode == "concatenated"
+        if concatenated:
+            num_examples = module.input[0].shape[0]
+            grad_output = tuple(grad[:num_examples] for grad in grad_output)
+            if not module.is_invalid:
+                grad_input = tuple(
+                    grad[:num_examples] if grad is not None else None
+                    for grad in grad_input
+                )
         delta_in = tuple(
             inp - inp_ref for inp, inp_ref in zip(module.input, module.input_ref)
         )
@@ -353,11 +614,25 @@ class DeepLift(GradientAttribution):
                 module, delta_in, delta_out, list(grad_input), grad_output, eps=eps
             )
         )
+        if concatenated:
+            if module.is_invalid:
+                module.saved_grad = torch.cat(
+                    [module.saved_grad, torch.zeros_like(module.saved_grad)]
+                )
+            else:
+                multipliers = tuple(
+                    torch.cat([multiplier, torch.zeros_like(multiplier)])
+                    if multiplier is not None
+                    else None
+                    for multiplier in multipliers
+                )
         # remove all the properies that we set for the inputs and output
         del module.input_ref
         del module.output_ref
         del module.input
         del module.output
+        if hasattr(module, "forward_state"):
+            del module.forward_state
 
         return multipliers
 
@@ -371,39 +646,112 @@ class DeepLift(GradientAttribution):
             or not self._is_non_linear(module)
         )
 
-    def _register_hooks_ref(self, module):
-        if not self._can_register_hook(module):
-            return
-        forward_handle_ref = module.register_forward_hook(self._forward_hook_ref)
-        self.forward_handles_refs.append(forward_handle_ref)
-
-    def _register_hooks(self, module):
-        if not self._can_register_hook(module):
-            return
-        # adds forward hook to leaf nodes that are non-linear
-        forward_handle = module.register_forward_hook(self._forward_hook)
-        backward_handle = module.register_backward_hook(self._backward_hook)
-        self.forward_handles.append(forward_handle)
-        self.backward_handles.append(backward_handle)
+    def _hookable(self):
+        if self._hookable_modules is None:
+            self._hookable_modules = [
+                module
+                for module in self.model.modules()
+                if self._can_register_hook(module)
+            ]
+        return self._hookable_modules
+
+    def _register_hooks(self):
+        for module in self._hookable():
+            if type(module) in FORWARD_STATE:
+                self.forward_handles.append(
+                    module.register_forward_pre_hook(self._forward_pre_hook)
+                )
+            # adds forward hook to leaf nodes that are non-linear
+            self.forward_handles.append(
+                module.register_forward_hook(self._forward_hook)
+            )
+            self.backward_handles.append(
+                module.register_backward_hook(self._backward_hook)
+            )
 
     def _remove_hooks(self):
         for forward_handle in self.forward_handles:
             forward_handle.remove()
         for backward_handle in self.backward_handles:
             backward_handle.remove()
+        self.forward_handles = []
+        self.backward_handles = []
+
+    @contextmanager
+    def _hooked_model(self):
+        r"""
+        Activates the hooks on the non-linear modules for the duration of an
+        attribution. The hooks are registered and removed around it, unless
+        they are already installed by `prepared_model`.
+        """
+        if not self._prepared:
+            warnings.warn(
+                """Setting forward, backward hooks and attributes on non-linear
+                   activations. The hooks and attributes will be removed
+                after the attribution is finished"""
+            )
+            self._register_hooks()
+        try:
+            yield
+        finally:
+            self._hook_mode = None
+            # restores the modules, whose forward pass was prepared for
+            # recording state, if an exception interrupted it
+            for module in self._hookable():
+                if type(module) in FORWARD_STATE:
+                    FORWARD_STATE[type(module)][2](module)
+            if not self._prepared:
+                self._remove_hooks()
+
+    @contextmanager
+    def prepared_model(self):
+        r"""
+        A context manager, which installs the forward and backward hooks on
+        the supported non-linear modules of the model once, so that they are
+        reused by all `attribute` calls within the context instead of being
+        registered and removed in every call. The hooks are inactive outside
+        of `attribute`, so the model can still be used as usual within the
+        context, and they are removed when the context exits.
+
+        The supported modules are indexed the first time the hooks are
+        installed, hence modules which are added to the model afterwards are
+        not hooked.
+
+        Examples::
+
+            >>> net = ImageClassifier()
+            >>> dl = DeepLift(net)
+            >>> with dl.prepared_model():
+            >>>     for input in inputs:
+            >>>         attribution = dl.attribute(input, target=3)
+        """
+        assert not self._prepared, "The model has already been prepared."
+        self._register_hooks()
+        self._prepared = True
+        try:
+            yield self
+        finally:
+            self._prepared = False
+            self._hook_mode = None
+            self._remove_hooks()
 
     def has_convergence_delta(self):
         return True
 
 
 class DeepLiftShap(DeepLift):
-    def __init__(self, model):
+    def __init__(self, model, reference_cache_size=0):
         r"""
         Args:
 
             model (nn.Module):  The reference to PyTorch model instance.
+            reference_cache_size (int, optional): The maximum number of
+                        chunks of expanded baselines, for which the activations
+                        of the model are cached. See `DeepLift` for more
+                        details.
+                        Default: 0
         """
-        DeepLift.__init__(self, model)
+        DeepLift.__init__(self, model, reference_cache_size)
 
     def attribute(
         self,
@@ -413,6 +761,8 @@ class DeepLiftShap(DeepLift):
         additional_forward_args=None,
         return_convergence_delta=False,
         custom_attribution_func=None,
+        single_forward=False,
+        internal_batch_size=None,
     ):
         r"""
         Extends DeepLift algorithm and approximates SHAP values using Deeplift.
@@ -525,6 +875,28 @@ class DeepLiftShap(DeepLift):
                         attribution tensors that have the same length as the
                         `inputs`.
                         Default: None
+            single_forward (bool, optional): Indicates whether to evaluate the
+                        inputs and the baselines in a single forward pass over
+                        one batch, in which the baselines are concatenated to the
+                        inputs, instead of in two separate forward passes. The
+                        hooks on the non-linear modules split each activation
+                        into its input and reference half. This requires that
+                        the activations of all non-linear modules have examples
+                        along their first dimension and that the model treats
+                        examples independently, e.g. that it contains no batch
+                        normalization in training mode.
+                        Default: False
+            internal_batch_size (int, optional): Divides the baselines into
+                        chunks, such that each chunk contains at most
+                        internal_batch_size input - baseline pairs, but at least
+                        one baseline. The chunks are attributed sequentially and
+                        the attributions are averaged across baselines with a
+                        running mean, so that memory scales with
+                        internal_batch_size rather than with
+                        #examples * #baselines.
+                        If internal_batch_size is None, all input - baseline
+                        pairs are attributed in one batch.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -579,33 +951,23 @@ class DeepLiftShap(DeepLift):
             " approach can be used instead.".format(baselines[0])
         )
 
-        # batch sizes
-        inp_bsz = inputs[0].shape[0]
-        base_bsz = baselines[0].shape[0]
-
-        (
-            exp_inp,
-            exp_base,
-            exp_tgt,
-            exp_addit_args,
-        ) = self._expand_inputs_baselines_targets(
-            baselines, inputs, target, additional_forward_args
-        )
-
-        attributions = super().attribute(
-            exp_inp,
-            exp_base,
-            target=exp_tgt,
-            additional_forward_args=exp_addit_args,
-            return_convergence_delta=return_convergence_delta,
-            custom_attribution_func=custom_attribution_func,
-        )
-        if return_convergence_delta:
-            attributions, delta = attributions
-
-        attributions = tuple(
-            self._compute_mean_across_baselines(inp_bsz, base_bsz, attribution)
-            for attribution in attributions
+        attributions, delta = self._attribute_baseline_chunks(
+            lambda exp_inp, exp_base, exp_tgt, exp_addit_args: DeepLift.attribute(
+                self,
+                exp_inp,
+                exp_base,
+                target=exp_tgt,
+                additional_forward_args=exp_addit_args,
+                return_convergence_delta=return_convergence_delta,
+                custom_attribution_func=custom_attribution_func,
+                single_forward=single_forward,
+            ),
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            return_convergence_delta,
+            internal_batch_size,
         )
 
         if return_convergence_delta:
@@ -613,6 +975,75 @@ class DeepLiftShap(DeepLift):
         else:
             return _format_attributions(is_inputs_tuple, attributions)
 
+    def _attribute_baseline_chunks(
+        self,
+        attribute_fn,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        return_convergence_delta,
+        internal_batch_size,
+    ):
+        r"""
+        Calls `attribute_fn` with the inputs, baselines, targets and additional
+        forward arguments expanded to all pairs of inputs and the baselines of
+        each chunk of baselines, and averages the resulting attributions across
+        baselines with a running mean. Each chunk contains at most
+        `internal_batch_size` pairs but at least one baseline.
+
+        Returns a tuple of the mean attributions and, if
+        `return_convergence_delta` is True, the deltas of all pairs ordered by
+        input example followed by the baseline, otherwise None.
+        """
+        assert internal_batch_size is None or (
+            isinstance(internal_batch_size, int) and internal_batch_size > 0
+        ), "Batch size must be greater than 0."
+        # batch sizes
+        inp_bsz = inputs[0].shape[0]
+        base_bsz = baselines[0].shape[0]
+        chunk_bsz = (
+            base_bsz
+            if internal_batch_size is None
+            else max(internal_batch_size // inp_bsz, 1)
+        )
+
+        mean_attributions = None
+        deltas = []
+        for start in range(0, base_bsz, chunk_bsz):
+            end = min(start + chunk_bsz, base_bsz)
+            (
+                exp_inp,
+                exp_base,
+                exp_tgt,
+                exp_addit_args,
+            ) = self._expand_inputs_baselines_targets(
+                _tuple_splice_range(baselines, start, end),
+                inputs,
+                target,
+                additional_forward_args,
+            )
+            attributions = attribute_fn(exp_inp, exp_base, exp_tgt, exp_addit_args)
+            if return_convergence_delta:
+                attributions, delta = attributions
+                deltas.append(delta.reshape(inp_bsz, end - start))
+
+            chunk_means = tuple(
+                self._compute_mean_across_baselines(inp_bsz, end - start, attribution)
+                for attribution in _format_tensor_into_tuples(attributions)
+            )
+            if mean_attributions is None:
+                mean_attributions = chunk_means
+            else:
+                # running mean across the `end` baselines seen so far
+                mean_attributions = tuple(
+                    mean + (chunk_mean - mean) * ((end - start) / end)
+                    for mean, chunk_mean in zip(mean_attributions, chunk_means)
+                )
+
+        delta = torch.cat(deltas, dim=1).reshape(-1) if deltas else None
+        return mean_attributions, delta
+
     def _expand_inputs_baselines_targets(
         self, baselines, inputs, target, additional_forward_args
     ):
@@ -736,36 +1167,43 @@ def maxpool(
     # The forward function of maxpool takes only tensors not
     # a tuple hence accessing the first
     # element in the tuple of inputs, grad_input and grad_output
-    _, indices = pool_func(
-        module.input[0],
-        module.kernel_size,
-        module.stride,
-        module.padding,
-        module.dilation,
-        module.ceil_mode,
-        True,
-    )
-    unpool_grad_out_delta = unpool_func(
-        grad_output[0] * delta_out[0],
-        indices,
-        module.kernel_size,
-        module.stride,
-        module.padding,
-        list(module.input[0].shape),
-    )
+    forward_state = getattr(module, "forward_state", {})
+    if "indices" in forward_state:
+        # the indices were recorded during the forward pass of the module
+        indices = forward_state["indices"]
+    else:
+        _, indices = pool_func(
+            module.input[0],
+            module.kernel_size,
+            module.stride,
+            module.padding,
+            module.dilation,
+            module.ceil_mode,
+            True,
+        )
+    input_shape = list(module.input[0].shape)
 
-    # If the module is invalid, we need to recompute the grad_input
+    # If the module is invalid, we need to recompute the grad_input, which is
+    # unpooled together with the scaled grad_output in one batch
     if module.is_invalid:
         original_grad_input = grad_input
-        grad_input = (
-            unpool_func(
-                grad_output[0],
-                indices,
-                module.kernel_size,
-                module.stride,
-                module.padding,
-                list(module.input[0].shape),
-            ),
+        unpool_grad_out_delta, unpool_grad_out = unpool_func(
+            torch.cat([grad_output[0] * delta_out[0], grad_output[0]]),
+            torch.cat([indices, indices]),
+            module.kernel_size,
+            module.stride,
+            module.padding,
+            [2 * input_shape[0]] + input_shape[1:],
+        ).chunk(2)
+        grad_input = (unpool_grad_out,)
+    else:
+        unpool_grad_out_delta = unpool_func(
+            grad_output[0] * delta_out[0],
+            indices,
+            module.kernel_size,
+            module.stride,
+            module.padding,
+            input_shape,
         )
 
     new_grad_input = torch.where(
@@ -793,3 +1231,38 @@ SUPPORTED_NON_LINEAR = {
     nn.MaxPool3d: maxpool3d,
     nn.Softmax: softmax,
 }
+
+
+def _prepare_pool_indices(module):
+    # makes the max pooling module return the indices of the maxima, which
+    # are otherwise not accessible from the forward hook
+    module.orig_return_indices = module.return_indices
+    module.return_indices = True
+
+
+def _record_pool_indices(module, outputs):
+    _restore_pool_indices(module)
+    forward_state = {"indices": outputs[1]}
+    if not module.return_indices:
+        outputs = outputs[0]
+    return outputs, forward_state
+
+
+def _restore_pool_indices(module):
+    if hasattr(module, "orig_return_indices"):
+        module.return_indices = module.orig_return_indices
+        del module.orig_return_indices
+
+
+# Rules, which need state from the forward pass of their modules, declare a
+# triple of functions for recording it. The first one prepares the module
+# before its forward pass. The second one takes the module and its outputs and
+# returns the outputs, which the module is supposed to return, and a
+# dictionary of the recorded state, which is accessible to the rule as
+# `module.forward_state`. The third one undoes the preparation, if the forward
+# pass failed before the state was recorded, and does nothing otherwise.
+FORWARD_STATE = {
+    nn.MaxPool1d: (_prepare_pool_indices, _record_pool_indices, _restore_pool_indices),
+    nn.MaxPool2d: (_prepare_pool_indices, _record_pool_indices, _restore_pool_indices),
+    nn.MaxPool3d: (_prepare_pool_indices, _record_pool_indices, _restore_pool_indices),
+}
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 
+import collections
+import os
+
 import torch
 
 from .._utils.common import (
@@ -15,14 +18,36 @@ from .._utils.attribution import PerturbationAttribution
 
 
 class FeatureAblation(PerturbationAttribution):
-    def __init__(self, forward_func):
+    def __init__(self, forward_func, input_encoders=None, fusion_func=None):
         r"""
         Args:
 
             forward_func (callable): The forward function of the model or
                         any modification of it
+            input_encoders (list of callables, optional): For models, which
+                        encode each input tensor separately and combine the
+                        encodings afterwards, e.g. multimodal models, the
+                        encoder of each input tensor. Each encoder takes a
+                        batch of the corresponding input tensor and returns a
+                        tensor with the same first dimension. If given, the
+                        encodings of the unablated inputs are computed once
+                        and reused, and only the ablated input is encoded
+                        for each ablation.
+                        Default: None
+            fusion_func (callable, optional): Must be given together with
+                        `input_encoders`. It takes the encodings of all input
+                        tensors followed by the additional forward args, and
+                        returns the output of the model, i.e.
+                        `fusion_func(*encodings, *additional_forward_args)`
+                        equals `forward_func(*inputs, *additional_forward_args)`.
+                        Default: None
         """
         PerturbationAttribution.__init__(self, forward_func)
+        assert (input_encoders is None) == (
+            fusion_func is None
+        ), "input_encoders and fusion_func must be provided together."
+        self.input_encoders = input_encoders
+        self.fusion_func = fusion_func
         self.use_weights = False
 
     def attribute(
@@ -33,6 +58,8 @@ class FeatureAblation(PerturbationAttribution):
         additional_forward_args=None,
         feature_mask=None,
         ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
     ):
         r""""
         A perturbation based approach to computing attribution, involving
@@ -156,6 +183,23 @@ class FeatureAblation(PerturbationAttribution):
                             If the forward function returns a single scalar per batch,
                             ablations_per_eval must be set to 1.
                             Default: 1
+                executor (concurrent.futures.Executor, optional): If given, the
+                            ablated batches are evaluated by submitting the forward
+                            function to this executor, e.g. a ProcessPoolExecutor
+                            for forward functions, which hold the GIL. The forward
+                            function, and the model if it is a module, must then be
+                            picklable for process pools. The evaluations run
+                            without gradients, and the results are combined in the
+                            order of the ablations, hence the attributions do not
+                            depend on the executor.
+                            Default: None
+                max_pending (int, optional): The maximum number of ablated
+                            batches, which are submitted to the executor and
+                            whose results are not combined yet. Twice the number
+                            of workers of the executor keeps each worker busy,
+                            while bounding the memory of the built batches.
+                            If None, twice the number of CPUs is used.
+                            Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -208,9 +252,111 @@ class FeatureAblation(PerturbationAttribution):
             >>>                             [2,2,3,3],[2,2,3,3]]])
             >>> attr = ablator.attribute(input, target=1, feature_mask=feature_mask)
         """
+        return self._attribute(
+            inputs,
+            baselines=baselines,
+            target=target,
+            additional_forward_args=additional_forward_args,
+            feature_mask=feature_mask,
+            ablations_per_eval=ablations_per_eval,
+            executor=executor,
+            max_pending=max_pending,
+        )
+
+    def attribute_iter(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
+        checkpoint_path=None,
+        checkpoint_interval=1,
+    ):
+        r"""
+        Computes the same attributions as `attribute`, but yields the partial
+        attributions after each ablated batch, in which the features, which
+        have not been ablated yet, have attribution 0. The last yielded
+        attributions are the result of `attribute`.
+
+        If `checkpoint_path` is given, the accumulated attributions and the
+        progress are saved to this file with `torch.save` after every
+        `checkpoint_interval` ablated batches and after each input tensor.
+        If the file exists when the iteration starts, e.g. after a preempted
+        job, the ablation resumes from the saved state, which must have been
+        computed for the same inputs and arguments. The file is kept after
+        the last batch, and resuming from it yields the final attributions
+        once.
+
+        See `attribute` for the other arguments.
+
+        Examples::
+
+            >>> ablator = FeatureAblation(net)
+            >>> for attr in ablator.attribute_iter(
+            >>>     input, target=1, checkpoint_path="ablation.pt"
+            >>> ):
+            >>>     pass
+        """
+        is_inputs_tuple = isinstance(inputs, tuple)
+        for total_attrib, weights in self._ablation_steps(
+            inputs,
+            baselines=baselines,
+            target=target,
+            additional_forward_args=additional_forward_args,
+            feature_mask=feature_mask,
+            ablations_per_eval=ablations_per_eval,
+            executor=executor,
+            max_pending=max_pending,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+        ):
+            # the totals are updated in place by the next batches
+            yield self._format_ablation_attrib(
+                is_inputs_tuple,
+                [single_attrib.clone() for single_attrib in total_attrib],
+                weights,
+            )
+
+    def _attribute(self, inputs, **kwargs):
+        r"""
+        Computes the ablation attributions, see `attribute` and
+        `_ablation_steps`.
+        """
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
         is_inputs_tuple = isinstance(inputs, tuple)
+        for total_attrib, weights in self._ablation_steps(inputs, **kwargs):
+            pass
+        return self._format_ablation_attrib(is_inputs_tuple, total_attrib, weights)
+
+    def _ablation_steps(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
+        checkpoint_path=None,
+        checkpoint_interval=1,
+        **kwargs
+    ):
+        r"""
+        Ablates the features batch by batch, and yields the accumulated
+        attribution totals and, if `use_weights` is set, ablation counts of
+        all input tensors after each batch, or once if there is no batch to
+        ablate. Subclasses, which define the ablated features differently,
+        override `_get_feature_range_and_mask` and `_construct_ablated_input`.
+        Each of the additional keyword arguments `kwargs` contains a tuple
+        with one value per input tensor, and these methods are given the
+        values for the ablated input tensor.
+        """
         inputs, baselines = _format_input_baseline(inputs, baselines)
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
@@ -220,34 +366,22 @@ class FeatureAblation(PerturbationAttribution):
         assert (
             isinstance(ablations_per_eval, int) and ablations_per_eval >= 1
         ), "Ablations per evaluation must be at least 1."
+        assert max_pending is None or (
+            isinstance(max_pending, int) and max_pending >= 1
+        ), "max_pending must be None or at least 1."
+        assert (
+            isinstance(checkpoint_interval, int) and checkpoint_interval >= 1
+        ), "The checkpoint interval must be at least 1."
 
         # Computes initial evaluation with all features, which is compared
         # to each ablated result.
-        initial_eval = _run_forward(
-            self.forward_func, inputs, target, additional_forward_args
+        encodings = self._encode_inputs(inputs)
+        initial_eval = self._run_ablation_forward(
+            inputs, target, additional_forward_args, encodings
+        )
+        single_output_mode, initial_eval = self._check_output_mode(
+            initial_eval, num_examples, ablations_per_eval, feature_mask
         )
-        if isinstance(initial_eval, (int, float)) or (
-            isinstance(initial_eval, torch.Tensor)
-            and (
-                len(initial_eval.shape) == 0
-                or (num_examples > 1 and initial_eval.numel() == 1)
-            )
-        ):
-            single_output_mode = True
-            assert (
-                ablations_per_eval == 1
-            ), "Cannot have ablations_per_eval > 1 when function returns scalar."
-            if feature_mask is not None:
-                for single_mask in feature_mask:
-                    assert (
-                        single_mask.shape[0] == 1
-                    ), "Cannot provide multiple masks when function returns a scalar."
-        else:
-            single_output_mode = False
-            assert (
-                isinstance(initial_eval, torch.Tensor) and initial_eval[0].numel() == 1
-            ), "Target should identify a single element in the model output."
-            initial_eval = initial_eval.reshape(1, num_examples)
 
         # Initialize attribution totals and counts
         total_attrib = [
@@ -256,43 +390,56 @@ class FeatureAblation(PerturbationAttribution):
         ]
 
         # Weights are used in cases where ablations may be overlapping.
+        weights = None
         if self.use_weights:
             weights = [
                 torch.zeros_like(input[0:1] if single_output_mode else input)
                 for input in inputs
             ]
 
+        # Restores the totals and the progress of a previous run
+        resume_index, resume_feature = 0, None
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            state = torch.load(checkpoint_path, map_location=inputs[0].device)
+            assert [attrib.shape for attrib in state["total_attrib"]] == [
+                attrib.shape for attrib in total_attrib
+            ], "The checkpoint does not match the inputs."
+            total_attrib = [attrib.detach() for attrib in state["total_attrib"]]
+            weights = state["weights"]
+            if weights is not None:
+                weights = [weight.detach() for weight in weights]
+            resume_index = state["input_index"]
+            resume_feature = state["num_features_processed"]
+
         # Iterate through each feature tensor for ablation
-        for i in range(len(inputs)):
-            # Obtain feature mask for selected input tensor, matches size of
-            # 1 input example, (1 x inputs[i].shape[1:])
-            input_mask = (
-                torch.reshape(
-                    torch.arange(torch.numel(inputs[i][0]), device=inputs[i].device),
-                    inputs[i][0:1].shape,
-                )
-                if feature_mask is None
-                else feature_mask[i]
+        num_batches = 0
+        for i in range(resume_index, len(inputs)):
+            input_kwargs = {key: value[i] for key, value in kwargs.items()}
+            min_feature, num_features, input_mask = self._get_feature_range_and_mask(
+                inputs[i],
+                None if feature_mask is None else feature_mask[i],
+                **input_kwargs
             )
-            for (
-                current_inputs,
-                current_add_args,
-                current_target,
-                current_mask,
-            ) in self._ablation_generator(
+            if i == resume_index and resume_feature is not None:
+                min_feature = resume_feature
+            num_features_processed = min_feature
+            ablations = self._ablation_generator(
                 i,
                 inputs,
                 additional_forward_args,
                 target,
                 baselines,
                 input_mask,
+                min_feature,
+                num_features,
                 ablations_per_eval,
+                **input_kwargs
+            )
+            # modified_eval dimensions: 1D tensor with length
+            # equal to #num_examples * #features in batch
+            for current_mask, modified_eval in self._evaluate_ablations(
+                ablations, encodings, i, executor, max_pending
             ):
-                # modified_eval dimensions: 1D tensor with length
-                # equal to #num_examples * #features in batch
-                modified_eval = _run_forward(
-                    self.forward_func, current_inputs, current_target, current_add_args
-                )
                 # eval_diff dimensions: (#features in batch, #num_examples, 1,.. 1)
                 # (contains 1 more dimension than inputs). This adds extra dimensions
                 # of 1 to make the tensor broadcastable with the inputs tensor.
@@ -303,19 +450,196 @@ class FeatureAblation(PerturbationAttribution):
                         initial_eval - modified_eval.reshape(-1, num_examples)
                     ).reshape((-1, num_examples) + (len(inputs[i].shape) - 1) * (1,))
                 if self.use_weights:
-                    weights[i] += current_mask.float().sum(dim=0)
-                total_attrib[i] += (eval_diff * current_mask.float()).sum(dim=0)
+                    weights[i] += current_mask.sum(dim=0)
+                total_attrib[i] += (eval_diff * current_mask).sum(dim=0)
+
+                num_features_processed += current_mask.shape[0]
+                num_batches += 1
+                if (
+                    checkpoint_path is not None
+                    and num_batches % checkpoint_interval == 0
+                ):
+                    self._save_checkpoint(
+                        checkpoint_path,
+                        i,
+                        num_features_processed,
+                        total_attrib,
+                        weights,
+                    )
+                yield total_attrib, weights
+            if checkpoint_path is not None:
+                self._save_checkpoint(
+                    checkpoint_path, i + 1, None, total_attrib, weights
+                )
+        if num_batches == 0:
+            yield total_attrib, weights
 
-        # Divide total attributions by counts and return formatted attributions
+    def _format_ablation_attrib(self, is_inputs_tuple, total_attrib, weights):
+        r"""
+        Divides the attribution totals by the ablation counts, if `use_weights`
+        is set, and returns the formatted attributions.
+        """
+        # Divide total attributions by counts and return formatted attributions,
+        # locations which were never ablated have attribution 0
         if self.use_weights:
             attrib = tuple(
-                single_attrib / weight
+                single_attrib / weight.clamp(min=1)
                 for single_attrib, weight in zip(total_attrib, weights)
             )
         else:
             attrib = tuple(total_attrib)
         return _format_attributions(is_inputs_tuple, attrib)
 
+    def _save_checkpoint(
+        self,
+        checkpoint_path,
+        input_index,
+        num_features_processed,
+        total_attrib,
+        weights,
+    ):
+        r"""
+        Saves the attribution totals and counts, and the progress, i.e. the
+        index of the input tensor and the next feature to be ablated, or None
+        if the ablation starts at the next input tensor. The file is replaced
+        atomically, so that an interrupted save keeps the previous state.
+        The tensors are saved detached from the autograd graph of the model,
+        since loaded tensors which require gradients can't be accumulated in
+        place.
+        """
+        state = {
+            "input_index": input_index,
+            "num_features_processed": num_features_processed,
+            "total_attrib": [attrib.detach().clone() for attrib in total_attrib],
+            "weights": None
+            if weights is None
+            else [weight.detach().clone() for weight in weights],
+        }
+        temp_path = checkpoint_path + ".tmp"
+        torch.save(state, temp_path)
+        os.replace(temp_path, checkpoint_path)
+
+    def _encode_inputs(self, inputs):
+        r"""
+        Returns the encodings of the inputs, if `input_encoders` are given,
+        and None otherwise.
+        """
+        if self.input_encoders is None:
+            return None
+        assert len(self.input_encoders) == len(
+            inputs
+        ), "One encoder must be provided for each input tensor."
+        return tuple(
+            encoder(input) for encoder, input in zip(self.input_encoders, inputs)
+        )
+
+    def _run_ablation_forward(
+        self, current_inputs, current_target, current_add_args, encodings, i=None
+    ):
+        r"""
+        Evaluates the model at `current_inputs`, which contain the inputs
+        repeated once per ablation, with the i-th input ablated. If the
+        `encodings` of the unablated inputs are given, only the i-th input is
+        encoded, the cached encodings of all other inputs are repeated, and
+        the model output is computed by the fusion function. If `i` is None,
+        `current_inputs` are the unablated inputs.
+        """
+        if encodings is None:
+            return _run_forward(
+                self.forward_func, current_inputs, current_target, current_add_args
+            )
+        if i is not None:
+            num_ablations = current_inputs[i].shape[0] // encodings[i].shape[0]
+            encodings = tuple(
+                self.input_encoders[i](current_inputs[i])
+                if j == i
+                else torch.cat([encoding] * num_ablations, dim=0)
+                for j, encoding in enumerate(encodings)
+            )
+        return _run_forward(
+            self.fusion_func, encodings, current_target, current_add_args
+        )
+
+    def _evaluate_ablations(self, ablations, encodings, i, executor, max_pending):
+        r"""
+        Yields the mask and the model evaluation of each ablated batch from
+        the generator `ablations`, in the order of the ablations. If an
+        `executor` is given, the evaluations are submitted to it, and the
+        generator is advanced while at most `max_pending` of them run.
+        """
+        if executor is None:
+            for current_inputs, current_add_args, current_target, current_mask in (
+                ablations
+            ):
+                yield current_mask, self._run_ablation_forward(
+                    current_inputs, current_target, current_add_args, encodings, i
+                )
+            return
+
+        # bounds the number of built ablated batches, which are not evaluated
+        if max_pending is None:
+            max_pending = 2 * (os.cpu_count() or 1)
+        pending = collections.deque()
+        for current_inputs, current_add_args, current_target, current_mask in (
+            ablations
+        ):
+            pending.append(
+                (
+                    current_mask,
+                    executor.submit(
+                        self._run_ablation_forward_no_grad,
+                        current_inputs,
+                        current_target,
+                        current_add_args,
+                        encodings,
+                        i,
+                    ),
+                )
+            )
+            if len(pending) >= max_pending:
+                current_mask, future = pending.popleft()
+                yield current_mask, future.result()
+        while len(pending) > 0:
+            current_mask, future = pending.popleft()
+            yield current_mask, future.result()
+
+    def _run_ablation_forward_no_grad(self, *args):
+        r"""
+        Runs `_run_ablation_forward` without gradients, so that the results
+        can be returned from worker processes.
+        """
+        with torch.no_grad():
+            return self._run_ablation_forward(*args)
+
+    def _check_output_mode(
+        self, initial_eval, num_examples, ablations_per_eval, feature_mask
+    ):
+        r"""
+        Returns whether the forward function returns a single scalar for the
+        full batch, and the initial evaluation, reshaped to (1, #examples) if
+        it returns a scalar per example.
+        """
+        if isinstance(initial_eval, (int, float)) or (
+            isinstance(initial_eval, torch.Tensor)
+            and (
+                len(initial_eval.shape) == 0
+                or (num_examples > 1 and initial_eval.numel() == 1)
+            )
+        ):
+            assert (
+                ablations_per_eval == 1
+            ), "Cannot have ablations_per_eval > 1 when function returns scalar."
+            if feature_mask is not None:
+                for single_mask in feature_mask:
+                    assert (
+                        single_mask.shape[0] == 1
+                    ), "Cannot provide multiple masks when function returns a scalar."
+            return True, initial_eval
+        assert (
+            isinstance(initial_eval, torch.Tensor) and initial_eval[0].numel() == 1
+        ), "Target should identify a single element in the model output."
+        return False, initial_eval.reshape(1, num_examples)
+
     def _ablation_generator(
         self,
         i,
@@ -324,9 +648,11 @@ class FeatureAblation(PerturbationAttribution):
         target,
         baselines,
         input_mask,
+        min_feature,
+        num_features,
         ablations_per_eval,
+        **kwargs
     ):
-        num_features = torch.max(input_mask).item() + 1
         num_examples = inputs[0].shape[0]
         ablations_per_eval = min(ablations_per_eval, num_features)
         baseline = baselines[i] if isinstance(baselines, tuple) else baselines
@@ -345,7 +671,7 @@ class FeatureAblation(PerturbationAttribution):
         )
         target_repeated = _expand_target(target, ablations_per_eval)
 
-        num_features_processed = torch.min(input_mask).item()
+        num_features_processed = min_feature
         while num_features_processed < num_features:
             current_num_features = min(
                 ablations_per_eval, num_features - num_features_processed
@@ -384,6 +710,7 @@ class FeatureAblation(PerturbationAttribution):
                 baseline,
                 num_features_processed,
                 num_features_processed + current_num_features,
+                **kwargs
             )
 
             # current_features[i] has dimension
@@ -399,8 +726,28 @@ class FeatureAblation(PerturbationAttribution):
             current_features[i] = original_tensor
             num_features_processed += current_num_features
 
+    def _get_feature_range_and_mask(self, input, input_mask, **kwargs):
+        r"""
+        Returns the smallest feature index, the number of features, i.e. one
+        more than the largest feature index, and the feature mask of the given
+        input tensor. If `input_mask` is None, each scalar of an input example
+        is a separate feature.
+        """
+        if input_mask is None:
+            # Obtain feature mask for selected input tensor, matches size of
+            # 1 input example, (1 x inputs[i].shape[1:])
+            input_mask = torch.reshape(
+                torch.arange(torch.numel(input[0]), device=input.device),
+                input[0:1].shape,
+            )
+        return (
+            torch.min(input_mask).item(),
+            torch.max(input_mask).item() + 1,
+            input_mask,
+        )
+
     def _construct_ablated_input(
-        self, feature_tensor, input_mask, baseline, start_feature, end_feature
+        self, feature_tensor, input_mask, baseline, start_feature, end_feature, **kwargs
     ):
         r"""
         Ablates given feature tensor with given input feature mask, feature range,
@@ -415,13 +762,125 @@ class FeatureAblation(PerturbationAttribution):
         This method returns the ablated feature tensor, which has the same
         dimensionality as `feature_tensor` as well as the corresponding mask with
         either the same dimensionality as `feature_tensor` or second dimension
-        being 1. This mask contains 1s in locations which have been ablated (and
-        thus counted towards ablations for that feature) and 0s otherwise.
+        being 1. This boolean mask is True in locations which have been ablated
+        (and thus counted towards ablations for that feature) and False otherwise.
         """
-        current_mask = torch.stack(
-            [input_mask == j for j in range(start_feature, end_feature)], dim=0
-        ).long()
-        ablated_tensor = (feature_tensor * (1 - current_mask).float()) + (
-            baseline * current_mask.float()
-        )
+        # compares the mask with all features in the range at once, the k-th
+        # row of the result marks the locations of feature start_feature + k
+        feature_ids = torch.arange(
+            start_feature, end_feature, device=input_mask.device
+        ).reshape((-1,) + (1,) * input_mask.dim())
+        current_mask = input_mask.unsqueeze(0) == feature_ids
+        return self._ablate_masked(feature_tensor, current_mask, baseline)
+
+    def _ablate_masked(self, feature_tensor, current_mask, baseline):
+        r"""
+        Returns a copy of `feature_tensor`, in which the locations marked by the
+        boolean `current_mask`, which is broadcastable to `feature_tensor`, are
+        replaced by the corresponding values of `baseline`, and the mask.
+        """
+        # the ablated locations are written in place into a single copy of
+        # the feature tensor, which is shared by other evaluations
+        ablated_tensor = feature_tensor.clone()
+        expanded_mask = current_mask.expand_as(ablated_tensor)
+        if isinstance(baseline, torch.Tensor):
+            ablated_tensor[expanded_mask] = baseline.expand_as(ablated_tensor)[
+                expanded_mask
+            ].to(ablated_tensor.dtype)
+        else:
+            ablated_tensor.masked_fill_(expanded_mask, baseline)
         return ablated_tensor, current_mask
+
+    def _eval_coalitions(
+        self,
+        inputs,
+        baselines,
+        feature_mask,
+        added,
+        additional_forward_args,
+        target,
+    ):
+        r"""
+        Evaluates the forward function in one batch at the inputs, in which
+        the features of each coalition are kept and all other features are
+        replaced by the baselines. `added` is a boolean tensor with shape
+        (#coalitions, #features), and `feature_mask` numbers the features
+        jointly across all inputs, see `_joint_feature_mask`.
+        Returns the evaluations with shape (#coalitions, #examples) or
+        (#coalitions, 1) if the forward function returns a scalar per batch.
+        """
+        num_coalitions = added.shape[0]
+        coalition_inputs = []
+        for input, baseline, mask in zip(inputs, baselines, feature_mask):
+            # excluded: dim -> (#coalitions, #examples or 1, input.shape[1:])
+            excluded = ~added[:, mask]
+            coalition_input, _ = self._ablate_masked(
+                input.unsqueeze(0).expand((num_coalitions,) + input.shape),
+                excluded,
+                baseline,
+            )
+            coalition_inputs.append(coalition_input.reshape((-1,) + input.shape[1:]))
+        modified_eval = _run_forward(
+            self.forward_func,
+            tuple(coalition_inputs),
+            _expand_target(target, num_coalitions),
+            _expand_additional_forward_args(additional_forward_args, num_coalitions)
+            if additional_forward_args is not None
+            else None,
+        )
+        return torch.as_tensor(modified_eval).reshape(num_coalitions, -1)
+
+
+def _joint_feature_mask(inputs, feature_mask):
+    r"""
+    Returns the feature mask for all inputs, in which the features are
+    numbered consecutively from 0 across all input tensors, and the number
+    of features. If `feature_mask` is None, each scalar of an input example
+    is a separate feature.
+    """
+    if feature_mask is None:
+        feature_mask = []
+        num_features = 0
+        for input in inputs:
+            num_input_features = input[0].numel()
+            feature_mask.append(
+                torch.arange(
+                    num_features,
+                    num_features + num_input_features,
+                    device=input.device,
+                ).reshape(input[0:1].shape)
+            )
+            num_features += num_input_features
+        return tuple(feature_mask), num_features
+
+    # masks, which are broadcastable to the inputs, get the same number of
+    # dimensions as the inputs
+    feature_mask = tuple(
+        mask.reshape((1,) * (input.dim() - mask.dim()) + mask.shape)
+        for input, mask in zip(inputs, feature_mask)
+    )
+    feature_ids = torch.unique(torch.cat([mask.flatten() for mask in feature_mask]))
+    assert feature_ids[0].item() >= 0, "Feature mask values must be non-negative."
+    # relabels the features with consecutive indices
+    lookup = torch.zeros(
+        feature_ids[-1].item() + 1, dtype=torch.long, device=feature_ids.device
+    )
+    lookup[feature_ids] = torch.arange(len(feature_ids), device=feature_ids.device)
+    return tuple(lookup[mask] for mask in feature_mask), len(feature_ids)
+
+
+def _expand_feature_attrib(feature_attrib, inputs, feature_mask):
+    r"""
+    Maps the attributions of the features with shape (#examples or 1,
+    #features) to the locations of the inputs, given the joint feature mask
+    from `_joint_feature_mask`.
+    """
+    num_rows = feature_attrib.shape[0]
+    return tuple(
+        torch.gather(
+            feature_attrib,
+            1,
+            mask.expand((num_rows,) + input.shape[1:]).reshape(num_rows, -1),
+        ).reshape((num_rows,) + input.shape[1:])
+        for input, mask in zip(inputs, feature_mask)
+    )
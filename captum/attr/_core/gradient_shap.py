@@ -31,6 +31,7 @@ class GradientShap(GradientAttribution):
         target=None,
         additional_forward_args=None,
         return_convergence_delta=False,
+        sampler=None,
     ):
         r"""
         Implements gradient SHAP based on the implementation from SHAP's primary
@@ -165,6 +166,17 @@ class GradientShap(GradientAttribution):
                         is set to True convergence delta will be returned in
                         a tuple following attributions.
                         Default: False
+            sampler (Sampler, optional): The sampler, which draws the noise,
+                        the baselines from the baselines' distribution and the
+                        points on the paths between the baselines and the inputs,
+                        e.g. a `StratifiedSampler` or a quasi-Monte Carlo
+                        `SobolSampler`, which reach the same accuracy as
+                        independent samples with fewer `n_samples`.
+                        If None, independent samples are drawn with the global
+                        random number generators of torch and numpy, as in
+                        previous versions, which hence draw the same samples
+                        for the same seeds.
+                        Default: None
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
             - **attributions** (*tensor* or tuple of *tensors*):
@@ -221,6 +233,8 @@ class GradientShap(GradientAttribution):
             target=target,
             additional_forward_args=additional_forward_args,
             return_convergence_delta=return_convergence_delta,
+            nt_sampler=sampler,
+            sampler=sampler,
         )
 
         return attributions
@@ -246,16 +260,13 @@ class InputBaselineXGradient(GradientAttribution):
         target=None,
         additional_forward_args=None,
         return_convergence_delta=False,
+        sampler=None,
     ):
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
         is_inputs_tuple = isinstance(inputs, tuple)
 
-        rand_coefficient = torch.tensor(
-            np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
-            device=inputs[0].device,
-            dtype=inputs[0].dtype,
-        )
+        rand_coefficient = self._sample_coefficient(inputs, sampler)
 
         input_baseline_scaled = tuple(
             self._scale_input(input, baseline, rand_coefficient)
@@ -287,6 +298,18 @@ class InputBaselineXGradient(GradientAttribution):
     def has_convergence_delta(self):
         return True
 
+    def _sample_coefficient(self, inputs, sampler):
+        # draws the point on the path between baseline and input of each example
+        if sampler is None:
+            return torch.tensor(
+                np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
+                device=inputs[0].device,
+                dtype=inputs[0].dtype,
+            )
+        return sampler.uniform(
+            inputs[0].shape[0], (), device=inputs[0].device, dtype=inputs[0].dtype
+        )
+
     def _scale_input(self, input, baseline, rand_coefficient):
         # batch size
         bsz = input.shape[0]
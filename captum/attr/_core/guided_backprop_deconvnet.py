@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import warnings
 import torch
+from contextlib import contextmanager
 import torch.nn.functional as F
 
 from .._utils.attribution import GradientAttribution
@@ -18,6 +19,11 @@ class ModifiedReluGradientAttribution(GradientAttribution):
         GradientAttribution.__init__(self, model)
         self.model = model
         self.backward_hooks = []
+        # the ReLU modules of the model, indexed once
+        self._relu_modules = None
+        # True while an attribution is computed, otherwise the hooks are inactive
+        self._hooks_active = False
+        self._prepared = False
         self.use_relu_grad_output = use_relu_grad_output
         assert isinstance(self.model, torch.nn.Module), (
             "Given model must be an instance of torch.nn.Module to properly hook"
@@ -40,30 +46,43 @@ class ModifiedReluGradientAttribution(GradientAttribution):
         inputs = _format_input(inputs)
         gradient_mask = apply_gradient_requirements(inputs)
 
-        # set hooks for overriding ReLU gradients
-        warnings.warn(
-            "Setting backward hooks on ReLU activations."
-            "The hooks will be removed after the attribution is finished"
-        )
-
-        self.model.apply(self._register_hooks)
-
-        gradients = self.gradient_func(
-            self.forward_func, inputs, target, additional_forward_args
-        )
+        # set hooks for overriding ReLU gradients, unless they are already
+        # installed by `prepared_model`
+        if not self._prepared:
+            warnings.warn(
+                "Setting backward hooks on ReLU activations."
+                "The hooks will be removed after the attribution is finished"
+            )
+            self._register_hooks()
 
-        # remove set hooks
-        self._remove_hooks()
+        self._hooks_active = True
+        try:
+            gradients = self.gradient_func(
+                self.forward_func, inputs, target, additional_forward_args
+            )
+        finally:
+            self._hooks_active = False
+            # remove set hooks
+            if not self._prepared:
+                self._remove_hooks()
 
         undo_gradient_requirements(inputs, gradient_mask)
         return _format_attributions(is_inputs_tuple, gradients)
 
-    def _register_hooks(self, module):
-        if isinstance(module, torch.nn.ReLU):
+    def _register_hooks(self):
+        if self._relu_modules is None:
+            self._relu_modules = [
+                module
+                for module in self.model.modules()
+                if isinstance(module, torch.nn.ReLU)
+            ]
+        for module in self._relu_modules:
             hook = module.register_backward_hook(self._backward_hook)
             self.backward_hooks.append(hook)
 
     def _backward_hook(self, module, grad_input, grad_output):
+        if not self._hooks_active:
+            return None
         to_override_grads = grad_output if self.use_relu_grad_output else grad_input
         if isinstance(to_override_grads, tuple):
             return tuple(
@@ -75,6 +94,37 @@ class ModifiedReluGradientAttribution(GradientAttribution):
     def _remove_hooks(self):
         for hook in self.backward_hooks:
             hook.remove()
+        self.backward_hooks = []
+
+    @contextmanager
+    def prepared_model(self):
+        r"""
+        A context manager, which installs the backward hooks on the ReLU
+        modules of the model once, so that they are reused by all `attribute`
+        calls within the context instead of being registered and removed in
+        every call. The hooks only override gradients during `attribute`, so
+        the model can still be used as usual within the context, and they are
+        removed when the context exits.
+
+        The ReLU modules are indexed the first time the hooks are installed,
+        hence modules which are added to the model afterwards are not hooked.
+
+        Examples::
+
+            >>> net = ImageClassifier()
+            >>> gbp = GuidedBackprop(net)
+            >>> with gbp.prepared_model():
+            >>>     for input in inputs:
+            >>>         attribution = gbp.attribute(input, target=3)
+        """
+        assert not self._prepared, "The model has already been prepared."
+        self._register_hooks()
+        self._prepared = True
+        try:
+            yield self
+        finally:
+            self._prepared = False
+            self._remove_hooks()
 
 
 class GuidedBackprop(ModifiedReluGradientAttribution):
@@ -1,10 +1,23 @@
 #!/usr/bin/env python3
 import warnings
 
+import torch
+
 from .._utils.attribution import GradientAttribution, LayerAttribution
-from .._utils.common import _format_input, _format_attributions
+from .._utils.batching import _reduce_list, _sort_key_list
+from .._utils.common import (
+    _format_input,
+    _format_attributions,
+    _format_additional_forward_args,
+)
+from .._utils.gradient import (
+    apply_gradient_requirements,
+    undo_gradient_requirements,
+    _extract_device_ids,
+    _forward_layer_distributed_eval,
+)
 
-from .layer.grad_cam import LayerGradCam
+from .layer.grad_cam import LayerGradCam, _grad_cam
 from .guided_backprop_deconvnet import GuidedBackprop
 
 
@@ -57,6 +70,12 @@ class GuidedGradCam(GradientAttribution):
             which are spatially alligned with the chosen layer, e.g. an input
             image tensor for a convolutional layer.
 
+            Both attributions are computed from a single forward pass. The
+            gradients with respect to the layer are computed with the original
+            ReLU gradients, and the guided backprop gradients with respect to
+            the inputs are then computed from the same graph with the overridden
+            ReLU gradients.
+
             More details regarding GuidedGradCAM can be found in the original
             GradCAM paper here:
             https://arxiv.org/pdf/1610.02391.pdf
@@ -170,18 +189,31 @@ class GuidedGradCam(GradientAttribution):
         """
         is_inputs_tuple = isinstance(inputs, tuple)
         inputs = _format_input(inputs)
-        grad_cam_attr = self.grad_cam.attribute(
-            inputs=inputs,
-            target=target,
-            additional_forward_args=additional_forward_args,
-            attribute_to_layer_input=attribute_to_layer_input,
-            relu_attributions=True,
-        )
-        guided_backprop_attr = self.guided_backprop.attribute(
-            inputs=inputs,
-            target=target,
-            additional_forward_args=additional_forward_args,
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
         )
+        gradient_mask = apply_gradient_requirements(inputs)
+
+        # set hooks for overriding ReLU gradients, unless they are already
+        # installed by `prepared_model` of the guided backprop instance
+        guided_backprop = self.guided_backprop
+        if not guided_backprop._prepared:
+            warnings.warn(
+                "Setting backward hooks on ReLU activations."
+                "The hooks will be removed after the attribution is finished"
+            )
+            guided_backprop._register_hooks()
+        try:
+            layer_gradients, layer_eval, guided_backprop_attr = self._fused_gradients(
+                inputs, target, additional_forward_args, attribute_to_layer_input
+            )
+        finally:
+            guided_backprop._hooks_active = False
+            if not guided_backprop._prepared:
+                guided_backprop._remove_hooks()
+        undo_gradient_requirements(inputs, gradient_mask)
+
+        grad_cam_attr = _grad_cam(layer_gradients, layer_eval, relu_attributions=True)
         output_attr = []
         for i in range(len(inputs)):
             try:
@@ -201,3 +233,44 @@ class GuidedGradCam(GradientAttribution):
                 output_attr.append(None)
 
         return _format_attributions(is_inputs_tuple, tuple(output_attr))
+
+    def _fused_gradients(
+        self, inputs, target, additional_forward_args, attribute_to_layer_input
+    ):
+        r"""
+        Runs the forward function once with a hook on the GradCAM layer, and
+        returns the gradients of the output with respect to the layer, the
+        evaluation of the layer and the guided backprop gradients with respect
+        to the inputs. The ReLU backward hooks of the guided backprop instance
+        must be installed, and are activated only for the second backward pass.
+        """
+        with torch.autograd.set_grad_enabled(True):
+            saved_layer, output = _forward_layer_distributed_eval(
+                self.forward_func,
+                inputs,
+                self.grad_cam.layer,
+                target_ind=target,
+                additional_forward_args=additional_forward_args,
+                attribute_to_layer_input=attribute_to_layer_input,
+                forward_hook_with_return=True,
+            )
+            assert output[0].numel() == 1, (
+                "Target not provided when necessary, cannot"
+                " take gradient with respect to multiple outputs."
+            )
+            device_ids = _extract_device_ids(
+                self.forward_func, saved_layer, self.grad_cam.device_ids
+            )
+            key_list = _sort_key_list(list(saved_layer.keys()), device_ids)
+            layer_tensors = tuple(saved_layer[device_id] for device_id in key_list)
+            layer_eval = _reduce_list(list(layer_tensors))
+            # only backpropagates from the output to the layer with the original
+            # ReLU gradients, and keeps the graph for the guided backward pass
+            layer_gradients = torch.cat(
+                torch.autograd.grad(
+                    torch.unbind(output), layer_tensors, retain_graph=True
+                )
+            )
+            self.guided_backprop._hooks_active = True
+            guided_gradients = torch.autograd.grad(torch.unbind(output), inputs)
+        return layer_gradients, layer_eval, guided_gradients
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+import torch
+
+from .._utils.common import (
+    _format_attributions,
+    _format_input,
+    _format_input_baseline,
+    _format_additional_forward_args,
+)
+from .feature_ablation import FeatureAblation
+
+
+class HierarchicalFeatureAblation(FeatureAblation):
+    def __init__(self, forward_func, input_encoders=None, fusion_func=None):
+        r"""
+        Args:
+
+            forward_func (callable): The forward function of the model or
+                        any modification of it
+            input_encoders (list of callables, optional): The encoder of each
+                        input tensor, whose encodings of the unablated inputs
+                        are reused, see FeatureAblation.
+                        Default: None
+            fusion_func (callable, optional): The function, which computes
+                        the model output from the encodings of all input
+                        tensors, see FeatureAblation.
+                        Default: None
+        """
+        FeatureAblation.__init__(self, forward_func, input_encoders, fusion_func)
+
+    def attribute(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        top_k=None,
+        threshold=0.0,
+        branching_factor=2,
+        ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
+    ):
+        r"""
+        A group testing variant of feature ablation, which finds the most
+        important features without ablating each feature separately. The
+        features of each input tensor, ordered by their index in the feature
+        mask, are first ablated together as one contiguous group. Each group,
+        whose ablation changes the output by more than `threshold`, is split
+        into `branching_factor` contiguous groups, which are ablated in the
+        next round. If `top_k` is given, only the groups with the `top_k`
+        largest output changes in a round are split. The rounds end, when no
+        group is split anymore.
+
+        Every scalar of the input is given the output change of the smallest
+        evaluated group containing it. Features, which are reached as single
+        feature groups, have the exact FeatureAblation attributions, all
+        other features have the attribution of their group. For models, whose
+        output depends on only a few features, this takes roughly
+        O(top_k * log(#features)) instead of O(#features) evaluations.
+
+        As in FeatureAblation, the features of each input tensor are ablated
+        independently, and the forward function can either return a scalar
+        per example, or a single scalar for the full batch. The groups are
+        shared by all examples, and a group is split if the output change of
+        any example is large enough.
+
+        Args:
+
+                inputs (tensor or tuple of tensors):  Input for which ablation
+                            attributions are computed. If forward_func takes a single
+                            tensor as input, a single input tensor should be provided.
+                            If forward_func takes multiple tensors as input, a tuple
+                            of the input tensors should be provided. It is assumed
+                            that for all given input tensors, dimension 0 corresponds
+                            to the number of examples (aka batch size), and if
+                            multiple input tensors are provided, the examples must
+                            be aligned appropriately.
+                baselines (scalar, tensor, tuple of scalars or tensors, optional):
+                            Baselines define reference value which replaces each
+                            feature when ablated.
+                            Baselines can be provided as:
+                            - a single tensor, if inputs is a single tensor, with
+                                exactly the same dimensions as inputs or
+                                broadcastable to match the dimensions of inputs
+                            - a single scalar, if inputs is a single tensor, which will
+                                be broadcasted for each input value in input tensor.
+                            - a tuple of tensors or scalars, the baseline corresponding
+                                to each tensor in the inputs' tuple can be:
+                                - either a tensor with
+                                    exactly the same dimensions as inputs or
+                                    broadcastable to match the dimensions of inputs
+                                - or a scalar, corresponding to a tensor in the
+                                    inputs' tuple. This scalar value is broadcasted
+                                    for corresponding input tensor.
+                            In the cases when `baselines` is not provided, we internally
+                            use zero scalar corresponding to each input tensor.
+                            Default: None
+                target (int, tuple, tensor or list, optional):  Output indices for
+                            which difference is computed (for classification cases,
+                            this is usually the target class).
+                            If the network returns a scalar value per example,
+                            no target index is necessary.
+                            For general 2D outputs, targets can be either:
+
+                            - a single integer or a tensor containing a single
+                                integer, which is applied to all input examples
+
+                            - a list of integers or a 1D tensor, with length matching
+                                the number of examples in inputs (dim 0). Each integer
+                                is applied as the target for the corresponding example.
+
+                            For outputs with > 2 dimensions, targets can be either:
+
+                            - A single tuple, which contains #output_dims - 1
+                                elements. This target index is applied to all examples.
+
+                            - A list of tuples with length equal to the number of
+                                examples in inputs (dim 0), and each tuple containing
+                                #output_dims - 1 elements. Each tuple is applied as the
+                                target for the corresponding example.
+
+                            Default: None
+                additional_forward_args (tuple, optional): If the forward function
+                            requires additional arguments other than the inputs for
+                            which attributions should not be computed, this argument
+                            can be provided. It must be either a single additional
+                            argument of a Tensor or arbitrary (non-tuple) type or a
+                            tuple containing multiple additional arguments including
+                            tensors or any arbitrary python types. These arguments
+                            are provided to forward_func in order following the
+                            arguments in inputs.
+                            For a tensor, the first dimension of the tensor must
+                            correspond to the number of examples. For all other types,
+                            the given argument is used for all forward evaluations.
+                            Note that attributions are not computed with respect
+                            to these arguments.
+                            Default: None
+                feature_mask (tensor or tuple of tensors, optional):
+                            feature_mask defines a mask for the input, grouping
+                            features which should be ablated together, as in
+                            FeatureAblation. The groups of the search consist of
+                            the features with consecutive indices, hence features,
+                            which are likely to be similarly important, should
+                            have close indices.
+                            If None, then a feature mask is constructed which assigns
+                            each scalar within a tensor as a separate feature, in
+                            row-major order.
+                            Default: None
+                top_k (int, optional): The maximum number of groups of each input
+                            tensor, which are split in each round. If None, all
+                            groups above the threshold are split.
+                            Default: None
+                threshold (float, optional): Groups, whose ablation changes the
+                            output by at most `threshold` in absolute value for
+                            all examples, are not split.
+                            Default: 0.0
+                branching_factor (int, optional): The number of groups, into
+                            which a group is split.
+                            Default: 2
+                ablations_per_eval (int, optional): Allows ablation of multiple
+                            groups of a round to be processed simultaneously in
+                            one call to forward_fn.
+                            Each forward pass will contain a maximum of
+                            ablations_per_eval * #examples samples.
+                            For DataParallel models, each batch is split among the
+                            available devices, so evaluations on each available
+                            device contain at most
+                            (ablations_per_eval * #examples) / num_devices
+                            samples.
+                            If the forward function returns a single scalar per batch,
+                            ablations_per_eval must be set to 1.
+                            Default: 1
+                executor (concurrent.futures.Executor, optional): If given, the
+                            ablated batches are evaluated by submitting the forward
+                            function to this executor, see FeatureAblation.
+                            Default: None
+                max_pending (int, optional): The maximum number of ablated
+                            batches pending in the executor, see FeatureAblation.
+                            Default: None
+
+        Returns:
+                *tensor* or tuple of *tensors* of **attributions**:
+                - **attributions** (*tensor* or tuple of *tensors*):
+                            The attributions with respect to each input feature,
+                            or its smallest evaluated group.
+                            If the forward function returns
+                            a scalar value per example, attributions will be
+                            the same size as the provided inputs, with each value
+                            providing the attribution of the corresponding input index.
+                            If the forward function returns a scalar per batch, then
+                            attribution tensor(s) will have first dimension 1 and
+                            the remaining dimensions will match the input.
+                            If a single tensor is provided as inputs, a single tensor is
+                            returned. If a tuple is provided for inputs, a tuple of
+                            corresponding sized tensors is returned.
+
+        Examples::
+
+            >>> # SimpleClassifier takes a single input tensor of size Nx10000,
+            >>> # and returns an Nx3 tensor of class probabilities.
+            >>> net = SimpleClassifier()
+            >>> input = torch.randn(2, 10000)
+            >>> # Defining HierarchicalFeatureAblation interpreter
+            >>> ablator = HierarchicalFeatureAblation(net)
+            >>> # Computes the exact ablation attributions of the (at most)
+            >>> # 20 most important features, ablating 64 groups at a time.
+            >>> attr = ablator.attribute(input, target=1, top_k=20,
+            >>>                          ablations_per_eval=64)
+        """
+        # Keeps track whether original input is a tuple or not before
+        # converting it into a tuple.
+        is_inputs_tuple = isinstance(inputs, tuple)
+        inputs, baselines = _format_input_baseline(inputs, baselines)
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
+        )
+        num_examples = inputs[0].shape[0]
+        feature_mask = _format_input(feature_mask) if feature_mask is not None else None
+        assert (
+            isinstance(ablations_per_eval, int) and ablations_per_eval >= 1
+        ), "Ablations per evaluation must be at least 1."
+        assert top_k is None or (
+            isinstance(top_k, int) and top_k >= 1
+        ), "top_k must be None or at least 1."
+        assert (
+            isinstance(branching_factor, int) and branching_factor >= 2
+        ), "The branching factor must be at least 2."
+        assert max_pending is None or (
+            isinstance(max_pending, int) and max_pending >= 1
+        ), "max_pending must be None or at least 1."
+
+        encodings = self._encode_inputs(inputs)
+        initial_eval = self._run_ablation_forward(
+            inputs, target, additional_forward_args, encodings
+        )
+        single_output_mode, initial_eval = self._check_output_mode(
+            initial_eval, num_examples, ablations_per_eval, feature_mask
+        )
+        initial_eval = torch.as_tensor(initial_eval).reshape(1, -1)
+
+        attrib = []
+        for i in range(len(inputs)):
+            min_feature, num_features, input_mask = self._get_feature_range_and_mask(
+                inputs[i], None if feature_mask is None else feature_mask[i]
+            )
+            input_attrib = torch.zeros_like(
+                inputs[i][0:1] if single_output_mode else inputs[i]
+            )
+            # each group is the range of feature indices [start, end)
+            groups = [(min_feature, num_features)]
+            while len(groups) > 0:
+                group_bounds = torch.tensor(groups, device=input_mask.device)
+                group_evals = []
+                ablations = self._ablation_generator(
+                    i,
+                    inputs,
+                    additional_forward_args,
+                    target,
+                    baselines,
+                    input_mask,
+                    0,
+                    len(groups),
+                    ablations_per_eval,
+                    group_bounds=group_bounds,
+                )
+                for current_mask, modified_eval in self._evaluate_ablations(
+                    ablations, encodings, i, executor, max_pending
+                ):
+                    # eval_diff dimensions: (#groups in batch, #examples or 1)
+                    eval_diff = initial_eval - torch.as_tensor(modified_eval).reshape(
+                        -1, initial_eval.shape[1]
+                    )
+                    group_evals.append(eval_diff)
+                    # the groups of a round are disjoint, and their values
+                    # replace the values of their parent group
+                    eval_diff = eval_diff.reshape(
+                        eval_diff.shape + (inputs[i].dim() - 1) * (1,)
+                    )
+                    input_attrib = torch.where(
+                        current_mask.any(dim=0),
+                        (eval_diff * current_mask).sum(dim=0).to(input_attrib.dtype),
+                        input_attrib,
+                    )
+                groups = self._split_groups(
+                    group_bounds,
+                    torch.cat(group_evals).abs().max(dim=1)[0],
+                    top_k,
+                    threshold,
+                    branching_factor,
+                )
+            attrib.append(input_attrib)
+        return _format_attributions(is_inputs_tuple, tuple(attrib))
+
+    def _split_groups(
+        self, group_bounds, importance, top_k, threshold, branching_factor
+    ):
+        r"""
+        Returns the groups of the next round as a list of feature ranges,
+        given the feature ranges of the groups of the current round with
+        shape (#groups, 2) and the largest absolute output change of each
+        group with shape (#groups,).
+        """
+        selected = (importance > threshold) & (
+            group_bounds[:, 1] - group_bounds[:, 0] > 1
+        )
+        if top_k is not None and len(importance) > top_k:
+            ranked = torch.zeros_like(selected)
+            ranked[importance.topk(top_k)[1]] = True
+            selected = selected & ranked
+        groups = []
+        for start, end in group_bounds[selected].tolist():
+            splits = sorted(
+                set(
+                    start + (end - start) * k // branching_factor
+                    for k in range(branching_factor + 1)
+                )
+            )
+            groups.extend(zip(splits[:-1], splits[1:]))
+        return groups
+
+    def _construct_ablated_input(
+        self,
+        feature_tensor,
+        input_mask,
+        baseline,
+        start_feature,
+        end_feature,
+        group_bounds,
+        **kwargs
+    ):
+        r"""
+        Ablates the given feature tensor with the groups start_feature to
+        end_feature - 1, where `group_bounds` with shape (#groups, 2) contains
+        the range of feature indices of each group. feature_tensor shape is
+        (`num_groups`, `num_examples`, ...), where `num_groups` =
+        `end_feature` - `start_feature`.
+        """
+        bounds = group_bounds[start_feature:end_feature].reshape(
+            (-1, 2) + (1,) * input_mask.dim()
+        )
+        current_mask = (input_mask.unsqueeze(0) >= bounds[:, 0]) & (
+            input_mask.unsqueeze(0) < bounds[:, 1]
+        )
+        return self._ablate_masked(feature_tensor, current_mask, baseline)
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
-from .._utils.common import _format_input, _format_attributions
+from .._utils.common import (
+    _format_input,
+    _format_attributions,
+    _format_multi_targets,
+    _validate_target,
+)
 from .._utils.attribution import GradientAttribution
-from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
+from .._utils.gradient import (
+    apply_gradient_requirements,
+    compute_multi_target_gradients,
+    undo_gradient_requirements,
+)
 
 
 class InputXGradient(GradientAttribution):
@@ -14,7 +23,9 @@ class InputXGradient(GradientAttribution):
         """
         GradientAttribution.__init__(self, forward_func)
 
-    def attribute(self, inputs, target=None, additional_forward_args=None):
+    def attribute(
+        self, inputs, target=None, additional_forward_args=None, targets=None
+    ):
         r""""
         A baseline approach for computing the attribution. It multiplies input with
         the gradient with respect to input.
@@ -67,6 +78,19 @@ class InputXGradient(GradientAttribution):
                         Note that attributions are not computed with respect
                         to these arguments.
                         Default: None
+            targets (list or tensor, optional): Multiple output indices for
+                        which input x gradients are computed at once, instead
+                        of a single `target`. It can be either a list of targets,
+                        each of which can be any `target` described above, or
+                        a 2D tensor of size (#examples, #targets) containing one
+                        target per example in each column. The forward pass is
+                        run only once for all targets and the gradients of all
+                        selected outputs are computed with batched
+                        vector-Jacobian products. If `targets` is provided,
+                        attributions have an additional dimension of size
+                        #targets following the first (examples) dimension. It
+                        cannot be used together with `target`.
+                        Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -78,6 +102,9 @@ class InputXGradient(GradientAttribution):
                             If a single tensor is provided as inputs, a single tensor is
                             returned. If a tuple is provided for inputs, a tuple of
                             corresponding sized tensors is returned.
+                            If `targets` is provided, each attribution tensor has
+                            an additional dimension of size #targets following
+                            the first dimension.
 
 
         Examples::
@@ -91,6 +118,9 @@ class InputXGradient(GradientAttribution):
             >>> input_x_gradient = InputXGradient(net)
             >>> # Computes inputXgradient for class 4.
             >>> attribution = input_x_gradient.attribute(input, target=4)
+            >>> # Computes inputXgradient for classes 4 and 7 with a single
+            >>> # forward pass, attribution is of size 2x2x3x32x32.
+            >>> attribution = input_x_gradient.attribute(input, targets=[4, 7])
         """
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
@@ -99,12 +129,25 @@ class InputXGradient(GradientAttribution):
         inputs = _format_input(inputs)
         gradient_mask = apply_gradient_requirements(inputs)
 
-        gradients = self.gradient_func(
-            self.forward_func, inputs, target, additional_forward_args
-        )
-
-        attributions = tuple(
-            input * gradient for input, gradient in zip(inputs, gradients)
-        )
+        if targets is not None:
+            assert target is None, "`targets` cannot be used together with `target`."
+            targets = _format_multi_targets(targets)
+            for target_ind in targets:
+                _validate_target(inputs[0].shape[0], target_ind)
+            # gradients: dim -> (#examples x #targets x inputs[0].shape[1:], ...)
+            gradients = compute_multi_target_gradients(
+                self.forward_func, inputs, targets, additional_forward_args
+            )
+            attributions = tuple(
+                input.unsqueeze(1) * gradient
+                for input, gradient in zip(inputs, gradients)
+            )
+        else:
+            gradients = self.gradient_func(
+                self.forward_func, inputs, target, additional_forward_args
+            )
+            attributions = tuple(
+                input * gradient for input, gradient in zip(inputs, gradients)
+            )
         undo_gradient_requirements(inputs, gradient_mask)
         return _format_attributions(is_inputs_tuple, attributions)
@@ -1,18 +1,33 @@
 #!/usr/bin/env python3
 import torch
+from functools import partial
 
-from .._utils.approximation_methods import approximation_parameters
-from .._utils.batching import _batched_operator
+from .._utils.approximation_methods import quadrature_parameters
+from .._utils.batching import (
+    _auto_internal_batch_size,
+    _batched_path_generator,
+    _call_with_batch_size_backoff,
+    _select_examples,
+    _select_target,
+    _endpoint_steps,
+    _store_endpoint_outputs,
+)
 from .._utils.common import (
     _validate_input,
     _format_additional_forward_args,
     _format_attributions,
     _format_input_baseline,
-    _reshape_and_sum,
-    _expand_additional_forward_args,
-    _expand_target,
+    _sum_by_example,
+    _sum_rows,
+    _ForwardOutputRecorder,
+    _format_multi_targets,
+    _run_forward,
+    _select_multi_targets,
+    _tensorize_baseline,
+    _validate_target,
 )
 from .._utils.attribution import GradientAttribution
+from .._utils.gradient import compute_multi_target_gradients
 
 
 class IntegratedGradients(GradientAttribution):
@@ -35,6 +50,10 @@ class IntegratedGradients(GradientAttribution):
         method="gausslegendre",
         internal_batch_size=None,
         return_convergence_delta=False,
+        convergence_delta_tolerance=None,
+        max_n_steps=1024,
+        targets=None,
+        memory_budget_bytes=None,
     ):
         r"""
             Approximates the integral of gradients along the path from a baseline input
@@ -129,21 +148,74 @@ class IntegratedGradients(GradientAttribution):
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
                             `riemann_trapezoid` or `gausslegendre`.
                             Default: `gausslegendre` if no method is provided.
-                internal_batch_size (int, optional): Divides total #steps * #examples
-                            data points into chunks of size internal_batch_size,
-                            which are computed (forward / backward passes)
-                            sequentially.
+                internal_batch_size (int or string, optional): Divides total
+                            #steps * #examples data points into chunks of size
+                            internal_batch_size, which are computed (forward /
+                            backward passes) sequentially.
                             For DataParallel models, each batch is split among the
                             available devices, so evaluations on each available
                             device contain internal_batch_size / num_devices examples.
                             If internal_batch_size is None, then all evaluations are
                             processed in one batch.
+                            Scaled inputs are constructed lazily for each chunk and
+                            gradients are accumulated per example, so that peak
+                            memory scales with internal_batch_size rather than
+                            with #steps * #examples.
+                            If internal_batch_size is `auto`, the largest chunk
+                            size which fits into `memory_budget_bytes` is chosen
+                            by measuring the memory needed per data point on a
+                            few data points. If a chunk nevertheless fails to
+                            allocate memory, the chunk size is halved and the
+                            computation is retried.
                             Default: None
                 return_convergence_delta (bool, optional): Indicates whether to return
                             convergence delta or not. If `return_convergence_delta`
                             is set to True convergence delta will be returned in
                             a tuple following attributions.
                             Default: False
+                convergence_delta_tolerance (float, optional): If provided, the
+                            integral is refined adaptively per example until the
+                            absolute convergence delta of the example is at most
+                            `convergence_delta_tolerance`. The refinement starts
+                            with `n_steps` points and repeatedly halves the
+                            trapezoid intervals of the examples that have not
+                            converged yet, reusing all previously evaluated
+                            gradients. This requires `method` to be
+                            `riemann_trapezoid` and `n_steps` to be at least 2.
+                            Note that, unlike the non-adaptive
+                            `riemann_trapezoid` method, the points are spaced
+                            1 / (#steps - 1) apart, so that both endpoints of the
+                            path are included with the exact trapezoid weights.
+                            Default: None
+                max_n_steps (int, optional): Used only if
+                            `convergence_delta_tolerance` is provided. The maximum
+                            number of steps evaluated for any example. Refinement
+                            of an example stops if halving its intervals would
+                            exceed this number of steps, even if the tolerance
+                            is not met.
+                            Default: 1024
+                targets (list or tensor, optional): Multiple output indices for
+                            which integrated gradients are computed at once,
+                            instead of a single `target`. It can be either a list
+                            of targets, each of which can be any `target`
+                            described above, or a 2D tensor of size
+                            (#examples, #targets) containing one target per
+                            example in each column. The forward pass at each
+                            point of the path is run only once for all targets
+                            and the gradients of all selected outputs are
+                            computed with batched vector-Jacobian products.
+                            If `targets` is provided, attributions and delta
+                            have an additional dimension of size #targets
+                            following the first (examples) dimension. It cannot
+                            be used together with `target` or
+                            `convergence_delta_tolerance`.
+                            Default: None
+                memory_budget_bytes (int, optional): Used only if
+                            `internal_batch_size` is `auto`. The number of bytes
+                            of memory which the forward and backward passes of
+                            each chunk may use. If None, half of the memory that
+                            is currently free on the device of inputs is used.
+                            Default: None
             Returns:
                 **attributions** or 2-element tuple of **attributions**, **delta**:
                 - **attributions** (*tensor* or tuple of *tensors*):
@@ -154,6 +226,9 @@ class IntegratedGradients(GradientAttribution):
                         If a single tensor is provided as inputs, a single tensor is
                         returned. If a tuple is provided for inputs, a tuple of
                         corresponding sized tensors is returned.
+                        If `targets` is provided, each attribution tensor has
+                        an additional dimension of size #targets following the
+                        first dimension.
                 - **delta** (*tensor*, returned if return_convergence_delta=True):
                         The difference between the total approximated and true
                         integrated gradients. This is computed using the property
@@ -162,7 +237,8 @@ class IntegratedGradients(GradientAttribution):
                         integrated gradient.
                         Delta is calculated per example, meaning that the number of
                         elements in returned delta tensor is equal to the number of
-                        of examples in inputs.
+                        of examples in inputs. If `targets` is provided, delta has
+                        size (#examples x #targets).
 
             Examples::
 
@@ -173,6 +249,9 @@ class IntegratedGradients(GradientAttribution):
                 >>> input = torch.randn(2, 3, 32, 32, requires_grad=True)
                 >>> # Computes integrated gradients for class 3.
                 >>> attribution = ig.attribute(input, target=3)
+                >>> # Computes integrated gradients for classes 3 and 5 at once,
+                >>> # attribution is of size 2x2x3x32x32.
+                >>> attribution = ig.attribute(input, targets=[3, 5])
         """
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
@@ -181,61 +260,97 @@ class IntegratedGradients(GradientAttribution):
         inputs, baselines = _format_input_baseline(inputs, baselines)
 
         _validate_input(inputs, baselines, n_steps, method)
-
-        # retrieve step size and scaling factor for specified approximation method
-        step_sizes_func, alphas_func = approximation_parameters(method)
-        step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
-
-        # scale features and compute gradients. (batch size is abbreviated as bsz)
-        # scaled_features' dim -> (bsz * #steps x inputs[0].shape[1:], ...)
-        scaled_features_tpl = tuple(
-            torch.cat(
-                [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
-            ).requires_grad_()
-            for input, baseline in zip(inputs, baselines)
-        )
+        if targets is not None:
+            assert target is None and convergence_delta_tolerance is None, (
+                "`targets` cannot be used together with `target` or"
+                " `convergence_delta_tolerance`."
+            )
+            targets = _format_multi_targets(targets)
+            for target_ind in targets:
+                _validate_target(inputs[0].shape[0], target_ind)
+        if convergence_delta_tolerance is not None:
+            assert method == "riemann_trapezoid" and n_steps >= 2, (
+                "Adaptive refinement with `convergence_delta_tolerance` is only"
+                " supported for the `riemann_trapezoid` method with `n_steps` of"
+                " at least 2. Given {} with {} steps".format(method, n_steps)
+            )
 
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
-        # apply number of steps to additional forward args
-        # currently, number of steps is applied only to additional forward arguments
-        # that are nd-tensors. It is assumed that the first dimension is
-        # the number of batches.
-        # dim -> (bsz * #steps x additional_forward_args[0].shape[1:], ...)
-        input_additional_args = (
-            _expand_additional_forward_args(additional_forward_args, n_steps)
-            if additional_forward_args is not None
-            else None
-        )
-        expanded_target = _expand_target(target, n_steps)
 
-        # grads: dim -> (bsz * #steps x inputs[0].shape[1:], ...)
-        grads = _batched_operator(
-            self.gradient_func,
-            scaled_features_tpl,
-            input_additional_args,
-            internal_batch_size=internal_batch_size,
-            forward_fn=self.forward_func,
-            target_ind=expanded_target,
+        # retrieve step size and scaling factor for specified approximation method
+        step_sizes, alphas = quadrature_parameters(
+            method,
+            n_steps,
+            dtype=inputs[0].dtype if inputs[0].is_floating_point() else None,
+            device=inputs[0].device,
         )
 
-        # flattening grads so that we can multilpy it with step-size
-        # calling contiguous to avoid `memory whole` problems
-        scaled_grads = [
-            grad.contiguous().view(n_steps, -1)
-            * torch.tensor(step_sizes).view(n_steps, 1).to(grad.device)
-            for grad in grads
-        ]
+        auto_batch_size = internal_batch_size == "auto"
+        if auto_batch_size:
+            # memory per point does not depend on the position on the path,
+            # hence the points of the approximation method are used for probing
+            # even if the integral is refined adaptively.
+            internal_batch_size = _auto_internal_batch_size(
+                partial(self._chunk_gradients, self.forward_func, targets),
+                inputs,
+                baselines,
+                alphas,
+                additional_forward_args,
+                target,
+                memory_budget_bytes,
+            )
+
+        if convergence_delta_tolerance is not None:
+            attributions, delta = self._adaptive_attribute(
+                inputs,
+                baselines,
+                target,
+                additional_forward_args,
+                n_steps,
+                internal_batch_size,
+                convergence_delta_tolerance,
+                max_n_steps,
+                backoff=auto_batch_size,
+            )
+            if return_convergence_delta:
+                return _format_attributions(is_inputs_tuple, attributions), delta
+            return _format_attributions(is_inputs_tuple, attributions)
 
-        # aggregates across all steps for each tensor in the input tuple
         # total_grads has the same dimensionality as inputs
-        total_grads = [
-            _reshape_and_sum(
-                scaled_grad, n_steps, grad.shape[0] // n_steps, grad.shape[1:]
+        # If the convergence delta is required, the outputs at the endpoints of
+        # the path, if they are part of it, are recorded during the same pass.
+        total_grads, endpoint_outputs = self._sum_path_gradients(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            alphas,
+            step_sizes,
+            internal_batch_size,
+            record_endpoints=return_convergence_delta,
+            targets=targets,
+            backoff=auto_batch_size,
+        )
+
+        if targets is not None:
+            # total_grads: dim -> (#examples x #targets x inputs[0].shape[1:], ...)
+            attributions = tuple(
+                total_grad * (input - baseline).unsqueeze(1)
+                for total_grad, input, baseline in zip(total_grads, inputs, baselines)
             )
-            for (scaled_grad, grad) in zip(scaled_grads, grads)
-        ]
+            if return_convergence_delta:
+                delta = self._multi_target_convergence_delta(
+                    attributions,
+                    baselines,
+                    inputs,
+                    additional_forward_args,
+                    targets,
+                    endpoint_outputs,
+                )
+                return _format_attributions(is_inputs_tuple, attributions), delta
+            return _format_attributions(is_inputs_tuple, attributions)
 
         # computes attribution for each tensor in input tuple
         # attributions has the same dimensionality as inputs
@@ -252,9 +367,311 @@ class IntegratedGradients(GradientAttribution):
                 end_point,
                 additional_forward_args=additional_forward_args,
                 target=target,
+                start_point_output=endpoint_outputs[0],
+                end_point_output=endpoint_outputs[1],
             )
             return _format_attributions(is_inputs_tuple, attributions), delta
         return _format_attributions(is_inputs_tuple, attributions)
 
     def has_convergence_delta(self):
         return True
+
+    def _sum_path_gradients(
+        self,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        alphas,
+        weights,
+        internal_batch_size,
+        record_endpoints=False,
+        targets=None,
+        backoff=False,
+    ):
+        r"""
+        Sums the gradients at the points `baseline + alpha * (input - baseline)`
+        for all given `alphas`, each scaled by the corresponding element of
+        `weights`, per example. The scaled inputs are constructed lazily, one
+        chunk of at most `internal_batch_size` points at a time, so that peak
+        memory scales with `internal_batch_size` rather than #steps * #examples.
+
+        Returns the summed gradients and a list containing the summed outputs
+        of the forward function at the baselines and at the inputs. These are
+        only recorded if `record_endpoints` is True and if the corresponding
+        alpha, 0 or 1, is part of `alphas`, otherwise they are None.
+
+        If `targets` is provided, the gradients of all targets are computed
+        from a single forward pass per chunk, the summed gradients have size
+        (#examples x #targets x ...) and the recorded outputs have size
+        (#examples x #targets).
+
+        If `backoff` is True, the pass is retried with halved
+        `internal_batch_size` whenever a chunk fails to allocate memory.
+        """
+        if backoff:
+            return _call_with_batch_size_backoff(
+                lambda batch_size: self._sum_path_gradients(
+                    inputs,
+                    baselines,
+                    target,
+                    additional_forward_args,
+                    alphas,
+                    weights,
+                    batch_size,
+                    record_endpoints=record_endpoints,
+                    targets=targets,
+                ),
+                internal_batch_size,
+            )
+        num_examples = inputs[0].shape[0]
+        total_grads = [None] * len(inputs)
+        endpoint_outputs = [None, None]
+        endpoint_steps = _endpoint_steps(alphas)
+        forward_fn = (
+            _ForwardOutputRecorder(self.forward_func)
+            if record_endpoints
+            else self.forward_func
+        )
+        for (
+            scaled_features_tpl,
+            input_additional_args,
+            target_ind,
+            step_ids,
+            example_ids,
+        ) in _batched_path_generator(
+            inputs,
+            baselines,
+            alphas,
+            additional_forward_args,
+            target,
+            internal_batch_size,
+        ):
+            grads = self._chunk_gradients(
+                forward_fn,
+                targets,
+                scaled_features_tpl,
+                input_additional_args,
+                target_ind,
+                step_ids,
+                example_ids,
+            )
+            with torch.no_grad():
+                if record_endpoints:
+                    if targets is not None:
+                        output = _select_multi_targets(
+                            forward_fn.pop(),
+                            [
+                                _select_target(target_k, example_ids)
+                                for target_k in targets
+                            ],
+                        )
+                    else:
+                        output = forward_fn.pop(target_ind)
+                    endpoint_outputs = _store_endpoint_outputs(
+                        endpoint_outputs,
+                        endpoint_steps,
+                        output,
+                        step_ids,
+                        example_ids,
+                        num_examples,
+                        sum_rows=targets is None,
+                    )
+                total_grads = [
+                    _sum_by_example(
+                        total_grad,
+                        grad,
+                        example_ids,
+                        num_examples,
+                        weights[step_ids],
+                    )
+                    for total_grad, grad in zip(total_grads, grads)
+                ]
+        return total_grads, endpoint_outputs
+
+    def _chunk_gradients(
+        self,
+        forward_fn,
+        targets,
+        scaled_features_tpl,
+        input_additional_args,
+        target_ind,
+        step_ids,
+        example_ids,
+    ):
+        r"""
+        Computes the gradients at the points of a chunk yielded by
+        `_batched_path_generator`, with respect to `target_ind` or, if
+        `targets` is provided, with respect to each of `targets`.
+        """
+        if targets is not None:
+            # grads: dim -> (chunk size x #targets x inputs[0].shape[1:], ...)
+            return compute_multi_target_gradients(
+                forward_fn,
+                scaled_features_tpl,
+                [_select_target(target_k, example_ids) for target_k in targets],
+                input_additional_args,
+            )
+        # grads: dim -> (chunk size x inputs[0].shape[1:], ...)
+        return self.gradient_func(
+            forward_fn=forward_fn,
+            inputs=scaled_features_tpl,
+            target_ind=target_ind,
+            additional_forward_args=input_additional_args,
+        )
+
+    def _multi_target_convergence_delta(
+        self,
+        attributions,
+        start_point,
+        end_point,
+        additional_forward_args,
+        targets,
+        endpoint_outputs,
+    ):
+        r"""
+        Computes the convergence delta for each of `targets`, returning a tensor
+        of size (#examples x #targets). Outputs at the endpoints which were not
+        recorded during the attribution pass are computed with a single forward
+        pass for all targets.
+        """
+        with torch.no_grad():
+            endpoint_outputs = [
+                _select_multi_targets(
+                    _run_forward(
+                        self.forward_func, point, None, additional_forward_args
+                    ),
+                    targets,
+                )
+                if output is None
+                else output
+                for output, point in zip(
+                    endpoint_outputs,
+                    (_tensorize_baseline(end_point, start_point), end_point),
+                )
+            ]
+        return torch.stack(
+            [
+                self.compute_convergence_delta(
+                    tuple(attribution[:, k] for attribution in attributions),
+                    start_point,
+                    end_point,
+                    additional_forward_args=additional_forward_args,
+                    target=target_k,
+                    start_point_output=endpoint_outputs[0][:, k],
+                    end_point_output=endpoint_outputs[1][:, k],
+                )
+                for k, target_k in enumerate(targets)
+            ],
+            dim=1,
+        )
+
+    def _adaptive_attribute(
+        self,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        n_steps,
+        internal_batch_size,
+        convergence_delta_tolerance,
+        max_n_steps,
+        backoff=False,
+    ):
+        r"""
+        Computes integrated gradients with a nested trapezoid rule, which is
+        refined per example until the convergence delta of the example is within
+        `convergence_delta_tolerance` or `max_n_steps` would be exceeded.
+
+        With `m` intervals, the trapezoid estimate of the integral is the sum of
+        the gradients at all `m + 1` points, with the two endpoints weighted by
+        1/2, divided by `m`. Halving the intervals only adds the `m` midpoints
+        with weight 1, hence the weighted sum of the gradients evaluated so far
+        is reused and only the midpoints of unconverged examples are evaluated.
+        """
+        num_examples = inputs[0].shape[0]
+
+        def _select_rows(tensors, ids):
+            # scalars and single-example baselines are broadcasted as they are
+            return tuple(
+                tensor.index_select(0, ids.to(tensor.device))
+                if isinstance(tensor, torch.Tensor) and tensor.shape[0] > 1
+                else tensor
+                for tensor in tensors
+            )
+
+        def _attributions(ids, grad_sums, num_intervals):
+            return tuple(
+                (grad_sum / num_intervals) * (input - baseline)
+                for grad_sum, input, baseline in zip(
+                    grad_sums, _select_rows(inputs, ids), _select_rows(baselines, ids)
+                )
+            )
+
+        def _delta(ids, attributions):
+            attr_sum = sum(_sum_rows(attribution) for attribution in attributions)
+            return attr_sum - output_diff[ids.to(output_diff.device)]
+
+        num_intervals = n_steps - 1
+        weights = torch.ones(n_steps)
+        weights[0] = weights[-1] = 0.5
+        # weighted sums of the gradients at all points evaluated so far.
+        # The initial points include both endpoints, hence their outputs, which
+        # are needed for the convergence delta, are recorded during the same pass.
+        grad_sums, (start_output, end_output) = self._sum_path_gradients(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            [step / num_intervals for step in range(n_steps)],
+            weights,
+            internal_batch_size,
+            record_endpoints=True,
+            backoff=backoff,
+        )
+        output_diff = end_output - start_output
+        example_intervals = torch.full((num_examples,), num_intervals)
+        ids = torch.arange(num_examples)
+        with torch.no_grad():
+            delta = _delta(ids, _attributions(ids, grad_sums, num_intervals))
+        active = ids[delta.abs().cpu() > convergence_delta_tolerance]
+
+        while len(active) > 0 and 2 * num_intervals + 1 <= max_n_steps:
+            midpoints = [(step + 0.5) / num_intervals for step in range(num_intervals)]
+            mid_grad_sums, _ = self._sum_path_gradients(
+                _select_rows(inputs, active),
+                _select_rows(baselines, active),
+                _select_target(target, active),
+                _select_examples(additional_forward_args, active),
+                midpoints,
+                torch.ones(num_intervals),
+                internal_batch_size,
+                backoff=backoff,
+            )
+            num_intervals *= 2
+            with torch.no_grad():
+                for grad_sum, mid_grad_sum in zip(grad_sums, mid_grad_sums):
+                    grad_sum.index_add_(0, active.to(grad_sum.device), mid_grad_sum)
+                example_intervals[active] = num_intervals
+                active_grad_sums = tuple(
+                    grad_sum.index_select(0, active.to(grad_sum.device))
+                    for grad_sum in grad_sums
+                )
+                active_delta = _delta(
+                    active, _attributions(active, active_grad_sums, num_intervals)
+                )
+                delta[active.to(delta.device)] = active_delta
+            active = active[active_delta.abs().cpu() > convergence_delta_tolerance]
+
+        attributions = _attributions(
+            ids,
+            tuple(
+                grad_sum
+                / example_intervals.to(grad_sum).view(
+                    (-1,) + (1,) * (len(grad_sum.shape) - 1)
+                )
+                for grad_sum in grad_sums
+            ),
+            1,
+        )
+        return attributions, delta
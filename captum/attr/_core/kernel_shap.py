@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+import torch
+
+from .lime import Lime
+
+
+class KernelShap(Lime):
+    def __init__(self, forward_func):
+        r"""
+        Args:
+
+            forward_func (callable): The forward function of the model or
+                        any modification of it
+        """
+        Lime.__init__(self, forward_func)
+
+    def attribute(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        n_samples=50,
+        ablations_per_eval=1,
+    ):
+        r"""
+        Kernel SHAP estimates Shapley values by fitting a weighted linear
+        surrogate model, like LIME, to the outputs of the forward function at
+        inputs, which keep a subset (coalition) of the features and replace all
+        other features by the baselines. With the Shapley kernel as weighting,
+        the coefficients of the surrogate model are the Shapley values.
+        Coalitions are sampled from the distribution given by the Shapley
+        kernel, i.e. a coalition size k is drawn with probability proportional
+        to (#features - 1) / (k * (#features - k)) and the kept features are
+        a uniformly random subset of that size, so the set of all coalitions
+        is never enumerated. The surrogate model is fit subject to the
+        constraint, that the attributions sum up to the output difference
+        between the inputs and the baselines.
+
+        All sampled coalitions are drawn at once, the corresponding inputs
+        are built in batches of up to `ablations_per_eval` of them, and the
+        surrogate model of all examples is fit with a single least squares
+        solve.
+
+        By default, each scalar value within the input tensors is taken as a
+        feature. Passing a feature mask, allows grouping features to be kept
+        or replaced together. Each input scalar in the group will be given the
+        same attribution value.
+
+        More details regarding Kernel SHAP can be found in the original paper:
+        https://arxiv.org/abs/1705.07874
+
+        Args:
+
+                inputs (tensor or tuple of tensors):  Input for which Kernel SHAP
+                            attributions are computed. If forward_func takes
+                            a single tensor as input, a single input tensor should
+                            be provided.
+                            If forward_func takes multiple tensors as input, a tuple
+                            of the input tensors should be provided. It is assumed
+                            that for all given input tensors, dimension 0 corresponds
+                            to the number of examples (aka batch size), and if
+                            multiple input tensors are provided, the examples must
+                            be aligned appropriately.
+                baselines (scalar, tensor, tuple of scalars or tensors, optional):
+                            Baselines define reference value which replaces each
+                            feature when it is not in the coalition.
+                            Baselines can be provided as:
+                            - a single tensor, if inputs is a single tensor, with
+                                exactly the same dimensions as inputs or
+                                broadcastable to match the dimensions of inputs
+                            - a single scalar, if inputs is a single tensor, which will
+                                be broadcasted for each input value in input tensor.
+                            - a tuple of tensors or scalars, the baseline corresponding
+                                to each tensor in the inputs' tuple can be:
+                                - either a tensor with
+                                    exactly the same dimensions as inputs or
+                                    broadcastable to match the dimensions of inputs
+                                - or a scalar, corresponding to a tensor in the
+                                    inputs' tuple. This scalar value is broadcasted
+                                    for corresponding input tensor.
+                            In the cases when `baselines` is not provided, we internally
+                            use zero scalar corresponding to each input tensor.
+                            Default: None
+                target (int, tuple, tensor or list, optional):  Output indices for
+                            which the surrogate model is fit (for classification
+                            cases, this is usually the target class).
+                            If the network returns a scalar value per example,
+                            no target index is necessary.
+                            For general 2D outputs, targets can be either:
+
+                            - a single integer or a tensor containing a single
+                                integer, which is applied to all input examples
+
+                            - a list of integers or a 1D tensor, with length matching
+                                the number of examples in inputs (dim 0). Each integer
+                                is applied as the target for the corresponding example.
+
+                            For outputs with > 2 dimensions, targets can be either:
+
+                            - A single tuple, which contains #output_dims - 1
+                                elements. This target index is applied to all examples.
+
+                            - A list of tuples with length equal to the number of
+                                examples in inputs (dim 0), and each tuple containing
+                                #output_dims - 1 elements. Each tuple is applied as the
+                                target for the corresponding example.
+
+                            Default: None
+                additional_forward_args (tuple, optional): If the forward function
+                            requires additional arguments other than the inputs for
+                            which attributions should not be computed, this argument
+                            can be provided. It must be either a single additional
+                            argument of a Tensor or arbitrary (non-tuple) type or a
+                            tuple containing multiple additional arguments including
+                            tensors or any arbitrary python types. These arguments
+                            are provided to forward_func in order following the
+                            arguments in inputs.
+                            For a tensor, the first dimension of the tensor must
+                            correspond to the number of examples. For all other types,
+                            the given argument is used for all forward evaluations.
+                            Note that attributions are not computed with respect
+                            to these arguments.
+                            Default: None
+                feature_mask (tensor or tuple of tensors, optional):
+                            feature_mask defines a mask for the input, grouping
+                            features which should be kept or replaced together.
+                            feature_mask should contain the same number of tensors
+                            as inputs. Each tensor should
+                            be the same size as the corresponding input or
+                            broadcastable to match the input tensor. Values across
+                            all tensors should be integers, and indices
+                            corresponding to the same feature should have the same
+                            value. As in ShapleyValueSampling, scalars with the
+                            same value in different input tensors belong to the
+                            same feature.
+                            If the forward function returns a single scalar per batch,
+                            we enforce that the first dimension of each mask must be 1,
+                            since attributions are returned batch-wise rather than per
+                            example, so the attributions must correspond to the
+                            same features (indices) in each input example.
+                            If None, then a feature mask is constructed which assigns
+                            each scalar within a tensor as a separate feature.
+                            Default: None
+                n_samples (int, optional):  The number of sampled coalitions, to
+                            which the surrogate model is fit. The coalition without
+                            any features is evaluated in addition.
+                            Default: 50
+                ablations_per_eval (int, optional): Allows multiple sampled
+                            inputs to be processed simultaneously in one call to
+                            forward_fn.
+                            Each forward pass will contain a maximum of
+                            ablations_per_eval * #examples samples.
+                            For DataParallel models, each batch is split among the
+                            available devices, so evaluations on each available
+                            device contain at most
+                            (ablations_per_eval * #examples) / num_devices
+                            samples.
+                            If the forward function returns a single scalar per batch,
+                            ablations_per_eval must be set to 1.
+                            Default: 1
+
+        Returns:
+                *tensor* or tuple of *tensors* of **attributions**:
+                - **attributions** (*tensor* or tuple of *tensors*):
+                            The attributions with respect to each input feature.
+                            If the forward function returns
+                            a scalar value per example, attributions will be
+                            the same size as the provided inputs, with each value
+                            providing the attribution of the corresponding input index.
+                            If the forward function returns a scalar per batch, then
+                            attribution tensor(s) will have first dimension 1 and
+                            the remaining dimensions will match the input.
+                            If a single tensor is provided as inputs, a single tensor is
+                            returned. If a tuple is provided for inputs, a tuple of
+                            corresponding sized tensors is returned.
+
+        Examples::
+
+            >>> # SimpleClassifier takes a single input tensor of size Nx4x4,
+            >>> # and returns an Nx3 tensor of class probabilities.
+            >>> net = SimpleClassifier()
+            >>> # Generating random input with size 2 x 4 x 4
+            >>> input = torch.randn(2, 4, 4)
+            >>> # Defining KernelShap interpreter
+            >>> ks = KernelShap(net)
+            >>> # Computes attribution, fitting a linear model over the 16
+            >>> # features to the outputs of 200 sampled coalitions, which are
+            >>> # evaluated 50 at a time.
+            >>> attr = ks.attribute(input, target=1, n_samples=200,
+            >>>                     ablations_per_eval=50)
+        """
+        return self._attribute_surrogate(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            feature_mask,
+            n_samples,
+            ablations_per_eval,
+        )
+
+    def _sample_coalitions(self, num_features, n_samples, device):
+        r"""
+        Returns the boolean tensor of the coalitions with shape
+        (`n_samples` + 1, `num_features`), and uniform weights. The first
+        coalition is empty, and the others are sampled from the Shapley kernel.
+        """
+        empty = torch.zeros(1, num_features, dtype=torch.bool, device=device)
+        if num_features < 2:
+            # the single feature gets the full output difference
+            return empty, torch.ones(1, device=device)
+        sizes = torch.arange(1, num_features, device=device)
+        size_probs = (num_features - 1) / (sizes * (num_features - sizes)).float()
+        num_added = sizes[torch.multinomial(size_probs, n_samples, replacement=True)]
+        # the features with the smallest random keys form a uniformly random
+        # subset of the given size
+        rank = torch.rand(n_samples, num_features, device=device).argsort(dim=1)
+        rank = rank.argsort(dim=1)
+        added = rank < num_added.unsqueeze(1)
+        return (
+            torch.cat([empty, added]),
+            torch.ones(n_samples + 1, device=device),
+        )
+
+    def _fit_surrogate(self, added, sample_weights, evals, initial_eval):
+        r"""
+        Fits the linear surrogate model of each example by least squares,
+        with the evaluation of the empty coalition as intercept and subject
+        to the attributions summing up to the output difference between the
+        inputs and the baselines. Returns the coefficients of the features
+        with shape (#features, #examples or 1).
+        """
+        base_eval = evals[0:1]
+        total = initial_eval - base_eval
+        if added.shape[1] < 2:
+            return total
+        added, sample_weights, evals = added[1:], sample_weights[1:], evals[1:]
+        # the constraint is eliminated by substituting the last coefficient
+        # with the total minus the sum of all other coefficients
+        design = added[:, :-1] - added[:, -1:]
+        residual = evals - base_eval - added[:, -1:] * total
+        sqrt_weights = sample_weights.sqrt().unsqueeze(1)
+        coefs = torch.pinverse(sqrt_weights * design).matmul(sqrt_weights * residual)
+        return torch.cat([coefs, total - coefs.sum(dim=0, keepdim=True)])
@@ -14,10 +14,14 @@ class LayerGradCam(LayerAttribution, GradientAttribution):
 
             forward_func (callable):  The forward function of the model or any
                           modification of it
-            layer (torch.nn.Module): Layer for which attributions are computed.
+            layer (torch.nn.Module or list(torch.nn.Module)): Layer for which
+                          attributions are computed.
                           Output size of attribute matches this layer's output
                           dimensions, except for dimension 2, which will be 1,
                           since GradCAM sums over channels.
+                          If a list of layers is given, the attributions of all
+                          layers are computed with a single forward and backward
+                          pass.
                           Currently, only layers with a single tensor output are
                           supported.
             device_ids (list(int)): Device ID list, necessary only if forward_func
@@ -142,6 +146,9 @@ class LayerGradCam(LayerAttribution, GradientAttribution):
                             Attributions will be the same size as the
                             output of the given layer, except for dimension 2,
                             which will be 1 due to summing over channels.
+                            If a list of layers is given in the constructor, a
+                            list with the attributions of each layer is
+                            returned.
 
             Examples::
 
@@ -179,13 +186,28 @@ class LayerGradCam(LayerAttribution, GradientAttribution):
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
         )
-        summed_grads = torch.mean(
-            layer_gradients,
-            dim=tuple(x for x in range(2, len(layer_gradients.shape))),
-            keepdim=True,
-        )
-
-        scaled_act = torch.sum(summed_grads * layer_eval, dim=1, keepdim=True)
-        if relu_attributions:
-            return F.relu(scaled_act)
-        return scaled_act
+        if isinstance(self.layer, list):
+            return [
+                _grad_cam(single_layer_gradients, single_layer_eval, relu_attributions)
+                for single_layer_gradients, single_layer_eval in zip(
+                    layer_gradients, layer_eval
+                )
+            ]
+        return _grad_cam(layer_gradients, layer_eval, relu_attributions)
+
+
+def _grad_cam(layer_gradients, layer_eval, relu_attributions):
+    r"""
+    Computes the GradCAM attributions from the gradients of the output with
+    respect to the layer and the evaluation of the layer.
+    """
+    summed_grads = torch.mean(
+        layer_gradients,
+        dim=tuple(x for x in range(2, len(layer_gradients.shape))),
+        keepdim=True,
+    )
+
+    scaled_act = torch.sum(summed_grads * layer_eval, dim=1, keepdim=True)
+    if relu_attributions:
+        return F.relu(scaled_act)
+    return scaled_act
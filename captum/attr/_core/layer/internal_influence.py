@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 import torch
-from ..._utils.approximation_methods import approximation_parameters
+from functools import partial
+from ..._utils.approximation_methods import quadrature_parameters
 from ..._utils.attribution import LayerAttribution, GradientAttribution
-from ..._utils.batching import _batched_operator
+from ..._utils.batching import (
+    _auto_internal_batch_size,
+    _batched_path_generator,
+    _call_with_batch_size_backoff,
+)
 from ..._utils.common import (
-    _reshape_and_sum,
     _format_input_baseline,
     _validate_input,
     _format_additional_forward_args,
-    _expand_additional_forward_args,
-    _expand_target,
+    _sum_by_example,
 )
 from ..._utils.gradient import compute_layer_gradients_and_eval
 
@@ -49,6 +52,7 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
         method="gausslegendre",
         internal_batch_size=None,
         attribute_to_layer_input=False,
+        memory_budget_bytes=None,
     ):
         r"""
             Computes internal influence by approximating the integral of gradients
@@ -147,15 +151,25 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
                             `riemann_trapezoid` or `gausslegendre`.
                             Default: `gausslegendre` if no method is provided.
-                internal_batch_size (int, optional): Divides total #steps * #examples
-                            data points into chunks of size internal_batch_size,
-                            which are computed (forward / backward passes)
-                            sequentially.
+                internal_batch_size (int or string, optional): Divides total
+                            #steps * #examples data points into chunks of size
+                            internal_batch_size, which are computed (forward /
+                            backward passes) sequentially.
                             For DataParallel models, each batch is split among the
                             available devices, so evaluations on each available
                             device contain internal_batch_size / num_devices examples.
                             If internal_batch_size is None, then all evaluations
                             are processed in one batch.
+                            Scaled inputs are constructed lazily for each chunk and
+                            gradients are accumulated per example, so that peak
+                            memory scales with internal_batch_size rather than
+                            with #steps * #examples.
+                            If internal_batch_size is `auto`, the largest chunk
+                            size which fits into `memory_budget_bytes` is chosen
+                            by measuring the memory needed per data point on a
+                            few data points. If a chunk nevertheless fails to
+                            allocate memory, the chunk size is halved and the
+                            computation is retried.
                             Default: None
                 attribute_to_layer_input (bool, optional): Indicates whether to
                             compute the attribution with respect to the layer input
@@ -168,6 +182,12 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
                             attribute to the input or output, is a single tensor.
                             Support for multiple tensors will be added later.
                             Default: False
+                memory_budget_bytes (int, optional): Used only if
+                            `internal_batch_size` is `auto`. The number of bytes
+                            of memory which the forward and backward passes of
+                            each chunk may use. If None, half of the memory that
+                            is currently free on the device of inputs is used.
+                            Default: None
 
             Returns:
                 *tensor* of **attributions**:
@@ -195,51 +215,122 @@ class InternalInfluence(LayerAttribution, GradientAttribution):
         _validate_input(inputs, baselines, n_steps, method)
 
         # Retrieve step size and scaling factor for specified approximation method
-        step_sizes_func, alphas_func = approximation_parameters(method)
-        step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
-
-        # Compute scaled inputs from baseline to final input.
-        scaled_features_tpl = tuple(
-            torch.cat(
-                [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
-            ).requires_grad_()
-            for input, baseline in zip(inputs, baselines)
+        step_sizes, alphas = quadrature_parameters(
+            method,
+            n_steps,
+            dtype=inputs[0].dtype if inputs[0].is_floating_point() else None,
+            device=inputs[0].device,
         )
 
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
-        # apply number of steps to additional forward args
-        # currently, number of steps is applied only to additional forward arguments
-        # that are nd-tensors. It is assumed that the first dimension is
-        # the number of batches.
-        # dim -> (bsz * #steps x additional_forward_args[0].shape[1:], ...)
-        input_additional_args = (
-            _expand_additional_forward_args(additional_forward_args, n_steps)
-            if additional_forward_args is not None
-            else None
+
+        auto_batch_size = internal_batch_size == "auto"
+        if auto_batch_size:
+            internal_batch_size = _auto_internal_batch_size(
+                partial(
+                    self._chunk_gradients, self.forward_func, attribute_to_layer_input
+                ),
+                inputs,
+                baselines,
+                alphas,
+                additional_forward_args,
+                target,
+                memory_budget_bytes,
+            )
+        return _call_with_batch_size_backoff(
+            lambda batch_size: self._sum_path_gradients(
+                inputs,
+                baselines,
+                target,
+                additional_forward_args,
+                alphas,
+                step_sizes,
+                batch_size,
+                attribute_to_layer_input,
+            ),
+            internal_batch_size,
+            backoff=auto_batch_size,
         )
-        expanded_target = _expand_target(target, n_steps)
 
-        # Returns gradient of output with respect to hidden layer.
-        layer_gradients, _ = _batched_operator(
-            compute_layer_gradients_and_eval,
-            scaled_features_tpl,
-            input_additional_args,
-            internal_batch_size=internal_batch_size,
-            forward_fn=self.forward_func,
+    def _chunk_gradients(
+        self,
+        forward_fn,
+        attribute_to_layer_input,
+        scaled_features_tpl,
+        input_additional_args,
+        target_ind,
+        step_ids,
+        example_ids,
+    ):
+        r"""
+        Computes the gradients of the output with respect to the layer at the
+        points of a chunk yielded by `_batched_path_generator`.
+        """
+        layer_gradients, _ = compute_layer_gradients_and_eval(
+            forward_fn=forward_fn,
             layer=self.layer,
-            target_ind=expanded_target,
+            inputs=scaled_features_tpl,
+            target_ind=target_ind,
+            additional_forward_args=input_additional_args,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_layer_input,
         )
-        # flattening grads so that we can multiply it with step-size
-        # calling contiguous to avoid `memory whole` problems
-        scaled_grads = layer_gradients.contiguous().view(n_steps, -1) * torch.tensor(
-            step_sizes
-        ).view(n_steps, 1).to(layer_gradients.device)
-
-        # aggregates across all steps for each tensor in the input tuple
-        return _reshape_and_sum(
-            scaled_grads, n_steps, inputs[0].shape[0], layer_gradients.shape[1:]
-        )
+        return layer_gradients
+
+    def _sum_path_gradients(
+        self,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        alphas,
+        step_sizes,
+        internal_batch_size,
+        attribute_to_layer_input,
+    ):
+        r"""
+        Sums the gradients of the output with respect to the layer at the points
+        `baseline + alpha * (input - baseline)` for all given `alphas`, each
+        scaled by the corresponding element of `step_sizes`, per example.
+        """
+        num_examples = inputs[0].shape[0]
+
+        # Scaled inputs from baseline to final input are constructed lazily, in
+        # chunks of at most internal_batch_size points, and the step-weighted
+        # gradients of output with respect to hidden layer are accumulated
+        # across all steps for each example.
+        attributions = None
+        for (
+            scaled_features_tpl,
+            input_additional_args,
+            target_ind,
+            step_ids,
+            example_ids,
+        ) in _batched_path_generator(
+            inputs,
+            baselines,
+            alphas,
+            additional_forward_args,
+            target,
+            internal_batch_size,
+        ):
+            layer_gradients = self._chunk_gradients(
+                self.forward_func,
+                attribute_to_layer_input,
+                scaled_features_tpl,
+                input_additional_args,
+                target_ind,
+                step_ids,
+                example_ids,
+            )
+            with torch.no_grad():
+                attributions = _sum_by_example(
+                    attributions,
+                    layer_gradients,
+                    example_ids,
+                    num_examples,
+                    step_sizes[step_ids],
+                )
+        return attributions
@@ -12,12 +12,15 @@ class LayerActivation(LayerAttribution):
 
             forward_func (callable):  The forward function of the model or any
                           modification of it
-            layer (torch.nn.Module): Layer for which attributions are computed.
+            layer (torch.nn.Module or list(torch.nn.Module)): Layer for which
+                          attributions are computed.
                           Output size of attribute matches this layer's input or
                           output dimensions, depending on whether we attribute to
                           the inputs or outputs of the layer, corresponding to
                           attribution of each neuron in the input or output of
                           this layer.
+                          If a list of layers is given, the attributions of all
+                          layers are computed with a single forward pass.
                           Currently, it is assumed that the inputs or the outputs
                           of the layer, depending on which one is used for
                           attribution, can only be a single tensor.
@@ -75,6 +78,9 @@ class LayerActivation(LayerAttribution):
                             Activation of each neuron in given layer output.
                             Attributions will always be the same size as the
                             output of the given layer.
+                            If a list of layers is given in the constructor, a
+                            list with the attributions of each layer is
+                            returned.
 
             Examples::
 
@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 import torch
-from ..._utils.approximation_methods import approximation_parameters
+from functools import partial
+from ..._utils.approximation_methods import quadrature_parameters
 from ..._utils.attribution import LayerAttribution, GradientAttribution
-from ..._utils.batching import _batched_operator
+from ..._utils.batching import (
+    _auto_internal_batch_size,
+    _batched_path_generator,
+    _call_with_batch_size_backoff,
+    _step_ranges,
+    _endpoint_steps,
+    _store_endpoint_outputs,
+)
 from ..._utils.common import (
-    _reshape_and_sum,
     _format_input_baseline,
     _format_additional_forward_args,
-    _expand_additional_forward_args,
     _validate_input,
-    _expand_target,
+    _ForwardOutputRecorder,
 )
 from ..._utils.gradient import compute_layer_gradients_and_eval
 
@@ -53,6 +59,7 @@ class LayerConductance(LayerAttribution, GradientAttribution):
         internal_batch_size=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        memory_budget_bytes=None,
     ):
         r"""
             Computes conductance with respect to the given layer. The
@@ -153,15 +160,25 @@ class LayerConductance(LayerAttribution, GradientAttribution):
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
                             `riemann_trapezoid` or `gausslegendre`.
                             Default: `gausslegendre` if no method is provided.
-                internal_batch_size (int, optional): Divides total #steps * #examples
-                            data points into chunks of size internal_batch_size,
-                            which are computed (forward / backward passes)
-                            sequentially.
+                internal_batch_size (int or string, optional): Divides total
+                            #steps * #examples data points into chunks of size
+                            internal_batch_size, which are computed (forward /
+                            backward passes) sequentially.
                             For DataParallel models, each batch is split among the
                             available devices, so evaluations on each available
                             device contain internal_batch_size / num_devices examples.
                             If internal_batch_size is None, then all evaluations are
                             processed in one batch.
+                            Scaled inputs are constructed lazily for each chunk and
+                            attributions are accumulated per example, so that peak
+                            memory scales with internal_batch_size rather than
+                            with #steps * #examples.
+                            If internal_batch_size is `auto`, the largest chunk
+                            size which fits into `memory_budget_bytes` is chosen
+                            by measuring the memory needed per data point on a
+                            few data points. If a chunk nevertheless fails to
+                            allocate memory, the chunk size is halved and the
+                            computation is retried.
                             Default: None
                 return_convergence_delta (bool, optional): Indicates whether to return
                             convergence delta or not. If `return_convergence_delta`
@@ -179,6 +196,12 @@ class LayerConductance(LayerAttribution, GradientAttribution):
                             attribute to the input or output, is a single tensor.
                             Support for multiple tensors will be added later.
                             Default: False
+                memory_budget_bytes (int, optional): Used only if
+                            `internal_batch_size` is `auto`. The number of bytes
+                            of memory which the forward and backward passes of
+                            each chunk may use. If None, half of the memory that
+                            is currently free on the device of inputs is used.
+                            Default: None
 
             Returns:
                 **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -215,62 +238,48 @@ class LayerConductance(LayerAttribution, GradientAttribution):
         inputs, baselines = _format_input_baseline(inputs, baselines)
         _validate_input(inputs, baselines, n_steps, method)
 
-        num_examples = inputs[0].shape[0]
-
         # Retrieve scaling factors for specified approximation method
-        step_sizes_func, alphas_func = approximation_parameters(method)
-        alphas = alphas_func(n_steps + 1)
-
-        # Compute scaled inputs from baseline to final input.
-        scaled_features_tpl = tuple(
-            torch.cat(
-                [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
-            ).requires_grad_()
-            for input, baseline in zip(inputs, baselines)
+        _, alphas = quadrature_parameters(
+            method,
+            n_steps + 1,
+            dtype=inputs[0].dtype if inputs[0].is_floating_point() else None,
+            device=inputs[0].device,
         )
 
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
-        # apply number of steps to additional forward args
-        # currently, number of steps is applied only to additional forward arguments
-        # that are nd-tensors. It is assumed that the first dimension is
-        # the number of batches.
-        # dim -> (#examples * #steps x additional_forward_args[0].shape[1:], ...)
-        input_additional_args = (
-            _expand_additional_forward_args(additional_forward_args, n_steps + 1)
-            if additional_forward_args is not None
-            else None
-        )
-        expanded_target = _expand_target(target, n_steps + 1)
 
-        # Conductance Gradients - Returns gradient of output with respect to
-        # hidden layer and hidden layer evaluated at each input.
-        layer_gradients, layer_eval = _batched_operator(
-            compute_layer_gradients_and_eval,
-            scaled_features_tpl,
-            input_additional_args,
-            internal_batch_size=internal_batch_size,
-            forward_fn=self.forward_func,
-            layer=self.layer,
-            target_ind=expanded_target,
-            device_ids=self.device_ids,
-            attribute_to_layer_input=attribute_to_layer_input,
-        )
-
-        # Compute differences between consecutive evaluations of layer_eval.
-        # This approximates the total input gradient of each step multiplied
-        # by the step size.
-        grad_diffs = layer_eval[num_examples:] - layer_eval[:-num_examples]
-
-        # Element-wise multiply gradient of output with respect to hidden layer
-        # and summed gradients with respect to input (chain rule) and sum
-        # across stepped inputs.
-        attributions = _reshape_and_sum(
-            grad_diffs * layer_gradients[:-num_examples],
-            n_steps,
-            num_examples,
-            layer_eval.shape[1:],
+        auto_batch_size = internal_batch_size == "auto"
+        if auto_batch_size:
+            internal_batch_size = _auto_internal_batch_size(
+                partial(
+                    self._chunk_gradients_and_eval,
+                    self.forward_func,
+                    attribute_to_layer_input,
+                ),
+                inputs,
+                baselines,
+                alphas,
+                additional_forward_args,
+                target,
+                memory_budget_bytes,
+            )
+        # If the convergence delta is required, the outputs at the endpoints of
+        # the path, if they are part of it, are recorded during the same pass.
+        attributions, endpoint_outputs = _call_with_batch_size_backoff(
+            lambda batch_size: self._conductance(
+                inputs,
+                baselines,
+                target,
+                additional_forward_args,
+                alphas,
+                batch_size,
+                attribute_to_layer_input,
+                return_convergence_delta,
+            ),
+            internal_batch_size,
+            backoff=auto_batch_size,
         )
         if return_convergence_delta:
             start_point, end_point = baselines, inputs
@@ -280,6 +289,134 @@ class LayerConductance(LayerAttribution, GradientAttribution):
                 end_point,
                 target=target,
                 additional_forward_args=additional_forward_args,
+                start_point_output=endpoint_outputs[0],
+                end_point_output=endpoint_outputs[1],
             )
             return attributions, delta
         return attributions
+
+    def _chunk_gradients_and_eval(
+        self,
+        forward_fn,
+        attribute_to_layer_input,
+        scaled_features_tpl,
+        input_additional_args,
+        target_ind,
+        step_ids,
+        example_ids,
+    ):
+        r"""
+        Computes the gradients of the output with respect to the layer and the
+        layer evaluations at the points of a chunk yielded by
+        `_batched_path_generator`.
+        """
+        return compute_layer_gradients_and_eval(
+            forward_fn=forward_fn,
+            layer=self.layer,
+            inputs=scaled_features_tpl,
+            target_ind=target_ind,
+            additional_forward_args=input_additional_args,
+            device_ids=self.device_ids,
+            attribute_to_layer_input=attribute_to_layer_input,
+        )
+
+    def _conductance(
+        self,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        alphas,
+        internal_batch_size,
+        attribute_to_layer_input,
+        record_endpoints,
+    ):
+        r"""
+        Computes conductance along the path through the points
+        `baseline + alpha * (input - baseline)` for all given `alphas`.
+
+        Returns the attributions and a list containing the outputs of the
+        forward function at the baselines and at the inputs, which are only
+        recorded if `record_endpoints` is True and if the corresponding alpha,
+        0 or 1, is part of `alphas`, otherwise they are None.
+        """
+        num_examples = inputs[0].shape[0]
+
+        # Scaled inputs from baseline to final input are constructed lazily, in
+        # chunks of at most internal_batch_size points. Since conductance needs
+        # differences between consecutive evaluations of the layer, the layer
+        # evaluation and gradient at the previous step are kept for each example.
+        attributions = None
+        prev_layer_eval = None
+        prev_layer_gradients = None
+        endpoint_outputs = [None, None]
+        endpoint_steps = _endpoint_steps(alphas)
+        forward_fn = (
+            _ForwardOutputRecorder(self.forward_func)
+            if record_endpoints
+            else self.forward_func
+        )
+        for (
+            scaled_features_tpl,
+            input_additional_args,
+            target_ind,
+            step_ids,
+            example_ids,
+        ) in _batched_path_generator(
+            inputs,
+            baselines,
+            alphas,
+            additional_forward_args,
+            target,
+            internal_batch_size,
+        ):
+            # Conductance Gradients - Returns gradient of output with respect to
+            # hidden layer and hidden layer evaluated at each input.
+            layer_gradients, layer_eval = self._chunk_gradients_and_eval(
+                forward_fn,
+                attribute_to_layer_input,
+                scaled_features_tpl,
+                input_additional_args,
+                target_ind,
+                step_ids,
+                example_ids,
+            )
+            with torch.no_grad():
+                if record_endpoints:
+                    output = forward_fn.pop(target_ind)
+                    endpoint_outputs = _store_endpoint_outputs(
+                        endpoint_outputs,
+                        endpoint_steps,
+                        output,
+                        step_ids,
+                        example_ids,
+                        num_examples,
+                    )
+                layer_eval = layer_eval.detach()
+                if attributions is None:
+                    attributions = torch.zeros(
+                        (num_examples,) + layer_eval.shape[1:],
+                        dtype=layer_eval.dtype,
+                        device=layer_eval.device,
+                    )
+                    prev_layer_eval = torch.zeros_like(attributions)
+                    prev_layer_gradients = torch.zeros_like(attributions)
+                # Rows of a chunk are ordered step-major, so each step occupies a
+                # contiguous range of rows.
+                for start, end in _step_ranges(step_ids):
+                    ids = example_ids[start:end].to(attributions.device)
+                    if step_ids[start] > 0:
+                        # Element-wise multiply gradient of output with respect to
+                        # hidden layer and the difference between consecutive
+                        # evaluations of the layer (chain rule).
+                        attributions.index_add_(
+                            0,
+                            ids,
+                            (layer_eval[start:end] - prev_layer_eval[ids])
+                            * prev_layer_gradients[ids],
+                        )
+                    prev_layer_eval.index_copy_(0, ids, layer_eval[start:end])
+                    prev_layer_gradients.index_copy_(
+                        0, ids, layer_gradients[start:end]
+                    )
+        return attributions, endpoint_outputs
@@ -19,11 +19,13 @@ from ..._utils.common import (
     _tensorize_baseline,
     _call_custom_attribution_func,
     _compute_conv_delta_and_format_attrs,
+    _ForwardOutputRecorder,
+    _select_targets,
 )
 
 
 class LayerDeepLift(LayerAttribution, DeepLift):
-    def __init__(self, model, layer):
+    def __init__(self, model, layer, reference_cache_size=0):
         r"""
         Args:
 
@@ -36,6 +38,10 @@ class LayerDeepLift(LayerAttribution, DeepLift):
                           Currently, it is assumed that the inputs or the outputs
                           of the layer, depending on which one is used for
                           attribution, can only be a single tensor.
+            reference_cache_size (int, optional): The maximum number of
+                          baselines, for which the activations of the model
+                          are cached. See `DeepLift` for more details.
+                          Default: 0
         """
         if isinstance(model, nn.DataParallel):
             warnings.warn(
@@ -45,7 +51,7 @@ class LayerDeepLift(LayerAttribution, DeepLift):
             model = model.module
 
         LayerAttribution.__init__(self, model, layer)
-        DeepLift.__init__(self, model)
+        DeepLift.__init__(self, model, reference_cache_size)
 
     def attribute(
         self,
@@ -233,32 +239,43 @@ class LayerDeepLift(LayerAttribution, DeepLift):
 
         _validate_input(inputs, baselines)
 
-        # set hooks for baselines
-        self.model.apply(self._register_hooks_ref)
-
         baselines = _tensorize_baseline(inputs, baselines)
 
-        attr_baselines = _forward_layer_eval(
-            self.model,
-            baselines,
-            self.layer,
-            additional_forward_args=additional_forward_args,
-            attribute_to_layer_input=attribute_to_layer_input,
+        def reference_forward():
+            # records the output at the baselines for the convergence delta
+            recorder = _ForwardOutputRecorder(self.model)
+            attr_baselines = _forward_layer_eval(
+                recorder,
+                baselines,
+                self.layer,
+                additional_forward_args=additional_forward_args,
+                attribute_to_layer_input=attribute_to_layer_input,
+            )
+            return recorder.outputs[0], attr_baselines
+
+        # records the output at the inputs, if needed for the convergence
+        # delta, during the forward pass of the gradient computation
+        forward_fn = (
+            _ForwardOutputRecorder(self.model)
+            if return_convergence_delta
+            else self.model
         )
+        with self._hooked_model():
+            baselines_output, attr_baselines = self._reference_forward(
+                reference_forward,
+                baselines,
+                additional_forward_args,
+                key=(attribute_to_layer_input,),
+            )
 
-        # remove forward hook set for baselines
-        for forward_handles_ref in self.forward_handles_refs:
-            forward_handles_ref.remove()
-
-        self.model.apply(self._register_hooks)
-
-        gradients, attr_inputs = compute_layer_gradients_and_eval(
-            self.model,
-            self.layer,
-            inputs,
-            additional_forward_args=additional_forward_args,
-            attribute_to_layer_input=attribute_to_layer_input,
-        )
+            self._hook_mode = "input"
+            gradients, attr_inputs = compute_layer_gradients_and_eval(
+                forward_fn,
+                self.layer,
+                inputs,
+                additional_forward_args=additional_forward_args,
+                attribute_to_layer_input=attribute_to_layer_input,
+            )
         # Fixme later: we need to do this because `compute_layer_gradients_and_eval`
         # and `_forward_layer_eval` always returns a tensor
         attr_baselines = (attr_baselines,)
@@ -277,11 +294,13 @@ class LayerDeepLift(LayerAttribution, DeepLift):
                 custom_attribution_func, gradients, attr_inputs, attr_baselines
             )
 
-        # remove hooks from all activations
-        self._remove_hooks()
-
         undo_gradient_requirements(inputs, gradient_mask)
 
+        if return_convergence_delta:
+            end_point_output = forward_fn.pop(target)
+            start_point_output = _select_targets(baselines_output, target)
+        else:
+            start_point_output = end_point_output = None
         return _compute_conv_delta_and_format_attrs(
             self,
             return_convergence_delta,
@@ -291,11 +310,13 @@ class LayerDeepLift(LayerAttribution, DeepLift):
             additional_forward_args,
             target,
             False,  # currently both the input and output of layer can only be a tensor
+            start_point_output=start_point_output,
+            end_point_output=end_point_output,
         )
 
 
 class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
-    def __init__(self, model, layer):
+    def __init__(self, model, layer, reference_cache_size=0):
         r"""
         Args:
 
@@ -307,9 +328,14 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
                           inputs or outputs of the layer.
                           Currently, it is assumed that both inputs and ouputs of
                           the layer can only be a single tensor.
+            reference_cache_size (int, optional): The maximum number of
+                          chunks of expanded baselines, for which the
+                          activations of the model are cached. See `DeepLift`
+                          for more details.
+                          Default: 0
         """
-        LayerDeepLift.__init__(self, model, layer)
-        DeepLiftShap.__init__(self, model)
+        LayerDeepLift.__init__(self, model, layer, reference_cache_size)
+        DeepLiftShap.__init__(self, model, reference_cache_size)
 
     def attribute(
         self,
@@ -320,6 +346,7 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
         return_convergence_delta=False,
         attribute_to_layer_input=False,
         custom_attribution_func=None,
+        internal_batch_size=None,
     ):
         r"""
         Extends LayerDeepLift and DeepLiftShap algorithms and approximates SHAP
@@ -446,6 +473,17 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
                         attribution tensors that have the same length as the
                         `inputs`.
                         Default: None
+            internal_batch_size (int, optional): Divides the baselines into
+                        chunks, such that each chunk contains at most
+                        internal_batch_size input - baseline pairs, but at least
+                        one baseline. The chunks are attributed sequentially and
+                        the attributions are averaged across baselines with a
+                        running mean, so that memory scales with
+                        internal_batch_size rather than with
+                        #examples * #baselines.
+                        If internal_batch_size is None, all input - baseline
+                        pairs are attributed in one batch.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -497,34 +535,27 @@ class LayerDeepLiftShap(LayerDeepLift, DeepLiftShap):
             " approach can be used instead.".format(baselines[0])
         )
 
-        # batch sizes
-        inp_bsz = inputs[0].shape[0]
-        base_bsz = baselines[0].shape[0]
-
-        (
-            exp_inp,
-            exp_base,
-            exp_target,
-            exp_addit_args,
-        ) = DeepLiftShap._expand_inputs_baselines_targets(
-            self, baselines, inputs, target, additional_forward_args
-        )
-        attributions = LayerDeepLift.attribute(
+        attributions, delta = DeepLiftShap._attribute_baseline_chunks(
             self,
-            exp_inp,
-            exp_base,
-            target=exp_target,
-            additional_forward_args=exp_addit_args,
-            return_convergence_delta=return_convergence_delta,
-            attribute_to_layer_input=attribute_to_layer_input,
-            custom_attribution_func=custom_attribution_func,
-        )
-        if return_convergence_delta:
-            attributions, delta = attributions
-
-        attributions = DeepLiftShap._compute_mean_across_baselines(
-            self, inp_bsz, base_bsz, attributions
+            lambda exp_inp, exp_base, exp_tgt, exp_addit_args: LayerDeepLift.attribute(
+                self,
+                exp_inp,
+                exp_base,
+                target=exp_tgt,
+                additional_forward_args=exp_addit_args,
+                return_convergence_delta=return_convergence_delta,
+                attribute_to_layer_input=attribute_to_layer_input,
+                custom_attribution_func=custom_attribution_func,
+            ),
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            return_convergence_delta,
+            internal_batch_size,
         )
+        # layer attributions are a single tensor
+        attributions = attributions[0]
         if return_convergence_delta:
             return attributions, delta
         else:
@@ -1,9 +1,5 @@
 #!/usr/bin/env python3
 
-import torch
-
-import numpy as np
-
 from ..._utils.attribution import LayerAttribution
 from ..._utils.gradient import compute_layer_gradients_and_eval, _forward_layer_eval
 
@@ -51,6 +47,7 @@ class LayerGradientShap(LayerAttribution, GradientShap):
         additional_forward_args=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        sampler=None,
     ):
         r"""
         Implements gradient SHAP for layer based on the implementation from SHAP's
@@ -198,6 +195,17 @@ class LayerGradientShap(LayerAttribution, GradientShap):
                         attribute to the input or output, is a single tensor.
                         Support for multiple tensors will be added later.
                         Default: False
+            sampler (Sampler, optional): The sampler, which draws the noise,
+                        the baselines from the baselines' distribution and the
+                        points on the paths between the baselines and the inputs,
+                        e.g. a `StratifiedSampler` or a quasi-Monte Carlo
+                        `SobolSampler`, which reach the same accuracy as
+                        independent samples with fewer `n_samples`.
+                        If None, independent samples are drawn with the global
+                        random number generators of torch and numpy, as in
+                        previous versions, which hence draw the same samples
+                        for the same seeds.
+                        Default: None
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
             - **attributions** (*tensor*):
@@ -257,6 +265,8 @@ class LayerGradientShap(LayerAttribution, GradientShap):
             additional_forward_args=additional_forward_args,
             return_convergence_delta=return_convergence_delta,
             attribute_to_layer_input=attribute_to_layer_input,
+            nt_sampler=sampler,
+            sampler=sampler,
         )
 
         return attributions
@@ -295,12 +305,9 @@ class LayerInputBaselineXGradient(LayerAttribution, InputBaselineXGradient):
         additional_forward_args=None,
         return_convergence_delta=False,
         attribute_to_layer_input=False,
+        sampler=None,
     ):
-        rand_coefficient = torch.tensor(
-            np.random.uniform(0.0, 1.0, inputs[0].shape[0]),
-            device=inputs[0].device,
-            dtype=inputs[0].dtype,
-        )
+        rand_coefficient = self._sample_coefficient(inputs, sampler)
 
         input_baseline_scaled = tuple(
             self._scale_input(input, baseline, rand_coefficient)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+import torch
+
+from .._utils.common import (
+    _format_attributions,
+    _format_input,
+    _format_input_baseline,
+    _run_forward,
+    _format_additional_forward_args,
+)
+from .feature_ablation import (
+    FeatureAblation,
+    _expand_feature_attrib,
+    _joint_feature_mask,
+)
+
+
+class Lime(FeatureAblation):
+    def __init__(self, forward_func, kernel_width=0.75):
+        r"""
+        Args:
+
+            forward_func (callable): The forward function of the model or
+                        any modification of it
+            kernel_width (float, optional): The width of the exponential
+                        kernel, which weights each sampled input by its cosine
+                        distance to the original input in the space of
+                        binary feature vectors.
+                        Default: 0.75
+        """
+        FeatureAblation.__init__(self, forward_func)
+        self.kernel_width = kernel_width
+
+    def attribute(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        n_samples=50,
+        ablations_per_eval=1,
+    ):
+        r"""
+        LIME (Local Interpretable Model-agnostic Explanations) fits an
+        interpretable, weighted linear surrogate model to the outputs of the
+        forward function around the given inputs. Each sampled input keeps a
+        random subset of the features and replaces all other features by the
+        baselines. The surrogate model is a linear function of the binary vector
+        indicating the kept features, and the coefficient of each feature is
+        its attribution. Sampled inputs closer to the original input, measured
+        by the cosine distance of the binary vectors, are weighted higher.
+
+        All sampled binary vectors are drawn at once, the sampled inputs are
+        built in batches of up to `ablations_per_eval` of them, and the
+        surrogate model of all examples is fit with a single weighted least
+        squares solve.
+
+        By default, each scalar value within the input tensors is taken as a
+        feature. Passing a feature mask, allows grouping features to be kept
+        or replaced together. Each input scalar in the group will be given the
+        same attribution value.
+
+        More details regarding LIME can be found in the original paper:
+        https://arxiv.org/abs/1602.04938
+
+        Args:
+
+                inputs (tensor or tuple of tensors):  Input for which LIME
+                            attributions are computed. If forward_func takes
+                            a single tensor as input, a single input tensor should
+                            be provided.
+                            If forward_func takes multiple tensors as input, a tuple
+                            of the input tensors should be provided. It is assumed
+                            that for all given input tensors, dimension 0 corresponds
+                            to the number of examples (aka batch size), and if
+                            multiple input tensors are provided, the examples must
+                            be aligned appropriately.
+                baselines (scalar, tensor, tuple of scalars or tensors, optional):
+                            Baselines define reference value which replaces each
+                            feature when it is not kept.
+                            Baselines can be provided as:
+                            - a single tensor, if inputs is a single tensor, with
+                                exactly the same dimensions as inputs or
+                                broadcastable to match the dimensions of inputs
+                            - a single scalar, if inputs is a single tensor, which will
+                                be broadcasted for each input value in input tensor.
+                            - a tuple of tensors or scalars, the baseline corresponding
+                                to each tensor in the inputs' tuple can be:
+                                - either a tensor with
+                                    exactly the same dimensions as inputs or
+                                    broadcastable to match the dimensions of inputs
+                                - or a scalar, corresponding to a tensor in the
+                                    inputs' tuple. This scalar value is broadcasted
+                                    for corresponding input tensor.
+                            In the cases when `baselines` is not provided, we internally
+                            use zero scalar corresponding to each input tensor.
+                            Default: None
+                target (int, tuple, tensor or list, optional):  Output indices for
+                            which the surrogate model is fit (for classification
+                            cases, this is usually the target class).
+                            If the network returns a scalar value per example,
+                            no target index is necessary.
+                            For general 2D outputs, targets can be either:
+
+                            - a single integer or a tensor containing a single
+                                integer, which is applied to all input examples
+
+                            - a list of integers or a 1D tensor, with length matching
+                                the number of examples in inputs (dim 0). Each integer
+                                is applied as the target for the corresponding example.
+
+                            For outputs with > 2 dimensions, targets can be either:
+
+                            - A single tuple, which contains #output_dims - 1
+                                elements. This target index is applied to all examples.
+
+                            - A list of tuples with length equal to the number of
+                                examples in inputs (dim 0), and each tuple containing
+                                #output_dims - 1 elements. Each tuple is applied as the
+                                target for the corresponding example.
+
+                            Default: None
+                additional_forward_args (tuple, optional): If the forward function
+                            requires additional arguments other than the inputs for
+                            which attributions should not be computed, this argument
+                            can be provided. It must be either a single additional
+                            argument of a Tensor or arbitrary (non-tuple) type or a
+                            tuple containing multiple additional arguments including
+                            tensors or any arbitrary python types. These arguments
+                            are provided to forward_func in order following the
+                            arguments in inputs.
+                            For a tensor, the first dimension of the tensor must
+                            correspond to the number of examples. For all other types,
+                            the given argument is used for all forward evaluations.
+                            Note that attributions are not computed with respect
+                            to these arguments.
+                            Default: None
+                feature_mask (tensor or tuple of tensors, optional):
+                            feature_mask defines a mask for the input, grouping
+                            features which should be kept or replaced together.
+                            feature_mask should contain the same number of tensors
+                            as inputs. Each tensor should
+                            be the same size as the corresponding input or
+                            broadcastable to match the input tensor. Values across
+                            all tensors should be integers, and indices
+                            corresponding to the same feature should have the same
+                            value. As in ShapleyValueSampling, scalars with the
+                            same value in different input tensors belong to the
+                            same feature.
+                            If the forward function returns a single scalar per batch,
+                            we enforce that the first dimension of each mask must be 1,
+                            since attributions are returned batch-wise rather than per
+                            example, so the attributions must correspond to the
+                            same features (indices) in each input example.
+                            If None, then a feature mask is constructed which assigns
+                            each scalar within a tensor as a separate feature.
+                            Default: None
+                n_samples (int, optional):  The number of sampled inputs, to
+                            which the surrogate model is fit.
+                            Default: 50
+                ablations_per_eval (int, optional): Allows multiple sampled
+                            inputs to be processed simultaneously in one call to
+                            forward_fn.
+                            Each forward pass will contain a maximum of
+                            ablations_per_eval * #examples samples.
+                            For DataParallel models, each batch is split among the
+                            available devices, so evaluations on each available
+                            device contain at most
+                            (ablations_per_eval * #examples) / num_devices
+                            samples.
+                            If the forward function returns a single scalar per batch,
+                            ablations_per_eval must be set to 1.
+                            Default: 1
+
+        Returns:
+                *tensor* or tuple of *tensors* of **attributions**:
+                - **attributions** (*tensor* or tuple of *tensors*):
+                            The coefficients of the surrogate model of each input
+                            feature.
+                            If the forward function returns
+                            a scalar value per example, attributions will be
+                            the same size as the provided inputs, with each value
+                            providing the attribution of the corresponding input index.
+                            If the forward function returns a scalar per batch, then
+                            attribution tensor(s) will have first dimension 1 and
+                            the remaining dimensions will match the input.
+                            If a single tensor is provided as inputs, a single tensor is
+                            returned. If a tuple is provided for inputs, a tuple of
+                            corresponding sized tensors is returned.
+
+        Examples::
+
+            >>> # SimpleClassifier takes a single input tensor of size Nx4x4,
+            >>> # and returns an Nx3 tensor of class probabilities.
+            >>> net = SimpleClassifier()
+            >>> # Generating random input with size 2 x 4 x 4
+            >>> input = torch.randn(2, 4, 4)
+            >>> # Defining Lime interpreter
+            >>> lime = Lime(net)
+            >>> # Computes attribution, fitting a linear model over the 16
+            >>> # features to the outputs of 200 sampled inputs, which are
+            >>> # evaluated 50 at a time.
+            >>> attr = lime.attribute(input, target=1, n_samples=200,
+            >>>                       ablations_per_eval=50)
+        """
+        return self._attribute_surrogate(
+            inputs,
+            baselines,
+            target,
+            additional_forward_args,
+            feature_mask,
+            n_samples,
+            ablations_per_eval,
+        )
+
+    def _attribute_surrogate(
+        self,
+        inputs,
+        baselines,
+        target,
+        additional_forward_args,
+        feature_mask,
+        n_samples,
+        ablations_per_eval,
+    ):
+        r"""
+        Computes the attributions of a surrogate model, see `attribute`.
+        Subclasses override `_sample_coalitions` and `_fit_surrogate`.
+        """
+        # Keeps track whether original input is a tuple or not before
+        # converting it into a tuple.
+        is_inputs_tuple = isinstance(inputs, tuple)
+        inputs, baselines = _format_input_baseline(inputs, baselines)
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
+        )
+        num_examples = inputs[0].shape[0]
+        feature_mask = _format_input(feature_mask) if feature_mask is not None else None
+        assert (
+            isinstance(ablations_per_eval, int) and ablations_per_eval >= 1
+        ), "Ablations per evaluation must be at least 1."
+        assert (
+            isinstance(n_samples, int) and n_samples > 0
+        ), "The number of samples must be greater than 0."
+
+        initial_eval = _run_forward(
+            self.forward_func, inputs, target, additional_forward_args
+        )
+        single_output_mode, initial_eval = self._check_output_mode(
+            initial_eval, num_examples, ablations_per_eval, feature_mask
+        )
+        initial_eval = torch.as_tensor(initial_eval).reshape(1, -1)
+        if not initial_eval.is_floating_point():
+            initial_eval = initial_eval.float()
+
+        feature_mask, num_features = _joint_feature_mask(inputs, feature_mask)
+        baselines = tuple(
+            baseline.reshape((1,) + baseline.shape)
+            if isinstance(baseline, torch.Tensor)
+            else baseline
+            for baseline in baselines
+        )
+
+        # added: dim -> (#coalitions, #features), sample_weights: (#coalitions,)
+        added, sample_weights = self._sample_coalitions(
+            num_features, n_samples, inputs[0].device
+        )
+        # evals: dim -> (#coalitions, #examples or 1 in single output mode)
+        evals = torch.cat(
+            [
+                self._eval_coalitions(
+                    inputs,
+                    baselines,
+                    feature_mask,
+                    added[start : start + ablations_per_eval],
+                    additional_forward_args,
+                    target,
+                )
+                for start in range(0, added.shape[0], ablations_per_eval)
+            ]
+        ).to(initial_eval.dtype)
+
+        coefs = self._fit_surrogate(
+            added.to(evals.dtype), sample_weights.to(evals.dtype), evals, initial_eval
+        )
+        # maps the attributions of the features to the locations of the inputs
+        attrib = _expand_feature_attrib(coefs.t(), inputs, feature_mask)
+        return _format_attributions(is_inputs_tuple, attrib)
+
+    def _sample_coalitions(self, num_features, n_samples, device):
+        r"""
+        Returns the boolean tensor of the sampled coalitions with shape
+        (`n_samples`, `num_features`), marking the kept features of each
+        sampled input, and the weight of each sampled input. Each feature is
+        kept independently with probability 1/2, and the weight is the
+        exponential kernel of the cosine distance to the all-ones vector.
+        """
+        added = torch.rand(n_samples, num_features, device=device) < 0.5
+        # the cosine distance of a binary vector with k ones to the all-ones
+        # vector is 1 - sqrt(k / #features)
+        distance = 1.0 - torch.sqrt(added.sum(dim=1).float() / num_features)
+        sample_weights = torch.exp(-(distance ** 2) / self.kernel_width ** 2)
+        return added, sample_weights
+
+    def _fit_surrogate(self, added, sample_weights, evals, initial_eval):
+        r"""
+        Fits the linear surrogate model with an intercept of each example by
+        weighted least squares, and returns the coefficients of the features
+        with shape (#features, #examples or 1). The models of all examples
+        share the design matrix and are fit with a single solve. The
+        evaluation of the original inputs, which is computed anyway, is added
+        as the sample of the full coalition, which has distance 0 and weight 1.
+        """
+        added = torch.cat([added, torch.ones_like(added[0:1])])
+        sample_weights = torch.cat([sample_weights, sample_weights.new_ones(1)])
+        evals = torch.cat([evals, initial_eval])
+        design = torch.cat([torch.ones_like(added[:, 0:1]), added], dim=1)
+        sqrt_weights = sample_weights.sqrt().unsqueeze(1)
+        # the pseudo-inverse gives the minimum norm solution, if the sampled
+        # coalitions do not determine all coefficients
+        coefs = torch.pinverse(sqrt_weights * design).matmul(sqrt_weights * evals)
+        return coefs[1:]
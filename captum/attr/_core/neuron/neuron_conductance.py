@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
 import torch
-from ..._utils.approximation_methods import approximation_parameters
+from functools import partial
+from ..._utils.approximation_methods import quadrature_parameters
 from ..._utils.attribution import NeuronAttribution, GradientAttribution
-from ..._utils.batching import _batched_operator
+from ..._utils.batching import (
+    _auto_internal_batch_size,
+    _batched_path_generator,
+    _call_with_batch_size_backoff,
+)
 from ..._utils.common import (
-    _reshape_and_sum,
     _format_input_baseline,
     _format_additional_forward_args,
     _validate_input,
     _format_attributions,
-    _expand_additional_forward_args,
-    _expand_target,
+    _sum_by_example,
     _verify_select_column,
 )
 from ..._utils.gradient import compute_layer_gradients_and_eval
@@ -58,6 +61,7 @@ class NeuronConductance(NeuronAttribution, GradientAttribution):
         method="riemann_trapezoid",
         internal_batch_size=None,
         attribute_to_neuron_input=False,
+        memory_budget_bytes=None,
     ):
         r"""
             Computes conductance with respect to particular hidden neuron. The
@@ -158,15 +162,25 @@ class NeuronConductance(NeuronAttribution, GradientAttribution):
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
                             `riemann_trapezoid` or `gausslegendre`.
                             Default: `gausslegendre` if no method is provided.
-                internal_batch_size (int, optional): Divides total #steps * #examples
-                            data points into chunks of size internal_batch_size,
-                            which are computed (forward / backward passes)
-                            sequentially.
+                internal_batch_size (int or string, optional): Divides total
+                            #steps * #examples data points into chunks of size
+                            internal_batch_size, which are computed (forward /
+                            backward passes) sequentially.
                             For DataParallel models, each batch is split among the
                             available devices, so evaluations on each available
                             device contain internal_batch_size / num_devices examples.
                             If internal_batch_size is None, then all evaluations are
                             processed in one batch.
+                            Scaled inputs are constructed lazily for each chunk and
+                            gradients are accumulated per example, so that peak
+                            memory scales with internal_batch_size rather than
+                            with #steps * #examples.
+                            If internal_batch_size is `auto`, the largest chunk
+                            size which fits into `memory_budget_bytes` is chosen
+                            by measuring the memory needed per data point on a
+                            few data points. If a chunk nevertheless fails to
+                            allocate memory, the chunk size is halved and the
+                            computation is retried.
                             Default: None
                 attribute_to_neuron_input (bool, optional): Indicates whether to
                             compute the attributions with respect to the neuron input
@@ -179,6 +193,12 @@ class NeuronConductance(NeuronAttribution, GradientAttribution):
                             attribute to the input or output, is a single tensor.
                             Support for multiple tensors will be added later.
                             Default: False
+                memory_budget_bytes (int, optional): Used only if
+                            `internal_batch_size` is `auto`. The number of bytes
+                            of memory which the forward and backward passes of
+                            each chunk may use. If None, half of the memory that
+                            is currently free on the device of inputs is used.
+                            Default: None
 
             Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -214,79 +234,145 @@ class NeuronConductance(NeuronAttribution, GradientAttribution):
         inputs, baselines = _format_input_baseline(inputs, baselines)
         _validate_input(inputs, baselines, n_steps, method)
 
-        num_examples = inputs[0].shape[0]
-        total_batch = num_examples * n_steps
-
         # Retrieve scaling factors for specified approximation method
-        step_sizes_func, alphas_func = approximation_parameters(method)
-        step_sizes, alphas = step_sizes_func(n_steps), alphas_func(n_steps)
-
-        # Compute scaled inputs from baseline to final input.
-        scaled_features_tpl = tuple(
-            torch.cat(
-                [baseline + alpha * (input - baseline) for alpha in alphas], dim=0
-            ).requires_grad_()
-            for input, baseline in zip(inputs, baselines)
+        step_sizes, alphas = quadrature_parameters(
+            method,
+            n_steps,
+            dtype=inputs[0].dtype if inputs[0].is_floating_point() else None,
+            device=inputs[0].device,
         )
 
         additional_forward_args = _format_additional_forward_args(
             additional_forward_args
         )
-        # apply number of steps to additional forward args
-        # currently, number of steps is applied only to additional forward arguments
-        # that are nd-tensors. It is assumed that the first dimension is
-        # the number of batches.
-        # dim -> (#examples * #steps x additional_forward_args[0].shape[1:], ...)
-        input_additional_args = (
-            _expand_additional_forward_args(additional_forward_args, n_steps)
-            if additional_forward_args is not None
-            else None
+
+        auto_batch_size = internal_batch_size == "auto"
+        if auto_batch_size:
+            internal_batch_size = _auto_internal_batch_size(
+                partial(self._chunk_gradients, neuron_index, attribute_to_neuron_input),
+                inputs,
+                baselines,
+                alphas,
+                additional_forward_args,
+                target,
+                memory_budget_bytes,
+            )
+        total_grads = _call_with_batch_size_backoff(
+            lambda batch_size: self._sum_path_gradients(
+                inputs,
+                baselines,
+                neuron_index,
+                target,
+                additional_forward_args,
+                alphas,
+                step_sizes,
+                batch_size,
+                attribute_to_neuron_input,
+            ),
+            internal_batch_size,
+            backoff=auto_batch_size,
         )
-        expanded_target = _expand_target(target, n_steps)
 
-        # Conductance Gradients - Returns gradient of output with respect to
-        # hidden layer and hidden layer evaluated at each input.
-        layer_gradients, layer_eval, input_grads = _batched_operator(
-            compute_layer_gradients_and_eval,
-            scaled_features_tpl,
-            input_additional_args,
-            internal_batch_size=internal_batch_size,
+        # computes attribution for each tensor in input tuple
+        # attributions has the same dimensionality as inputs
+        attributions = tuple(
+            total_grad * (input - baseline)
+            for total_grad, input, baseline in zip(total_grads, inputs, baselines)
+        )
+        return _format_attributions(is_inputs_tuple, attributions)
+
+    def _chunk_gradients(
+        self,
+        neuron_index,
+        attribute_to_neuron_input,
+        scaled_features_tpl,
+        input_additional_args,
+        target_ind,
+        step_ids,
+        example_ids,
+    ):
+        r"""
+        Computes the gradients of the output with respect to the layer, the
+        layer evaluations and the gradients of the neuron with respect to the
+        inputs at the points of a chunk yielded by `_batched_path_generator`.
+        """
+        return compute_layer_gradients_and_eval(
             forward_fn=self.forward_func,
             layer=self.layer,
-            target_ind=expanded_target,
+            inputs=scaled_features_tpl,
+            target_ind=target_ind,
+            additional_forward_args=input_additional_args,
             gradient_neuron_index=neuron_index,
             device_ids=self.device_ids,
             attribute_to_layer_input=attribute_to_neuron_input,
         )
 
-        # Multiplies by appropriate gradient of output with respect to hidden neurons
-        # mid_grads is a 1D Tensor of length num_steps*internal_batch_size,
-        # containing mid layer gradient for each input step.
-        mid_grads = _verify_select_column(layer_gradients, neuron_index)
-
-        scaled_input_gradients = tuple(
-            input_grad
-            * mid_grads.reshape((total_batch,) + (1,) * (len(input_grad.shape) - 1))
-            for input_grad in input_grads
-        )
+    def _sum_path_gradients(
+        self,
+        inputs,
+        baselines,
+        neuron_index,
+        target,
+        additional_forward_args,
+        alphas,
+        step_sizes,
+        internal_batch_size,
+        attribute_to_neuron_input,
+    ):
+        r"""
+        Sums the gradients of the neuron with respect to the inputs at the points
+        `baseline + alpha * (input - baseline)` for all given `alphas`, each
+        scaled by the corresponding element of `step_sizes` and the gradient of
+        the output with respect to the neuron, per example.
+        """
+        num_examples = inputs[0].shape[0]
 
-        # Mutliplies by appropriate step size.
-        scaled_grads = tuple(
-            scaled_input_gradient.contiguous().view(n_steps, -1)
-            * torch.tensor(step_sizes).view(n_steps, 1).to(scaled_input_gradient.device)
-            for scaled_input_gradient in scaled_input_gradients
-        )
+        # Scaled inputs from baseline to final input are constructed lazily, in
+        # chunks of at most internal_batch_size points, and the scaled input
+        # gradients are accumulated across all steps for each example.
+        total_grads = [None] * len(inputs)
+        for (
+            scaled_features_tpl,
+            input_additional_args,
+            target_ind,
+            step_ids,
+            example_ids,
+        ) in _batched_path_generator(
+            inputs,
+            baselines,
+            alphas,
+            additional_forward_args,
+            target,
+            internal_batch_size,
+        ):
+            # Conductance Gradients - Returns gradient of output with respect to
+            # hidden layer and hidden layer evaluated at each input.
+            layer_gradients, _, input_grads = self._chunk_gradients(
+                neuron_index,
+                attribute_to_neuron_input,
+                scaled_features_tpl,
+                input_additional_args,
+                target_ind,
+                step_ids,
+                example_ids,
+            )
+            with torch.no_grad():
+                # Multiplies by appropriate gradient of output with respect to
+                # hidden neurons. mid_grads is a 1D Tensor of length chunk size,
+                # containing mid layer gradient for each input step.
+                mid_grads = _verify_select_column(layer_gradients, neuron_index)
 
-        # Aggregates across all steps for each tensor in the input tuple
-        total_grads = tuple(
-            _reshape_and_sum(scaled_grad, n_steps, num_examples, input_grad.shape[1:])
-            for (scaled_grad, input_grad) in zip(scaled_grads, input_grads)
-        )
+                # Mutliplies by appropriate step size and aggregates across all
+                # steps for each tensor in the input tuple
+                total_grads = [
+                    _sum_by_example(
+                        total_grad,
+                        input_grad,
+                        example_ids,
+                        num_examples,
+                        mid_grads.reshape(-1) * step_sizes[step_ids].to(mid_grads),
+                    )
+                    for total_grad, input_grad in zip(total_grads, input_grads)
+                ]
 
-        # computes attribution for each tensor in input tuple
-        # attributions has the same dimensionality as inputs
-        attributions = tuple(
-            total_grad * (input - baseline)
-            for total_grad, input, baseline in zip(total_grads, inputs, baselines)
-        )
-        return _format_attributions(is_inputs_tuple, attributions)
+        return total_grads
@@ -21,6 +21,7 @@ class NeuronDeepLift(NeuronAttribution, GradientAttribution):
         """
         NeuronAttribution.__init__(self, model, layer)
         GradientAttribution.__init__(self, model)
+        self.deep_lift = DeepLift(model)
 
     def attribute(
         self,
@@ -169,7 +170,7 @@ class NeuronDeepLift(NeuronAttribution, GradientAttribution):
             >>> # index (4,1,2).
             >>> attribution = dl.attribute(input, (4,1,2))
         """
-        dl = DeepLift(self.forward_func)
+        dl = self.deep_lift
         dl.gradient_func = construct_neuron_grad_fn(
             self.layer,
             neuron_index,
@@ -183,6 +184,14 @@ class NeuronDeepLift(NeuronAttribution, GradientAttribution):
             custom_attribution_func=custom_attribution_func,
         )
 
+    def prepared_model(self):
+        r"""
+        Returns a context manager, which installs the DeepLift hooks on the
+        model once for all `attribute` calls within the context.
+        See `DeepLift.prepared_model` for more details.
+        """
+        return self.deep_lift.prepared_model()
+
 
 class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
     def __init__(self, model, layer):
@@ -199,6 +208,7 @@ class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
         """
         NeuronAttribution.__init__(self, model, layer)
         GradientAttribution.__init__(self, model)
+        self.deep_lift = DeepLiftShap(model)
 
     def attribute(
         self,
@@ -208,6 +218,7 @@ class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
         additional_forward_args=None,
         attribute_to_neuron_input=False,
         custom_attribution_func=None,
+        internal_batch_size=None,
     ):
         r"""
         Extends NeuronAttribution and uses LayerDeepLiftShap algorithms and
@@ -311,6 +322,17 @@ class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
                         attribution tensors that have the same length as the
                         `inputs`.
                         Default: None
+            internal_batch_size (int, optional): Divides the baselines into
+                        chunks, such that each chunk contains at most
+                        internal_batch_size input - baseline pairs, but at least
+                        one baseline. The chunks are attributed sequentially and
+                        the attributions are averaged across baselines with a
+                        running mean, so that memory scales with
+                        internal_batch_size rather than with
+                        #examples * #baselines.
+                        If internal_batch_size is None, all input - baseline
+                        pairs are attributed in one batch.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -337,7 +359,7 @@ class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
             >>> # index (4,1,2).
             >>> attribution = dl.attribute(input, (4,1,2))
         """
-        dl = DeepLiftShap(self.forward_func)
+        dl = self.deep_lift
         dl.gradient_func = construct_neuron_grad_fn(
             self.layer,
             neuron_index,
@@ -349,4 +371,13 @@ class NeuronDeepLiftShap(NeuronAttribution, GradientAttribution):
             baselines,
             additional_forward_args=additional_forward_args,
             custom_attribution_func=custom_attribution_func,
+            internal_batch_size=internal_batch_size,
         )
+
+    def prepared_model(self):
+        r"""
+        Returns a context manager, which installs the DeepLift hooks on the
+        model once for all `attribute` calls within the context.
+        See `DeepLift.prepared_model` for more details.
+        """
+        return self.deep_lift.prepared_model()
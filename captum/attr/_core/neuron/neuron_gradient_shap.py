@@ -38,6 +38,7 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
         stdevs=0.0,
         additional_forward_args=None,
         attribute_to_neuron_input=False,
+        sampler=None,
     ):
         r"""
         Implements gradient SHAP for a neuron in a hidden layer based on the
@@ -161,6 +162,17 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
                         attribute to the input or output, is a single tensor.
                         Support for multiple tensors will be added later.
                         Default: False
+            sampler (Sampler, optional): The sampler, which draws the noise,
+                        the baselines from the baselines' distribution and the
+                        points on the paths between the baselines and the inputs,
+                        e.g. a `StratifiedSampler` or a quasi-Monte Carlo
+                        `SobolSampler`, which reach the same accuracy as
+                        independent samples with fewer `n_samples`.
+                        If None, independent samples are drawn with the global
+                        random number generators of torch and numpy, as in
+                        previous versions, which hence draw the same samples
+                        for the same seeds.
+                        Default: None
 
         Returns:
             **attributions** or 2-element tuple of **attributions**, **delta**:
@@ -203,4 +215,5 @@ class NeuronGradientShap(NeuronAttribution, GradientAttribution):
             n_samples=n_samples,
             stdevs=stdevs,
             additional_forward_args=additional_forward_args,
+            sampler=sampler,
         )
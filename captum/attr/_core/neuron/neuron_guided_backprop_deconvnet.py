@@ -128,6 +128,14 @@ class NeuronDeconvolution(NeuronAttribution, GradientAttribution):
         )
         return self.deconv.attribute(inputs, None, additional_forward_args)
 
+    def prepared_model(self):
+        r"""
+        Returns a context manager, which installs the ReLU hooks on the
+        model once for all `attribute` calls within the context.
+        See `GuidedBackprop.prepared_model` for more details.
+        """
+        return self.deconv.prepared_model()
+
 
 class NeuronGuidedBackprop(NeuronAttribution, GradientAttribution):
     def __init__(self, model, layer, device_ids=None):
@@ -246,3 +254,11 @@ class NeuronGuidedBackprop(NeuronAttribution, GradientAttribution):
             self.layer, neuron_index, self.device_ids, attribute_to_neuron_input
         )
         return self.guided_backprop.attribute(inputs, None, additional_forward_args)
+
+    def prepared_model(self):
+        r"""
+        Returns a context manager, which installs the ReLU hooks on the
+        model once for all `attribute` calls within the context.
+        See `GuidedBackprop.prepared_model` for more details.
+        """
+        return self.guided_backprop.prepared_model()
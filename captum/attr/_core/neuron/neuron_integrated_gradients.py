@@ -40,6 +40,7 @@ class NeuronIntegratedGradients(NeuronAttribution, GradientAttribution):
         method="gausslegendre",
         internal_batch_size=None,
         attribute_to_neuron_input=False,
+        memory_budget_bytes=None,
     ):
         r"""
             Approximates the integral of gradients for a particular neuron
@@ -121,15 +122,25 @@ class NeuronIntegratedGradients(NeuronAttribution, GradientAttribution):
                             one of `riemann_right`, `riemann_left`, `riemann_middle`,
                             `riemann_trapezoid` or `gausslegendre`.
                             Default: `gausslegendre` if no method is provided.
-                internal_batch_size (int, optional): Divides total #steps * #examples
-                            data points into chunks of size internal_batch_size,
-                            which are computed (forward / backward passes)
-                            sequentially.
+                internal_batch_size (int or string, optional): Divides total
+                            #steps * #examples data points into chunks of size
+                            internal_batch_size, which are computed (forward /
+                            backward passes) sequentially.
                             For DataParallel models, each batch is split among the
                             available devices, so evaluations on each available
                             device contain internal_batch_size / num_devices examples.
                             If internal_batch_size is None, then all evaluations are
                             processed in one batch.
+                            Scaled inputs are constructed lazily for each chunk and
+                            gradients are accumulated per example, so that peak
+                            memory scales with internal_batch_size rather than
+                            with #steps * #examples.
+                            If internal_batch_size is `auto`, the largest chunk
+                            size which fits into `memory_budget_bytes` is chosen
+                            by measuring the memory needed per data point on a
+                            few data points. If a chunk nevertheless fails to
+                            allocate memory, the chunk size is halved and the
+                            computation is retried.
                             Default: None
                 attribute_to_neuron_input (bool, optional): Indicates whether to
                             compute the attributions with respect to the neuron input
@@ -142,6 +153,12 @@ class NeuronIntegratedGradients(NeuronAttribution, GradientAttribution):
                             attribute to the input or output, is a single tensor.
                             Support for multiple tensors will be added later.
                             Default: False
+                memory_budget_bytes (int, optional): Used only if
+                            `internal_batch_size` is `auto`. The number of bytes
+                            of memory which the forward and backward passes of
+                            each chunk may use. If None, half of the memory that
+                            is currently free on the device of inputs is used.
+                            Default: None
 
             Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -185,4 +202,5 @@ class NeuronIntegratedGradients(NeuronAttribution, GradientAttribution):
             n_steps=n_steps,
             method=method,
             internal_batch_size=internal_batch_size,
+            memory_budget_bytes=memory_budget_bytes,
         )
@@ -38,6 +38,8 @@ class NoiseTunnel(Attribution):
         """
         self.attribution_method = attribution_method
         self.is_delta_supported = self.attribution_method.has_convergence_delta()
+        # the buffers of the noisy inputs, which are reused across calls
+        self._noise_buffers = {}
 
         Attribution.__init__(self, self.attribution_method.forward_func)
 
@@ -48,6 +50,10 @@ class NoiseTunnel(Attribution):
         n_samples=5,
         stdevs=1.0,
         draw_baseline_from_distrib=False,
+        nt_samples_batch_size=None,
+        nt_rtol=None,
+        nt_sampler=None,
+        nt_reuse_buffers=False,
         **kwargs
     ):
         r"""
@@ -103,6 +109,49 @@ class NoiseTunnel(Attribution):
                         randomly draw baseline samples from the `baselines`
                         distribution provided as an input tensor.
                         Default: False
+            nt_samples_batch_size (int, optional): The number of noisy samples
+                        per example, which are attributed in one call to the
+                        attribution method. The samples are processed in chunks
+                        of this size, and only the running mean and the running
+                        sum of squared deviations of the attributions of each
+                        example are kept, so that the memory use is bounded by
+                        the chunk rather than by `n_samples`. The results are
+                        the same as when all samples are attributed at once.
+                        If None, all `n_samples` samples are attributed in one
+                        call, or in rounds of 5 samples if `nt_rtol` is given.
+                        Default: None
+            nt_rtol (float, optional): If given, the samples are drawn in rounds
+                        of `nt_samples_batch_size` samples, and `n_samples` is
+                        the maximum number of samples per example. After each
+                        round, an example is not sampled anymore, if the norm of
+                        the standard error of its mean attribution over all
+                        input tensors is at most `nt_rtol` times the norm of the
+                        mean attribution. The attributions of each example are
+                        computed from its own samples. If convergence deltas are
+                        returned, the deltas of all samples of an example are
+                        consecutive, and their number may differ per example.
+                        Default: None
+            nt_sampler (Sampler, optional): The sampler, which draws the noise
+                        and the baselines from the `baselines` distribution, e.g.
+                        a `StratifiedSampler` or a quasi-Monte Carlo
+                        `SobolSampler`, which reach the same accuracy as
+                        independent samples with fewer samples. The samples of
+                        each example are drawn jointly within each call to the
+                        attribution method, see `nt_samples_batch_size`.
+                        If None, independent samples are drawn with the global
+                        random number generators of torch and numpy, as in
+                        previous versions, which hence draw the same samples
+                        for the same seeds.
+                        Default: None
+            nt_reuse_buffers (bool, optional): If True, the noisy samples of
+                        each input tensor are written into a buffer, which is
+                        kept by the noise tunnel and reused by all later rounds
+                        and calls with inputs of the same size, dtype and device.
+                        The noisy inputs passed to the attribution method are
+                        overwritten by the next round, hence the attribution
+                        method must not keep references to them. If False, a
+                        new buffer is allocated for each round.
+                        Default: False
             **kwargs (Any, optional): Contains a list of arguments that are passed
                         to `attribution_method` attribution algorithm.
                         Any additional arguments that should be used for the
@@ -147,7 +196,7 @@ class NoiseTunnel(Attribution):
             >>>                            n_samples=10, target=3)
         """
 
-        def add_noise_to_inputs():
+        def add_noise_to_inputs(inputs, n):
             if isinstance(stdevs, tuple):
                 assert len(stdevs) == len(inputs), (
                     "The number of input tensors "
@@ -155,39 +204,78 @@ class NoiseTunnel(Attribution):
                         len(inputs), len(stdevs)
                     )
                 )
+                stdevs_ = stdevs
             else:
                 assert isinstance(
                     stdevs, float
                 ), "stdevs must be type float. " "Given: {}".format(type(stdevs))
                 stdevs_ = (stdevs,) * len(inputs)
             return tuple(
-                add_noise_to_input(input, stdev)
-                for (input, stdev) in zip(inputs, stdevs_)
+                add_noise_to_input(i, input, stdev, n)
+                for i, (input, stdev) in enumerate(zip(inputs, stdevs_))
             )
 
-        def add_noise_to_input(input, stdev):
+        def get_noise_buffer(i, input, input_expanded_size):
+            dtype = input.dtype
+            if not dtype.is_floating_point:
+                dtype = torch.get_default_dtype()
+            if not nt_reuse_buffers:
+                return torch.empty(
+                    input_expanded_size, dtype=dtype, device=input.device
+                )
+            buffer = self._noise_buffers.get(i)
+            if (
+                buffer is None
+                or buffer.shape[0] < input_expanded_size[0]
+                or buffer.shape[1:] != input_expanded_size[1:]
+                or buffer.dtype != dtype
+                or buffer.device != input.device
+            ):
+                buffer = torch.empty(
+                    input_expanded_size, dtype=dtype, device=input.device
+                )
+                self._noise_buffers[i] = buffer
+            return buffer[: input_expanded_size[0]]
+
+        def add_noise_to_input(i, input, stdev, n):
             # batch size
             bsz = input.shape[0]
 
             # expand input size by the number of drawn samples
-            input_expanded_size = (bsz * n_samples,) + input.shape[1:]
-
-            # expand stdev for the shape of the input and number of drawn samples
-            stdev_expanded = torch.tensor(stdev, device=input.device).repeat(
-                input_expanded_size
-            )
-
-            # draws `np.prod(input_expanded_size)` samples from normal distribution
-            # with given input parametrization
-            # FIXME it look like it is very difficult to make torch.normal
-            # deterministic this needs an investigation
-            noise = torch.normal(0, stdev_expanded)
-            return input.repeat_interleave(n_samples, dim=0) + noise
-
-        def expand_and_update_baselines():
+            input_expanded_size = (bsz * n,) + input.shape[1:]
+
+            noisy_input = get_noise_buffer(i, input, input_expanded_size)
+            with torch.no_grad():
+                # the samples of each example are consecutive in the buffer
+                samples = noisy_input.view((bsz, n) + input.shape[1:])
+                # the noise is drawn even if `stdev` is 0, so that each call
+                # consumes the same random numbers for any `stdev`
+                if sampler is None:
+                    # draws the noise in-place into the buffer with the global
+                    # random number generator in the order of the samples, as
+                    # previous versions did, and shifts it to the noisy samples
+                    stdev_expanded = torch.tensor(
+                        stdev, dtype=samples.dtype, device=input.device
+                    ).expand(samples.shape)
+                    torch.normal(0.0, stdev_expanded, out=samples)
+                    samples.add_(input.unsqueeze(1))
+                else:
+                    # draws the standard normal noise in-place into the buffer,
+                    # which the sampler sees with dimensions (n, bsz, ...), and
+                    # scales and shifts it to the noisy samples
+                    sampler.normal_(samples.transpose(0, 1))
+                    samples.mul_(stdev).add_(input.unsqueeze(1))
+            return noisy_input
+
+        def expand_and_update_baselines(inputs, kwargs, n):
             def get_random_baseline_indices(bsz, baseline):
                 num_ref_samples = baseline.shape[0]
-                return np.random.choice(num_ref_samples, n_samples * bsz).tolist()
+                if sampler is None:
+                    return np.random.choice(num_ref_samples, n * bsz).tolist()
+                indices = sampler.randint(
+                    num_ref_samples, n, (bsz,), device=baseline.device
+                )
+                return indices.t().reshape(-1)
 
             # TODO allow to add noise to baselines as well
             # expand baselines to match the sizes of input
@@ -210,7 +298,7 @@ class NoiseTunnel(Attribution):
                 )
             else:
                 baselines = tuple(
-                    baseline.repeat_interleave(n_samples, dim=0)
+                    baseline.repeat_interleave(n, dim=0)
                     if isinstance(baseline, torch.Tensor)
                     and baseline.shape[0] == input.shape[0]
                     and baseline.shape[0] > 1
@@ -220,7 +308,7 @@ class NoiseTunnel(Attribution):
             # update kwargs with expanded baseline
             kwargs["baselines"] = baselines
 
-        def expand_and_update_additional_forward_args():
+        def expand_and_update_additional_forward_args(kwargs, n):
             if "additional_forward_args" not in kwargs:
                 return
             additional_forward_args = kwargs["additional_forward_args"]
@@ -231,32 +319,80 @@ class NoiseTunnel(Attribution):
                 return
             additional_forward_args = _expand_additional_forward_args(
                 additional_forward_args,
-                n_samples,
+                n,
                 expansion_type=ExpansionTypes.repeat_interleave,
             )
             # update kwargs with expanded baseline
             kwargs["additional_forward_args"] = additional_forward_args
 
-        def expand_and_update_target():
+        def expand_and_update_target(kwargs, n):
             if "target" not in kwargs:
                 return
             target = kwargs["target"]
             target = _expand_target(
-                target, n_samples, expansion_type=ExpansionTypes.repeat_interleave
+                target, n, expansion_type=ExpansionTypes.repeat_interleave
             )
             # update kwargs with expanded baseline
             kwargs["target"] = target
 
-        def compute_expected_attribution_and_sq(attribution):
-            bsz = attribution.shape[0] // n_samples
-            attribution_shape = (bsz, n_samples)
-            if len(attribution.shape) > 1:
-                attribution_shape += attribution.shape[1:]
-
-            attribution = attribution.view(attribution_shape)
-            expected_attribution = attribution.mean(dim=1, keepdim=False)
-            expected_attribution_sq = torch.mean(attribution ** 2, dim=1, keepdim=False)
-            return expected_attribution, expected_attribution_sq
+        def select_examples(kwargs, indices):
+            # returns a copy of kwargs, in which all per-example arguments are
+            # restricted to the examples with the given indices
+            bsz = inputs[0].shape[0]
+
+            def select(arg):
+                if (
+                    isinstance(arg, torch.Tensor)
+                    and arg.dim() > 0
+                    and arg.shape[0] == bsz
+                    and bsz > 1
+                ):
+                    return arg[indices]
+                return arg
+
+            selected_kwargs = dict(kwargs)
+            if "baselines" in kwargs and not draw_baseline_from_distrib:
+                selected_kwargs["baselines"] = tuple(
+                    select(baseline)
+                    for baseline in _format_baseline(kwargs["baselines"], inputs)
+                )
+            additional_forward_args = _format_additional_forward_args(
+                kwargs.get("additional_forward_args")
+            )
+            if additional_forward_args is not None:
+                selected_kwargs["additional_forward_args"] = tuple(
+                    select(arg) for arg in additional_forward_args
+                )
+            target = kwargs.get("target")
+            if isinstance(target, list):
+                selected_kwargs["target"] = [target[k] for k in indices.tolist()]
+            elif isinstance(target, torch.Tensor) and torch.numel(target) > 1:
+                selected_kwargs["target"] = target[indices]
+            return selected_kwargs
+
+        def attribute_noisy_samples(inputs, kwargs, n):
+            # draws `n` noisy samples per example and returns the attributions
+            # of each input with shape (bsz, n, ...), and the delta
+            inputs_with_noise = add_noise_to_inputs(inputs, n)
+            # if the algorithm supports targets, baselines and/or
+            # additional_forward_args they will be expanded based on the n
+            # samples in a copy of kwargs
+            expanded_kwargs = dict(kwargs)
+            expand_and_update_baselines(inputs, expanded_kwargs, n)
+            expand_and_update_additional_forward_args(expanded_kwargs, n)
+            expand_and_update_target(expanded_kwargs, n)
+            # smoothgrad_Attr(x) = 1 / n * sum(Attr(x + N(0, sigma^2))
+            attributions = self.attribution_method.attribute(
+                inputs_with_noise, **expanded_kwargs
+            )
+            delta = 0
+            if self.is_delta_supported and return_convergence_delta:
+                attributions, delta = attributions
+            attributions = tuple(
+                attribution.reshape((-1, n) + attribution.shape[1:])
+                for attribution in _format_tensor_into_tuples(attributions)
+            )
+            return attributions, delta
 
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
@@ -265,60 +401,123 @@ class NoiseTunnel(Attribution):
         inputs = _format_input(inputs)
 
         _validate_noise_tunnel_type(nt_type, SUPPORTED_NOISE_TUNNEL_TYPES)
-
-        delta = 0
-        inputs_with_noise = add_noise_to_inputs()
-        # if the algorithm supports targets, baselines and/or additional_forward_args
-        # they will be expanded based on the n_steps and corresponding kwargs
-        # variables will be updated accordingly
-        expand_and_update_baselines()
-        expand_and_update_additional_forward_args()
-        expand_and_update_target()
-        # smoothgrad_Attr(x) = 1 / n * sum(Attr(x + N(0, sigma^2))
-        attributions = self.attribution_method.attribute(inputs_with_noise, **kwargs)
+        sampler = nt_sampler
+        if nt_samples_batch_size is None:
+            nt_samples_batch_size = n_samples if nt_rtol is None else 5
+        assert (
+            isinstance(nt_samples_batch_size, int) and nt_samples_batch_size > 0
+        ), "nt_samples_batch_size must be a positive integer."
+        assert nt_rtol is None or nt_rtol >= 0, "nt_rtol must be non-negative."
 
         return_convergence_delta = (
             "return_convergence_delta" in kwargs and kwargs["return_convergence_delta"]
         )
 
-        if self.is_delta_supported and return_convergence_delta:
-            attributions, delta = attributions
-        attributions = _format_tensor_into_tuples(attributions)
-
-        expected_attributions = []
-        expected_attributions_sq = []
-        for attribution in attributions:
-            expected_attr, expected_attr_sq = compute_expected_attribution_and_sq(
-                attribution
+        # the running mean and sum of squared deviations from the mean of the
+        # sampled attributions of each example, combined over the rounds of
+        # samples with Welford's (Chan's parallel) update
+        bsz = inputs[0].shape[0]
+        counts = torch.zeros(bsz, dtype=torch.long, device=inputs[0].device)
+        means = None
+        sq_devs = None
+        deltas = []
+        # the examples, which are still sampled, all have `count` samples
+        active = torch.arange(bsz, device=inputs[0].device)
+        active_inputs = inputs
+        active_kwargs = kwargs
+        count = 0
+        while True:
+            n = min(nt_samples_batch_size, n_samples - count)
+            attributions, delta = attribute_noisy_samples(
+                active_inputs, active_kwargs, n
             )
-            expected_attributions.append(expected_attr)
-            expected_attributions_sq.append(expected_attr_sq)
+            deltas.append((active, delta))
+            chunk_means = tuple(attribution.mean(dim=1) for attribution in attributions)
+            chunk_sq_devs = tuple(
+                ((attribution - chunk_mean.unsqueeze(1)) ** 2).sum(dim=1)
+                for attribution, chunk_mean in zip(attributions, chunk_means)
+            )
+            if means is None:
+                means = [
+                    torch.zeros(
+                        (bsz,) + chunk_mean.shape[1:],
+                        dtype=chunk_mean.dtype,
+                        device=chunk_mean.device,
+                    )
+                    for chunk_mean in chunk_means
+                ]
+                sq_devs = [torch.zeros_like(mean) for mean in means]
+            for j in range(len(means)):
+                means[j][active], sq_devs[j][active] = _merge_running_stats(
+                    count,
+                    means[j][active],
+                    sq_devs[j][active],
+                    n,
+                    chunk_means[j],
+                    chunk_sq_devs[j],
+                )
+            count += n
+            counts[active] = count
+            if count >= n_samples:
+                break
+            if nt_rtol is not None and count >= 2:
+                # the squared norms of the standard errors of the means, and of
+                # the means of all inputs of each active example
+                sq_std_errors = sum(
+                    (sq_dev[active] / ((count - 1) * count))
+                    .reshape(len(active), -1)
+                    .sum(dim=1)
+                    for sq_dev in sq_devs
+                )
+                sq_norms = sum(
+                    (mean[active] ** 2).reshape(len(active), -1).sum(dim=1)
+                    for mean in means
+                )
+                unstable = sq_std_errors > nt_rtol ** 2 * sq_norms
+                if not unstable.all():
+                    if not unstable.any():
+                        break
+                    selected = torch.nonzero(unstable).reshape(-1)
+                    active = active[selected]
+                    active_inputs = tuple(input[active] for input in inputs)
+                    active_kwargs = select_examples(kwargs, active)
+
+        delta = 0
+        if self.is_delta_supported and return_convergence_delta:
+            # the deltas of all samples of an example are consecutive
+            if len(deltas) == 1:
+                delta = deltas[0][1]
+            else:
+                example_deltas = [[] for _ in range(bsz)]
+                for round_active, round_delta in deltas:
+                    round_delta = round_delta.reshape(len(round_active), -1)
+                    for row, k in enumerate(round_active.tolist()):
+                        example_deltas[k].append(round_delta[row])
+                delta = torch.cat([torch.cat(rows) for rows in example_deltas])
 
         if NoiseTunnelType[nt_type] == NoiseTunnelType.smoothgrad:
             return self._apply_checks_and_return_attributions(
-                tuple(expected_attributions),
-                is_inputs_tuple,
-                return_convergence_delta,
-                delta,
+                tuple(means), is_inputs_tuple, return_convergence_delta, delta
             )
 
+        # the population variance of the sampled attributions
+        variances = tuple(
+            sq_dev / counts.reshape((-1,) + (1,) * (sq_dev.dim() - 1)).to(sq_dev.dtype)
+            for sq_dev in sq_devs
+        )
         if NoiseTunnelType[nt_type] == NoiseTunnelType.smoothgrad_sq:
+            # the mean of the squared attributions
             return self._apply_checks_and_return_attributions(
-                tuple(expected_attributions_sq),
+                tuple(
+                    variance + mean * mean for variance, mean in zip(variances, means)
+                ),
                 is_inputs_tuple,
                 return_convergence_delta,
                 delta,
             )
 
-        vargrad = tuple(
-            expected_attribution_sq - expected_attribution * expected_attribution
-            for expected_attribution, expected_attribution_sq in zip(
-                expected_attributions, expected_attributions_sq
-            )
-        )
-
         return self._apply_checks_and_return_attributions(
-            vargrad, is_inputs_tuple, return_convergence_delta, delta
+            variances, is_inputs_tuple, return_convergence_delta, delta
         )
 
     def _apply_checks_and_return_attributions(
@@ -334,3 +533,18 @@ class NoiseTunnel(Attribution):
 
     def has_convergence_delta(self):
         return self.is_delta_supported
+
+
+def _merge_running_stats(count, mean, sq_dev, chunk_count, chunk_mean, chunk_sq_dev):
+    r"""
+    Combines the running mean and sum of squared deviations from the mean of
+    `count` samples with those of a chunk of `chunk_count` further samples,
+    see Chan et al., "Updating Formulae and a Pairwise Algorithm for Computing
+    Sample Variances". This extends the scalar Welford update of `Stat` to
+    tensors and chunks of samples.
+    """
+    total = count + chunk_count
+    diff = chunk_mean - mean
+    mean = mean + diff * (chunk_count / total)
+    sq_dev = sq_dev + chunk_sq_dev + diff * diff * (count * chunk_count / total)
+    return mean, sq_dev
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import torch
+
+from .._utils.common import _format_input
+from .feature_ablation import FeatureAblation
+
+
+class Occlusion(FeatureAblation):
+    def __init__(self, forward_func, input_encoders=None, fusion_func=None):
+        r"""
+        Args:
+
+            forward_func (callable): The forward function of the model or
+                        any modification of it
+            input_encoders (list of callables, optional): The encoder of each
+                        input tensor, whose encodings of the unoccluded inputs
+                        are reused, see FeatureAblation.
+                        Default: None
+            fusion_func (callable, optional): The function, which computes
+                        the model output from the encodings of all input
+                        tensors, see FeatureAblation.
+                        Default: None
+        """
+        FeatureAblation.__init__(self, forward_func, input_encoders, fusion_func)
+        self.use_weights = True
+
+    def attribute(
+        self,
+        inputs,
+        sliding_window_shapes,
+        strides=None,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
+    ):
+        r"""
+        A perturbation based approach to computing attribution, involving
+        replacing each contiguous rectangular region with a given baseline /
+        reference, and computing the difference in output. For features located
+        in multiple regions (hyperrectangles), the corresponding output
+        differences are averaged to compute the attribution for that feature.
+
+        The first patch is applied with the corner aligned with all indices 0,
+        and strides are applied until the entire dimension range is covered.
+        Note that this may cause the final patch applied in a direction to be
+        cut-off and thus smaller than the target occlusion shape. Features,
+        which are not covered by any patch, are given attribution 0.
+
+        More details regarding the occlusion (or grey-box / sliding window)
+        method can be found in the original paper and in the DeepExplain
+        implementation.
+        https://arxiv.org/abs/1311.2901
+        https://github.com/marcoancona/DeepExplain/blob/master/deepexplain\
+        /tensorflow/methods.py#L401
+
+        Args:
+
+                inputs (tensor or tuple of tensors):  Input for which occlusion
+                            attributions are computed. If forward_func takes a single
+                            tensor as input, a single input tensor should be provided.
+                            If forward_func takes multiple tensors as input, a tuple
+                            of the input tensors should be provided. It is assumed
+                            that for all given input tensors, dimension 0 corresponds
+                            to the number of examples (aka batch size), and if
+                            multiple input tensors are provided, the examples must
+                            be aligned appropriately.
+                sliding_window_shapes (tuple or tuple of tuples): Shape of patch
+                            (hyperrectangle) to occlude each input. For a single
+                            input tensor, this must be a tuple of length equal to the
+                            number of dimensions of the input tensor - 1, defining
+                            the dimensions of the patch. If the input tensor is 1-d,
+                            this should be an empty tuple. For multiple input tensors,
+                            this must be a tuple containing one tuple for each input
+                            tensor defining the dimensions of the patch for that
+                            input tensor, as described for the single tensor case.
+                strides (int or tuple or tuple of ints or tuple of tuples, optional):
+                            This defines the step by which the occlusion hyperrectangle
+                            should be shifted by in each direction for each iteration.
+                            For a single tensor input, this can be either a single
+                            integer, which is used as the step size in each direction,
+                            or a tuple of integers matching the number of dimensions
+                            in the occlusion shape, defining the step size in the
+                            corresponding dimension. For multiple tensor inputs, this
+                            can be either a tuple of integers, one for each input
+                            tensor (used for all dimensions of the corresponding
+                            tensor), or a tuple of tuples, providing the stride per
+                            dimension for each tensor.
+                            To ensure that all inputs are covered by at least one
+                            sliding window, the stride for any dimension must be
+                            <= the corresponding sliding window dimension if the
+                            sliding window dimension is less than the input
+                            dimension.
+                            If None is provided, a stride of 1 is used for each
+                            dimension of each input tensor.
+                            Default: None
+                baselines (scalar, tensor, tuple of scalars or tensors, optional):
+                            Baselines define reference value which replaces each
+                            feature when occluded.
+                            Baselines can be provided as:
+                            - a single tensor, if inputs is a single tensor, with
+                                exactly the same dimensions as inputs or
+                                broadcastable to match the dimensions of inputs
+                            - a single scalar, if inputs is a single tensor, which will
+                                be broadcasted for each input value in input tensor.
+                            - a tuple of tensors or scalars, the baseline corresponding
+                                to each tensor in the inputs' tuple can be:
+                                - either a tensor with
+                                    exactly the same dimensions as inputs or
+                                    broadcastable to match the dimensions of inputs
+                                - or a scalar, corresponding to a tensor in the
+                                    inputs' tuple. This scalar value is broadcasted
+                                    for corresponding input tensor.
+                            In the cases when `baselines` is not provided, we internally
+                            use zero scalar corresponding to each input tensor.
+                            Default: None
+                target (int, tuple, tensor or list, optional):  Output indices for
+                            which difference is computed (for classification cases,
+                            this is usually the target class).
+                            If the network returns a scalar value per example,
+                            no target index is necessary.
+                            For general 2D outputs, targets can be either:
+
+                            - a single integer or a tensor containing a single
+                                integer, which is applied to all input examples
+
+                            - a list of integers or a 1D tensor, with length matching
+                                the number of examples in inputs (dim 0). Each integer
+                                is applied as the target for the corresponding example.
+
+                            For outputs with > 2 dimensions, targets can be either:
+
+                            - A single tuple, which contains #output_dims - 1
+                                elements. This target index is applied to all examples.
+
+                            - A list of tuples with length equal to the number of
+                                examples in inputs (dim 0), and each tuple containing
+                                #output_dims - 1 elements. Each tuple is applied as the
+                                target for the corresponding example.
+
+                            Default: None
+                additional_forward_args (tuple, optional): If the forward function
+                            requires additional arguments other than the inputs for
+                            which attributions should not be computed, this argument
+                            can be provided. It must be either a single additional
+                            argument of a Tensor or arbitrary (non-tuple) type or a
+                            tuple containing multiple additional arguments including
+                            tensors or any arbitrary python types. These arguments
+                            are provided to forward_func in order following the
+                            arguments in inputs.
+                            For a tensor, the first dimension of the tensor must
+                            correspond to the number of examples. For all other types,
+                            the given argument is used for all forward evaluations.
+                            Note that attributions are not computed with respect
+                            to these arguments.
+                            Default: None
+                ablations_per_eval (int, optional): Allows multiple occlusions
+                            to be included in one batch (one call to forward_fn).
+                            Each forward pass will contain a maximum of
+                            ablations_per_eval * #examples samples.
+                            For DataParallel models, each batch is split among the
+                            available devices, so evaluations on each available
+                            device contain at most
+                            (ablations_per_eval * #examples) / num_devices
+                            samples.
+                            If the forward function returns a single scalar per batch,
+                            ablations_per_eval must be set to 1.
+                            Default: 1
+                executor (concurrent.futures.Executor, optional): If given, the
+                            ablated batches are evaluated by submitting the forward
+                            function to this executor, see FeatureAblation.
+                            Default: None
+                max_pending (int, optional): The maximum number of occluded
+                            batches pending in the executor, see FeatureAblation.
+                            Default: None
+
+        Returns:
+                *tensor* or tuple of *tensors* of **attributions**:
+                - **attributions** (*tensor* or tuple of *tensors*):
+                            The attributions with respect to each input feature.
+                            Attributions will always be
+                            the same size as the provided inputs, with each value
+                            providing the attribution of the corresponding input index.
+                            If the forward function returns a scalar per batch, then
+                            attribution tensor(s) will have first dimension 1 and
+                            the remaining dimensions will match the input.
+                            If a single tensor is provided as inputs, a single tensor is
+                            returned. If a tuple is provided for inputs, a tuple of
+                            corresponding sized tensors is returned.
+
+
+        Examples::
+
+            >>> # SimpleClassifier takes a single input tensor of size Nx4x4,
+            >>> # and returns an Nx3 tensor of class probabilities.
+            >>> net = SimpleClassifier()
+            >>> # Generating random input with size 2 x 4 x 4
+            >>> input = torch.randn(2, 4, 4)
+            >>> # Defining Occlusion interpreter
+            >>> occ = Occlusion(net)
+            >>> # Computes occlusion attribution, ablating each 3x3 patch,
+            >>> # shifting in each direction by the default of 1.
+            >>> attr = occ.attribute(input, target=1, sliding_window_shapes=(3,3))
+        """
+        return self._attribute(
+            inputs,
+            baselines=baselines,
+            target=target,
+            additional_forward_args=additional_forward_args,
+            ablations_per_eval=ablations_per_eval,
+            executor=executor,
+            max_pending=max_pending,
+            **self._window_kwargs(inputs, sliding_window_shapes, strides)
+        )
+
+    def attribute_iter(
+        self,
+        inputs,
+        sliding_window_shapes,
+        strides=None,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        ablations_per_eval=1,
+        executor=None,
+        max_pending=None,
+        checkpoint_path=None,
+        checkpoint_interval=1,
+    ):
+        r"""
+        Computes the same attributions as `attribute`, but yields the partial
+        attributions after each occluded batch, and optionally saves and
+        resumes from checkpoints, see `FeatureAblation.attribute_iter`.
+        """
+        is_inputs_tuple = isinstance(inputs, tuple)
+        for total_attrib, weights in self._ablation_steps(
+            inputs,
+            baselines=baselines,
+            target=target,
+            additional_forward_args=additional_forward_args,
+            ablations_per_eval=ablations_per_eval,
+            executor=executor,
+            max_pending=max_pending,
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+            **self._window_kwargs(inputs, sliding_window_shapes, strides)
+        ):
+            # the totals are updated in place by the next batches
+            yield self._format_ablation_attrib(
+                is_inputs_tuple,
+                [single_attrib.clone() for single_attrib in total_attrib],
+                weights,
+            )
+
+    def _window_kwargs(self, inputs, sliding_window_shapes, strides):
+        r"""
+        Returns the per-input keyword arguments `window_masks` and
+        `shift_counts` of the ablation hooks.
+        """
+        formatted_inputs = _format_input(inputs)
+
+        # Formatting strides
+        strides = _format_and_verify_strides(strides, formatted_inputs)
+
+        # Formatting sliding window shapes
+        sliding_window_shapes = _format_and_verify_sliding_window_shapes(
+            sliding_window_shapes, formatted_inputs
+        )
+
+        # Construct the masks of the window positions along each dimension
+        # and the number of positions, i.e. shifts, in each dimension
+        window_masks = []
+        shift_counts = []
+        for input, window_shape, stride in zip(
+            formatted_inputs, sliding_window_shapes, strides
+        ):
+            dim_masks, dim_counts = _window_position_masks(
+                input.shape[1:], window_shape, stride, input.device
+            )
+            window_masks.append(dim_masks)
+            shift_counts.append(dim_counts)
+        return {
+            "window_masks": tuple(window_masks),
+            "shift_counts": tuple(shift_counts),
+        }
+
+    def _get_feature_range_and_mask(
+        self, input, input_mask, window_masks, shift_counts, **kwargs
+    ):
+        r"""
+        Each position of the sliding window is a feature. The feature mask is
+        not used, the occluded region of each feature is constructed from the
+        window positions in `_construct_ablated_input`.
+        """
+        return 0, int(np.prod(shift_counts)), None
+
+    def _construct_ablated_input(
+        self,
+        feature_tensor,
+        input_mask,
+        baseline,
+        start_feature,
+        end_feature,
+        window_masks,
+        shift_counts,
+        **kwargs
+    ):
+        r"""
+        Occludes the given feature tensor with the sliding windows at the
+        positions start_feature to end_feature - 1. `window_masks` contains
+        a boolean mask of shape (#shifts, size) for each dimension of an
+        input example, whose k-th row marks the locations covered by the
+        window after k shifts along this dimension. feature_tensor shape is
+        (`num_features`, `num_examples`, ...), where `num_features` =
+        `end_feature` - `start_feature`.
+
+        The occlusion mask of each position is the outer product of the window
+        masks of its shifts along all dimensions, which is computed for all
+        positions at once by broadcasting. The returned mask has shape
+        (`num_features`, 1, ...).
+        """
+        # position ids -> shift along each dimension, row-major
+        shifts = np.unravel_index(np.arange(start_feature, end_feature), shift_counts)
+        num_dims = len(window_masks)
+        current_mask = torch.ones(
+            (end_feature - start_feature, 1) + (1,) * num_dims,
+            dtype=torch.bool,
+            device=feature_tensor.device,
+        )
+        for dim, (dim_mask, dim_shifts) in enumerate(zip(window_masks, shifts)):
+            # selected: dim -> (#features, input.shape[dim + 1])
+            selected = dim_mask[torch.as_tensor(dim_shifts, device=dim_mask.device)]
+            shape = (1,) * dim + (dim_mask.shape[1],) + (1,) * (num_dims - dim - 1)
+            current_mask = current_mask & selected.reshape((-1, 1) + shape)
+        return self._ablate_masked(feature_tensor, current_mask, baseline)
+
+
+def _window_position_masks(input_shape, window_shape, stride, device):
+    r"""
+    Returns for each dimension of an input example a boolean mask of shape
+    (#shifts, input_shape[dim]), whose k-th row marks the locations covered
+    by the sliding window after k shifts by the stride, and the number of
+    shifts along each dimension.
+    """
+    dim_masks = []
+    dim_counts = []
+    for size, window, step in zip(input_shape, window_shape, stride):
+        # the last window may be cut-off at the end of the dimension
+        count = max(int(np.ceil((size - window) / step)), 0) + 1
+        starts = torch.arange(count, device=device).unsqueeze(1) * step
+        locations = torch.arange(size, device=device).unsqueeze(0)
+        dim_masks.append((locations >= starts) & (locations < starts + window))
+        dim_counts.append(count)
+    return tuple(dim_masks), tuple(dim_counts)
+
+
+def _format_and_verify_strides(strides, inputs):
+    # Formats strides, which are necessary for occlusion
+    # Assumes inputs are already formatted (in tuple)
+    if strides is None:
+        strides = tuple(1 for input in inputs)
+    elif len(inputs) == 1 and not (
+        isinstance(strides, tuple)
+        and len(strides) == 1
+        and isinstance(strides[0], tuple)
+    ):
+        strides = (strides,)
+    assert isinstance(strides, tuple) and len(strides) == len(
+        inputs
+    ), "Strides must be provided for each input tensor."
+    formatted_strides = []
+    for i in range(len(inputs)):
+        stride = strides[i]
+        if isinstance(stride, int):
+            stride = tuple(stride for _ in range(len(inputs[i].shape) - 1))
+        assert len(stride) == len(inputs[i].shape) - 1, (
+            "Length of strides for input {} must match the number of dimensions"
+            " of the input excluding the batch dimension.".format(i)
+        )
+        assert all(step > 0 for step in stride), "Strides must be positive."
+        formatted_strides.append(tuple(stride))
+    return tuple(formatted_strides)
+
+
+def _format_and_verify_sliding_window_shapes(sliding_window_shapes, inputs):
+    # Formats sliding window shapes, which are necessary for occlusion
+    # Assumes inputs are already formatted (in tuple)
+    if len(sliding_window_shapes) == 0 or isinstance(sliding_window_shapes[0], int):
+        sliding_window_shapes = (sliding_window_shapes,)
+    assert len(sliding_window_shapes) == len(
+        inputs
+    ), "Must provide sliding window dimensions for each input tensor."
+    for i in range(len(inputs)):
+        assert len(sliding_window_shapes[i]) == len(inputs[i].shape) - 1, (
+            "Occlusion shape for input {} must match the number of dimensions"
+            " of the input excluding the batch dimension.".format(i)
+        )
+        assert all(
+            0 < window <= size
+            for window, size in zip(sliding_window_shapes[i], inputs[i].shape[1:])
+        ), "Occlusion shape must be positive and not exceed the input shape."
+    return tuple(tuple(shape) for shape in sliding_window_shapes)
@@ -2,9 +2,18 @@
 
 import torch
 
-from .._utils.common import _format_attributions, _format_input
+from .._utils.common import (
+    _format_attributions,
+    _format_input,
+    _format_multi_targets,
+    _validate_target,
+)
 from .._utils.attribution import GradientAttribution
-from .._utils.gradient import apply_gradient_requirements, undo_gradient_requirements
+from .._utils.gradient import (
+    apply_gradient_requirements,
+    compute_multi_target_gradients,
+    undo_gradient_requirements,
+)
 
 
 class Saliency(GradientAttribution):
@@ -17,7 +26,9 @@ class Saliency(GradientAttribution):
         """
         GradientAttribution.__init__(self, forward_func)
 
-    def attribute(self, inputs, target=None, abs=True, additional_forward_args=None):
+    def attribute(
+        self, inputs, target=None, abs=True, additional_forward_args=None, targets=None
+    ):
         r""""
         A baseline approach for computing input attribution. It returns
         the gradients with respect to inputs. If `abs` is set to True, which is
@@ -78,6 +89,19 @@ class Saliency(GradientAttribution):
                             Note that attributions are not computed with respect
                             to these arguments.
                             Default: None
+                targets (list or tensor, optional): Multiple output indices for
+                            which gradients are computed at once, instead of a
+                            single `target`. It can be either a list of targets,
+                            each of which can be any `target` described above, or
+                            a 2D tensor of size (#examples, #targets) containing one
+                            target per example in each column. The forward pass is
+                            run only once for all targets and the gradients of all
+                            selected outputs are computed with batched
+                            vector-Jacobian products. If `targets` is provided,
+                            attributions have an additional dimension of size
+                            #targets following the first (examples) dimension. It
+                            cannot be used together with `target`.
+                            Default: None
 
         Returns:
                 *tensor* or tuple of *tensors* of **attributions**:
@@ -89,6 +113,9 @@ class Saliency(GradientAttribution):
                             If a single tensor is provided as inputs, a single tensor is
                             returned. If a tuple is provided for inputs, a tuple of
                             corresponding sized tensors is returned.
+                            If `targets` is provided, each attribution tensor has
+                            an additional dimension of size #targets following
+                            the first dimension.
 
 
         Examples::
@@ -102,6 +129,9 @@ class Saliency(GradientAttribution):
             >>> saliency = Saliency(net)
             >>> # Computes saliency maps for class 3.
             >>> attribution = saliency.attribute(input, target=3)
+            >>> # Computes saliency maps for classes 3 and 5 with a single
+            >>> # forward pass, attribution is of size 2x2x3x32x32.
+            >>> attribution = saliency.attribute(input, targets=[3, 5])
         """
         # Keeps track whether original input is a tuple or not before
         # converting it into a tuple.
@@ -112,9 +142,19 @@ class Saliency(GradientAttribution):
 
         # No need to format additional_forward_args here.
         # They are being formated in the `_run_forward` function in `common.py`
-        gradients = self.gradient_func(
-            self.forward_func, inputs, target, additional_forward_args
-        )
+        if targets is not None:
+            assert target is None, "`targets` cannot be used together with `target`."
+            targets = _format_multi_targets(targets)
+            for target_ind in targets:
+                _validate_target(inputs[0].shape[0], target_ind)
+            # gradients: dim -> (#examples x #targets x inputs[0].shape[1:], ...)
+            gradients = compute_multi_target_gradients(
+                self.forward_func, inputs, targets, additional_forward_args
+            )
+        else:
+            gradients = self.gradient_func(
+                self.forward_func, inputs, target, additional_forward_args
+            )
         if abs:
             attributions = tuple(torch.abs(gradient) for gradient in gradients)
         else:
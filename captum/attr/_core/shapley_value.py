@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+import torch
+
+from .._utils.common import (
+    _format_attributions,
+    _format_input,
+    _format_input_baseline,
+    _run_forward,
+    _format_additional_forward_args,
+)
+from .feature_ablation import (
+    FeatureAblation,
+    _expand_feature_attrib,
+    _joint_feature_mask,
+)
+
+
+class ShapleyValueSampling(FeatureAblation):
+    def __init__(self, forward_func):
+        r"""
+        Args:
+
+            forward_func (callable): The forward function of the model or
+                        any modification of it
+        """
+        FeatureAblation.__init__(self, forward_func)
+
+    def attribute(
+        self,
+        inputs,
+        baselines=None,
+        target=None,
+        additional_forward_args=None,
+        feature_mask=None,
+        n_samples=25,
+        ablations_per_eval=1,
+    ):
+        r"""
+        A perturbation based approach to compute attribution, based on the
+        concept of Shapley Values from cooperative game theory. This method
+        involves taking a random permutation of the input features and adding
+        them one-by-one to the given baseline. The output difference after
+        adding each feature corresponds to its attribution, and these
+        differences are averaged when repeating this process n_samples times,
+        each time choosing a new random permutation of the input features.
+
+        By default, each scalar value within the input tensors are taken as
+        a feature and added independently. Passing a feature mask, allows
+        grouping features to be added together. This can be used in cases such
+        as images, where an entire segment or region can be grouped together,
+        measuring the importance of the segment (feature group). Each input
+        scalar in the group will be given the same attribution value equal to
+        the change in output as a result of adding back the entire feature group.
+
+        All the inputs, in which the features of a permutation are added one
+        after another, are built in one batched tensor, and up to
+        `ablations_per_eval` of them are evaluated in one call to the forward
+        function.
+
+        More details regarding Shapley Value sampling can be found in these
+        papers:
+        https://www.sciencedirect.com/science/article/pii/S0305054808000804
+        https://pdfs.semanticscholar.org/7715/bb1070691455d1fcfc6346ff458dbca77b2c.pdf
+
+        Args:
+
+                inputs (tensor or tuple of tensors):  Input for which Shapley value
+                            sampling attributions are computed. If forward_func takes
+                            a single tensor as input, a single input tensor should
+                            be provided.
+                            If forward_func takes multiple tensors as input, a tuple
+                            of the input tensors should be provided. It is assumed
+                            that for all given input tensors, dimension 0 corresponds
+                            to the number of examples (aka batch size), and if
+                            multiple input tensors are provided, the examples must
+                            be aligned appropriately.
+                baselines (scalar, tensor, tuple of scalars or tensors, optional):
+                            Baselines define reference value which replaces each
+                            feature when it is not added.
+                            Baselines can be provided as:
+                            - a single tensor, if inputs is a single tensor, with
+                                exactly the same dimensions as inputs or
+                                broadcastable to match the dimensions of inputs
+                            - a single scalar, if inputs is a single tensor, which will
+                                be broadcasted for each input value in input tensor.
+                            - a tuple of tensors or scalars, the baseline corresponding
+                                to each tensor in the inputs' tuple can be:
+                                - either a tensor with
+                                    exactly the same dimensions as inputs or
+                                    broadcastable to match the dimensions of inputs
+                                - or a scalar, corresponding to a tensor in the
+                                    inputs' tuple. This scalar value is broadcasted
+                                    for corresponding input tensor.
+                            In the cases when `baselines` is not provided, we internally
+                            use zero scalar corresponding to each input tensor.
+                            Default: None
+                target (int, tuple, tensor or list, optional):  Output indices for
+                            which difference is computed (for classification cases,
+                            this is usually the target class).
+                            If the network returns a scalar value per example,
+                            no target index is necessary.
+                            For general 2D outputs, targets can be either:
+
+                            - a single integer or a tensor containing a single
+                                integer, which is applied to all input examples
+
+                            - a list of integers or a 1D tensor, with length matching
+                                the number of examples in inputs (dim 0). Each integer
+                                is applied as the target for the corresponding example.
+
+                            For outputs with > 2 dimensions, targets can be either:
+
+                            - A single tuple, which contains #output_dims - 1
+                                elements. This target index is applied to all examples.
+
+                            - A list of tuples with length equal to the number of
+                                examples in inputs (dim 0), and each tuple containing
+                                #output_dims - 1 elements. Each tuple is applied as the
+                                target for the corresponding example.
+
+                            Default: None
+                additional_forward_args (tuple, optional): If the forward function
+                            requires additional arguments other than the inputs for
+                            which attributions should not be computed, this argument
+                            can be provided. It must be either a single additional
+                            argument of a Tensor or arbitrary (non-tuple) type or a
+                            tuple containing multiple additional arguments including
+                            tensors or any arbitrary python types. These arguments
+                            are provided to forward_func in order following the
+                            arguments in inputs.
+                            For a tensor, the first dimension of the tensor must
+                            correspond to the number of examples. For all other types,
+                            the given argument is used for all forward evaluations.
+                            Note that attributions are not computed with respect
+                            to these arguments.
+                            Default: None
+                feature_mask (tensor or tuple of tensors, optional):
+                            feature_mask defines a mask for the input, grouping
+                            features which should be added together. feature_mask
+                            should contain the same number of tensors as inputs.
+                            Each tensor should
+                            be the same size as the corresponding input or
+                            broadcastable to match the input tensor. Values across
+                            all tensors should be integers, and indices
+                            corresponding to the same feature should have the same
+                            value. Unlike in FeatureAblation, features are permuted
+                            across all input tensors, hence scalars with the same
+                            value in different input tensors belong to the same
+                            feature.
+                            If the forward function returns a single scalar per batch,
+                            we enforce that the first dimension of each mask must be 1,
+                            since attributions are returned batch-wise rather than per
+                            example, so the attributions must correspond to the
+                            same features (indices) in each input example.
+                            If None, then a feature mask is constructed which assigns
+                            each scalar within a tensor as a separate feature.
+                            Default: None
+                n_samples (int, optional):  The number of feature permutations
+                            tested.
+                            Default: 25
+                ablations_per_eval (int, optional): Allows multiple inputs, in
+                            which a prefix of a permutation is added to the
+                            baseline, to be processed simultaneously in one call
+                            to forward_fn.
+                            Each forward pass will contain a maximum of
+                            ablations_per_eval * #examples samples.
+                            For DataParallel models, each batch is split among the
+                            available devices, so evaluations on each available
+                            device contain at most
+                            (ablations_per_eval * #examples) / num_devices
+                            samples.
+                            If the forward function returns a single scalar per batch,
+                            ablations_per_eval must be set to 1.
+                            Default: 1
+
+        Returns:
+                *tensor* or tuple of *tensors* of **attributions**:
+                - **attributions** (*tensor* or tuple of *tensors*):
+                            The attributions with respect to each input feature.
+                            If the forward function returns
+                            a scalar value per example, attributions will be
+                            the same size as the provided inputs, with each value
+                            providing the attribution of the corresponding input index.
+                            If the forward function returns a scalar per batch, then
+                            attribution tensor(s) will have first dimension 1 and
+                            the remaining dimensions will match the input.
+                            If a single tensor is provided as inputs, a single tensor is
+                            returned. If a tuple is provided for inputs, a tuple of
+                            corresponding sized tensors is returned.
+
+        Examples::
+
+            >>> # SimpleClassifier takes a single input tensor of size Nx4x4,
+            >>> # and returns an Nx3 tensor of class probabilities.
+            >>> net = SimpleClassifier()
+            >>> # Generating random input with size 2 x 4 x 4
+            >>> input = torch.randn(2, 4, 4)
+            >>> # Defining ShapleyValueSampling interpreter
+            >>> svs = ShapleyValueSampling(net)
+            >>> # Computes attribution, taking random orderings
+            >>> # of the 16 features and computing the output change when adding
+            >>> # each feature. We average over 200 trials (random permutations).
+            >>> attr = svs.attribute(input, target=1, n_samples=200)
+
+            >>> # Alternatively, we may want to add features in groups, e.g.
+            >>> # grouping each 2x2 square of the inputs and adding them together.
+            >>> # This can be done by creating a feature mask as follows, which
+            >>> # defines the feature groups, e.g.:
+            >>> # +---+---+---+---+
+            >>> # | 0 | 0 | 1 | 1 |
+            >>> # +---+---+---+---+
+            >>> # | 0 | 0 | 1 | 1 |
+            >>> # +---+---+---+---+
+            >>> # | 2 | 2 | 3 | 3 |
+            >>> # +---+---+---+---+
+            >>> # | 2 | 2 | 3 | 3 |
+            >>> # +---+---+---+---+
+            >>> # With this mask, all inputs with the same value are added
+            >>> # together, and the attribution for each input in the same
+            >>> # group (0, 1, 2, and 3) per example are the same.
+            >>> # The attributions can be calculated as follows:
+            >>> # feature mask has dimensions 1 x 4 x 4
+            >>> feature_mask = torch.tensor([[[0,0,1,1],[0,0,1,1],
+            >>>                             [2,2,3,3],[2,2,3,3]]])
+            >>> attr = svs.attribute(input, target=1, feature_mask=feature_mask)
+        """
+        # Keeps track whether original input is a tuple or not before
+        # converting it into a tuple.
+        is_inputs_tuple = isinstance(inputs, tuple)
+        inputs, baselines = _format_input_baseline(inputs, baselines)
+        additional_forward_args = _format_additional_forward_args(
+            additional_forward_args
+        )
+        num_examples = inputs[0].shape[0]
+        feature_mask = _format_input(feature_mask) if feature_mask is not None else None
+        assert (
+            isinstance(ablations_per_eval, int) and ablations_per_eval >= 1
+        ), "Ablations per evaluation must be at least 1."
+        assert (
+            isinstance(n_samples, int) and n_samples > 0
+        ), "The number of samples must be greater than 0."
+
+        # The evaluation at the inputs, i.e. with all features added, ends
+        # each permutation.
+        initial_eval = _run_forward(
+            self.forward_func, inputs, target, additional_forward_args
+        )
+        single_output_mode, initial_eval = self._check_output_mode(
+            initial_eval, num_examples, ablations_per_eval, feature_mask
+        )
+        initial_eval = torch.as_tensor(initial_eval).reshape(1, -1)
+
+        feature_mask, num_features = _joint_feature_mask(inputs, feature_mask)
+        baselines = tuple(
+            baseline.reshape((1,) + baseline.shape)
+            if isinstance(baseline, torch.Tensor)
+            else baseline
+            for baseline in baselines
+        )
+
+        # The evaluation at the baselines, i.e. with no features added, starts
+        # each permutation.
+        start_eval = self._eval_prefixes(
+            inputs,
+            baselines,
+            feature_mask,
+            torch.zeros(num_features, dtype=torch.long, device=inputs[0].device),
+            0,
+            1,
+            additional_forward_args,
+            target,
+        )
+
+        # total_attrib: dim -> (#features, #examples or 1 in single output mode)
+        total_attrib = torch.zeros(
+            (num_features, initial_eval.shape[1]),
+            dtype=initial_eval.dtype
+            if initial_eval.is_floating_point()
+            else torch.float,
+            device=initial_eval.device,
+        )
+        for _ in range(n_samples):
+            permutation = torch.randperm(num_features, device=inputs[0].device)
+            # rank of each feature in the permutation, a feature is added in
+            # the prefixes, whose length exceeds its rank
+            rank = torch.empty_like(permutation)
+            rank[permutation] = torch.arange(num_features, device=permutation.device)
+
+            # evaluations at all proper prefixes of length >= 1, the prefix of
+            # length num_features is the input itself
+            evals = [start_eval]
+            for start in range(1, num_features, ablations_per_eval):
+                end = min(start + ablations_per_eval, num_features)
+                evals.append(
+                    self._eval_prefixes(
+                        inputs,
+                        baselines,
+                        feature_mask,
+                        rank,
+                        start,
+                        end,
+                        additional_forward_args,
+                        target,
+                    )
+                )
+            evals.append(initial_eval)
+            evals = torch.cat(evals)
+            # the output difference of each step is attributed to the added
+            # feature, whose rank is the step index
+            total_attrib += (evals[1:] - evals[:-1])[rank]
+
+        # maps the attributions of the features to the locations of the inputs
+        attrib = _expand_feature_attrib(
+            (total_attrib / n_samples).t(), inputs, feature_mask
+        )
+        return _format_attributions(is_inputs_tuple, attrib)
+
+    def _eval_prefixes(
+        self,
+        inputs,
+        baselines,
+        feature_mask,
+        rank,
+        start,
+        end,
+        additional_forward_args,
+        target,
+    ):
+        r"""
+        Evaluates the forward function in one batch at the inputs, in which the
+        features with rank smaller than the prefix length are added to the
+        baselines, for all prefix lengths from `start` to `end` - 1.
+        Returns the evaluations with shape (#prefixes, #examples) or
+        (#prefixes, 1) if the forward function returns a scalar per batch.
+        """
+        prefix_lengths = torch.arange(start, end, device=rank.device)
+        return self._eval_coalitions(
+            inputs,
+            baselines,
+            feature_mask,
+            rank.unsqueeze(0) < prefix_lengths.unsqueeze(1),
+            additional_forward_args,
+            target,
+        )
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import numpy as np
+import torch
 from enum import Enum
+from functools import lru_cache
 
 
 class Riemann(Enum):
@@ -19,6 +21,10 @@ SUPPORTED_RIEMANN_METHODS = [
 
 SUPPORTED_METHODS = SUPPORTED_RIEMANN_METHODS + ["gausslegendre"]
 
+# Maximum number of (method, n_steps, dtype, device) combinations for which
+# quadrature tensors are kept by `quadrature_parameters`.
+QUADRATURE_CACHE_SIZE = 128
+
 
 def approximation_parameters(method):
     r"""Retrieves parameters for the input approximation `method`
@@ -34,6 +40,47 @@ def approximation_parameters(method):
     raise ValueError("Invalid integral approximation method name: {}".format(method))
 
 
+def quadrature_parameters(method, n_steps, dtype=None, device=None):
+    r"""Retrieves the step sizes and alphas of the input approximation `method`
+        for `n_steps` steps as tensors of given `dtype` on given `device`.
+
+        The tensors are memoized per (method, n_steps, dtype, device) in a
+        least-recently-used cache holding at most `QUADRATURE_CACHE_SIZE`
+        entries, so that repeated attribution calls neither recompute the
+        quadrature rule nor copy it to the device again. Since the returned
+        tensors are shared between calls, they must not be modified in-place.
+
+        Args:
+            method: The name of the approximation method, one of
+                    `SUPPORTED_METHODS`.
+            n_steps: The number of integration steps
+            dtype: The dtype of the returned tensors. If None, the default
+                    dtype of torch is used.
+            device: The device of the returned tensors. If None, the tensors are
+                    allocated on the CPU.
+
+        Returns:
+            2-element tuple of **step_sizes**, **alphas**:
+            - **step_sizes** (*tensor*):
+                        1D tensor of `n_steps` step sizes.
+            - **alphas** (*tensor*):
+                        1D tensor of `n_steps` multipliers/coefficients for the
+                        inputs of integrand in the range of [0, 1]
+    """
+    dtype = torch.get_default_dtype() if dtype is None else dtype
+    device = torch.device("cpu") if device is None else torch.device(device)
+    return _cached_quadrature_parameters(method, n_steps, dtype, device)
+
+
+@lru_cache(maxsize=QUADRATURE_CACHE_SIZE)
+def _cached_quadrature_parameters(method, n_steps, dtype, device):
+    step_sizes_func, alphas_func = approximation_parameters(method)
+    return (
+        torch.tensor(step_sizes_func(n_steps), dtype=dtype, device=device),
+        torch.tensor(alphas_func(n_steps), dtype=dtype, device=device),
+    )
+
+
 def riemann_builders(method=Riemann.trapezoid):
     r"""Step sizes are identical and alphas are scaled in [0, 1]
 
@@ -4,6 +4,7 @@ import torch.nn.functional as F
 
 from .common import (
     _run_forward,
+    _sum_rows,
     _format_input_baseline,
     _format_tensor_into_tuples,
     _format_additional_forward_args,
@@ -136,6 +137,8 @@ class GradientAttribution(Attribution):
         end_point,
         target=None,
         additional_forward_args=None,
+        start_point_output=None,
+        end_point_output=None,
     ):
         r"""
         Here we provide a specific implementation for `compute_convergence_delta`
@@ -211,6 +214,18 @@ class GradientAttribution(Attribution):
                             `additional_forward_args` is used both for `start_point`
                             and `end_point` when computing the forward pass.
                             Default: None
+                start_point_output (tensor, optional): The output of the forward
+                            function at `start_point`, with `target` already
+                            selected, if it has already been computed, e.g. as part
+                            of the attribution pass. The first dimension must
+                            correspond to the number of examples. If provided, the
+                            forward pass on `start_point` is skipped.
+                            Default: None
+                end_point_output (tensor, optional): The output of the forward
+                            function at `end_point`, with `target` already selected,
+                            if it has already been computed. If provided, the
+                            forward pass on `end_point` is skipped.
+                            Default: None
 
         Returns:
 
@@ -244,21 +259,17 @@ class GradientAttribution(Attribution):
         _validate_input(end_point, start_point)
         _validate_target(num_samples, target)
 
-        def _sum_rows(input):
-            return input.view(input.shape[0], -1).sum(1)
-
         with torch.no_grad():
-            start_point = _sum_rows(
-                _run_forward(
+            if start_point_output is None:
+                start_point_output = _run_forward(
                     self.forward_func, start_point, target, additional_forward_args
                 )
-            )
-
-            end_point = _sum_rows(
-                _run_forward(
+            if end_point_output is None:
+                end_point_output = _run_forward(
                     self.forward_func, end_point, target, additional_forward_args
                 )
-            )
+            start_point = _sum_rows(start_point_output)
+            end_point = _sum_rows(end_point_output)
             row_sums = [_sum_rows(attribution) for attribution in attributions]
             attr_sum = torch.stack([sum(row_sum) for row_sum in zip(*row_sums)])
             return attr_sum - (end_point - start_point)
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import os
+import warnings
+
 import torch
 
 from .common import _format_input, _format_additional_forward_args
@@ -126,3 +129,386 @@ def _batched_operator(
         )
     ]
     return _reduce_list(all_outputs)
+
+
+def _select_examples(inputs, example_ids):
+    """
+    Selects rows given by example_ids from each tensor element of given tuple
+    (inputs) along its first dimension. Non-Tensor and 0-dimensional Tensor
+    elements are left unchanged.
+    """
+    if inputs is None:
+        return None
+    return tuple(
+        inp.index_select(0, example_ids.to(inp.device))
+        if isinstance(inp, torch.Tensor) and len(inp.shape) > 0
+        else inp
+        for inp in inputs
+    )
+
+
+def _select_target(target_ind, example_ids):
+    """
+    Selects per-example targets given by example_ids if target_ind contains one
+    target per example, otherwise returns target_ind unchanged.
+    """
+    if isinstance(target_ind, list):
+        return [target_ind[i] for i in example_ids.tolist()]
+    if isinstance(target_ind, torch.Tensor) and target_ind.numel() > 1:
+        return target_ind.index_select(0, example_ids.to(target_ind.device))
+    return target_ind
+
+
+def _scaled_path_inputs(inputs, baselines, alphas):
+    """
+    Constructs the points `baseline + alpha * (input - baseline)` for all given
+    alphas with a single broadcasted operation per input tensor, concatenated
+    step-major along the first dimension, i.e. in the same order as
+    `torch.cat([baseline + alpha * (input - baseline) for alpha in alphas])`.
+    alphas is a 1D tensor, which is cast to the dtype and device of each input.
+    Baselines can be scalars or tensors broadcastable to the inputs.
+    """
+    scaled_inputs = []
+    for input, baseline in zip(inputs, baselines):
+        input_alphas = alphas.to(
+            dtype=input.dtype if input.is_floating_point() else None,
+            device=input.device,
+        ).view((-1,) + (1,) * len(input.shape))
+        scaled_inputs.append(
+            (baseline + input_alphas * (input - baseline)).reshape(
+                (-1,) + input.shape[1:]
+            )
+        )
+    return tuple(scaled_inputs)
+
+
+def _batched_path_generator(
+    inputs,
+    baselines,
+    alphas,
+    additional_forward_args=None,
+    target_ind=None,
+    internal_batch_size=None,
+):
+    """
+    Returns a generator which lazily constructs chunks of at most
+    internal_batch_size points on the straight-line path from baselines to inputs,
+    together with the matching chunks of additional_forward_args and target_ind.
+
+    Points are ordered step-major, i.e. in the same order as
+    `torch.cat([baseline + alpha * (input - baseline) for alpha in alphas])`,
+    however only the current chunk is ever materialized, so that memory scales
+    with internal_batch_size instead of #steps * #examples.
+    Along with each chunk, 1D long tensors of the step and example index of each
+    row are yielded, allowing callers to accumulate results per example.
+    If internal_batch_size is None, all points are generated in one chunk.
+    Chunks which consist of whole steps are constructed with one broadcasted
+    operation per input, other chunks gather the rows of each of their points.
+    """
+    assert internal_batch_size is None or (
+        isinstance(internal_batch_size, int) and internal_batch_size > 0
+    ), "Batch size must be greater than 0."
+    inputs = _format_input(inputs)
+    additional_forward_args = _format_additional_forward_args(additional_forward_args)
+    num_examples = inputs[0].shape[0]
+    num_steps = len(alphas)
+    total = num_examples * num_steps
+    if internal_batch_size is None:
+        internal_batch_size = total
+
+    # a list of alphas is converted in the dtype of the inputs, since the
+    # default dtype would lose precision for float64 inputs
+    alphas = torch.as_tensor(
+        alphas,
+        dtype=inputs[0].dtype if inputs[0].is_floating_point() else None,
+        device=inputs[0].device,
+    )
+
+    def _alphas_like(input):
+        dtype = input.dtype if input.is_floating_point() else None
+        return alphas.to(dtype=dtype, device=input.device)
+
+    input_alphas = tuple(_alphas_like(input) for input in inputs)
+
+    def _scale_input(input, baseline, alpha_tensor, step_ids, example_ids):
+        input = input.index_select(0, example_ids.to(input.device))
+        if isinstance(baseline, torch.Tensor) and baseline.shape[0] > 1:
+            baseline = baseline.index_select(0, example_ids.to(baseline.device))
+        step_alphas = alpha_tensor.index_select(
+            0, step_ids.to(alpha_tensor.device)
+        ).view((-1,) + (1,) * (len(input.shape) - 1))
+        return (baseline + step_alphas * (input - baseline)).requires_grad_()
+
+    for start in range(0, total, internal_batch_size):
+        indices = torch.arange(start, min(start + internal_batch_size, total))
+        step_ids = indices // num_examples
+        example_ids = indices % num_examples
+        with torch.no_grad():
+            if start % num_examples == 0 and len(indices) % num_examples == 0:
+                scaled_inputs = tuple(
+                    scaled_input.requires_grad_()
+                    for scaled_input in _scaled_path_inputs(
+                        inputs, baselines, alphas[step_ids[0] : step_ids[-1] + 1]
+                    )
+                )
+            else:
+                scaled_inputs = tuple(
+                    _scale_input(input, baseline, alpha_tensor, step_ids, example_ids)
+                    for input, baseline, alpha_tensor in zip(
+                        inputs, baselines, input_alphas
+                    )
+                )
+        yield (
+            scaled_inputs,
+            _select_examples(additional_forward_args, example_ids),
+            _select_target(target_ind, example_ids),
+            step_ids,
+            example_ids,
+        )
+
+
+def _step_ranges(step_ids):
+    """
+    Given a sorted 1D tensor of step indices, as yielded by
+    _batched_path_generator, returns a list of (start, end) tuples delimiting
+    the rows which belong to each distinct step.
+    """
+    counts = torch.unique_consecutive(step_ids, return_counts=True)[1].tolist()
+    ranges = []
+    start = 0
+    for count in counts:
+        ranges.append((start, start + count))
+        start += count
+    return ranges
+
+
+def _endpoint_steps(alphas):
+    """
+    Returns a list containing the step indices of alpha 0 and alpha 1 in given
+    alphas, i.e. the steps at which the path from baselines to inputs reaches its
+    endpoints. An element is None if the corresponding endpoint is not part of
+    the path.
+    """
+    return [
+        0 if alphas[0] == 0 else None,
+        len(alphas) - 1 if alphas[-1] == 1 else None,
+    ]
+
+
+def _store_endpoint_outputs(
+    endpoint_outputs,
+    endpoint_steps,
+    output,
+    step_ids,
+    example_ids,
+    num_examples,
+    sum_rows=True,
+):
+    """
+    Stores the per-example row sums of the rows of output, computed for a chunk
+    yielded by _batched_path_generator, that belong to each of endpoint_steps
+    into the corresponding 1D tensor of size num_examples in endpoint_outputs.
+    If sum_rows is False, the rows are stored as they are instead.
+    Tensors in endpoint_outputs which are None are allocated if needed.
+    Returns the updated list of endpoint outputs.
+    """
+    row_sums = output.reshape(output.shape[0], -1).sum(1) if sum_rows else output
+    example_ids = example_ids.to(output.device)
+    updated_outputs = []
+    for endpoint_output, step in zip(endpoint_outputs, endpoint_steps):
+        if step is not None:
+            if endpoint_output is None:
+                endpoint_output = torch.zeros(
+                    (num_examples,) + row_sums.shape[1:],
+                    dtype=row_sums.dtype,
+                    device=row_sums.device,
+                )
+            step_mask = (step_ids == step).to(output.device)
+            endpoint_output[example_ids[step_mask]] = row_sums[step_mask]
+        updated_outputs.append(endpoint_output)
+    return updated_outputs
+
+
+# Number of path points evaluated by the smaller of the two probes which
+# `_auto_internal_batch_size` uses to measure memory per point.
+_AUTO_BATCH_PROBE_POINTS = 2
+# Fraction of the currently free memory used as budget, if no explicit budget
+# is given for internal_batch_size="auto".
+_AUTO_BATCH_MEMORY_FRACTION = 0.5
+
+
+def _is_out_of_memory_error(error):
+    message = str(error).lower()
+    return isinstance(error, RuntimeError) and (
+        "out of memory" in message
+        or "can't allocate memory" in message
+        or "not enough memory" in message
+    )
+
+
+def _tensors_in(obj):
+    if isinstance(obj, torch.Tensor):
+        return [obj]
+    if isinstance(obj, (tuple, list)):
+        return [tensor for elem in obj for tensor in _tensors_in(elem)]
+    return []
+
+
+def _default_memory_budget(device):
+    """
+    Returns a fraction of the memory which is currently free on given device.
+    """
+    if device.type == "cuda":
+        # torch.cuda.mem_get_info is only available for torch >= 1.10
+        assert hasattr(torch.cuda, "mem_get_info"), (
+            "Free CUDA memory cannot be determined for this version of torch,"
+            " hence memory_budget_bytes must be provided for"
+            ' internal_batch_size="auto".'
+        )
+        free_bytes = torch.cuda.mem_get_info(device)[0]
+    else:
+        try:
+            free_bytes = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            raise AssertionError(
+                "Free memory cannot be determined on this platform, hence"
+                " memory_budget_bytes must be provided for"
+                ' internal_batch_size="auto".'
+            )
+    return int(_AUTO_BATCH_MEMORY_FRACTION * free_bytes)
+
+
+def _measure_memory(fn, device):
+    """
+    Returns the number of bytes of memory needed to run fn, which must return
+    all tensors it allocates and keeps, e.g. its inputs and gradients.
+    On CUDA devices this is the peak of the caching allocator during fn. On
+    other devices, for which the allocator does not provide statistics and
+    the resident set size is too coarse, it is the total size of the tensors
+    saved for the backward pass, e.g. activations, and the returned tensors.
+    For torch < 1.10, which does not support hooks on saved tensors, only the
+    returned tensors are measured on these devices.
+    """
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+        if hasattr(torch.cuda, "reset_peak_memory_stats"):
+            torch.cuda.reset_peak_memory_stats(device)
+        else:
+            torch.cuda.reset_max_memory_allocated(device)
+        allocated = torch.cuda.memory_allocated(device)
+        fn()
+        torch.cuda.synchronize(device)
+        return torch.cuda.max_memory_allocated(device) - allocated
+
+    storages = {}
+
+    def _record(tensor):
+        # untyped storages are only available for torch >= 2.0
+        if hasattr(tensor, "untyped_storage"):
+            storage = tensor.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+        else:
+            storage = tensor.storage()
+            storages[storage.data_ptr()] = storage.size() * storage.element_size()
+
+    def _pack(tensor):
+        _record(tensor)
+        return tensor
+
+    graph = getattr(torch.autograd, "graph", None)
+    if hasattr(graph, "saved_tensors_hooks"):
+        with graph.saved_tensors_hooks(_pack, lambda tensor: tensor):
+            result = fn()
+    else:
+        result = fn()
+    for tensor in _tensors_in(result):
+        _record(tensor)
+    return sum(storages.values())
+
+
+def _auto_internal_batch_size(
+    chunk_fn,
+    inputs,
+    baselines,
+    alphas,
+    additional_forward_args=None,
+    target_ind=None,
+    memory_budget_bytes=None,
+):
+    """
+    Chooses the largest internal_batch_size for _batched_path_generator for
+    which the computation done by chunk_fn on each chunk fits into
+    memory_budget_bytes. chunk_fn is called with the elements of a chunk
+    yielded by _batched_path_generator and must return the tensors it
+    computes, e.g. gradients.
+
+    The memory needed per point is measured by running chunk_fn on the first
+    _AUTO_BATCH_PROBE_POINTS and on twice as many points of the path. The
+    difference between the two probes excludes memory which does not grow
+    with the number of points, e.g. parameters or workspaces, which is instead
+    subtracted from the budget. If memory_budget_bytes is None, a fraction of
+    the memory currently free on the device of inputs is used.
+    Batch sizes of at least #examples are rounded down to whole steps, which
+    allows constructing each chunk with a single broadcasted operation.
+    """
+    inputs = _format_input(inputs)
+    num_examples = inputs[0].shape[0]
+    total = num_examples * len(alphas)
+    if total <= 2 * _AUTO_BATCH_PROBE_POINTS:
+        return total
+    device = inputs[0].device
+    if memory_budget_bytes is None:
+        memory_budget_bytes = _default_memory_budget(device)
+
+    def _probe(num_points):
+        def _run():
+            chunk = next(
+                _batched_path_generator(
+                    inputs,
+                    baselines,
+                    alphas,
+                    additional_forward_args,
+                    target_ind,
+                    num_points,
+                )
+            )
+            return chunk[0], chunk_fn(*chunk)
+
+        return _measure_memory(_run, device)
+
+    small = _probe(_AUTO_BATCH_PROBE_POINTS)
+    large = _probe(2 * _AUTO_BATCH_PROBE_POINTS)
+    per_point = (large - small) / _AUTO_BATCH_PROBE_POINTS
+    if per_point <= 0:
+        # the difference can vanish due to rounding of the allocator
+        per_point = large / (2 * _AUTO_BATCH_PROBE_POINTS)
+    per_point = max(per_point, 1)
+    fixed = max(small - per_point * _AUTO_BATCH_PROBE_POINTS, 0)
+    batch_size = int(min(max((memory_budget_bytes - fixed) // per_point, 1), total))
+    if num_examples <= batch_size < total:
+        batch_size -= batch_size % num_examples
+    return batch_size
+
+
+def _call_with_batch_size_backoff(fn, internal_batch_size, backoff=True):
+    """
+    Returns fn(internal_batch_size). If backoff is True and fn fails to
+    allocate memory, internal_batch_size is halved and fn is retried until it
+    succeeds or internal_batch_size cannot be reduced any further.
+    fn must not have any side effects which persist across calls.
+    """
+    while True:
+        try:
+            return fn(internal_batch_size)
+        except RuntimeError as error:
+            if not backoff or not _is_out_of_memory_error(error):
+                raise
+            if internal_batch_size is None or internal_batch_size <= 1:
+                raise
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        internal_batch_size //= 2
+        warnings.warn(
+            "Out of memory with the automatically selected internal_batch_size,"
+            " retrying with internal_batch_size {}.".format(internal_batch_size)
+        )
@@ -173,6 +173,8 @@ def _compute_conv_delta_and_format_attrs(
     additional_forward_args,
     target,
     is_inputs_tuple=False,
+    start_point_output=None,
+    end_point_output=None,
 ):
     if return_convergence_delta:
         # computes convergence error
@@ -182,6 +184,8 @@ def _compute_conv_delta_and_format_attrs(
             end_point,
             additional_forward_args=additional_forward_args,
             target=target,
+            start_point_output=start_point_output,
+            end_point_output=end_point_output,
         )
         return _format_attributions(is_inputs_tuple, attributions), delta
     else:
@@ -228,6 +232,25 @@ def _reshape_and_sum(tensor_input, num_steps, num_examples, layer_size):
     )
 
 
+def _sum_by_example(total, tensor_input, example_ids, num_examples, weights=None):
+    # Used for attribution methods which perform integration in chunks.
+    # Adds each row of tensor_input, optionally scaled by the corresponding
+    # element of weights, to the row of total given by example_ids.
+    # If total is None, it is allocated as a zero tensor of size
+    # (num_examples, (layer_size)). Returns the updated total.
+    if total is None:
+        total = torch.zeros(
+            (num_examples,) + tensor_input.shape[1:],
+            dtype=tensor_input.dtype,
+            device=tensor_input.device,
+        )
+    if weights is not None:
+        tensor_input = tensor_input * weights.to(tensor_input).view(
+            (-1,) + (1,) * (len(tensor_input.shape) - 1)
+        )
+    return total.index_add_(0, example_ids.to(total.device), tensor_input)
+
+
 def _verify_select_column(output, target):
     target = (target,) if isinstance(target, int) else target
     assert (
@@ -269,6 +292,40 @@ def _select_targets(output, target):
         raise AssertionError("Target type %r is not valid." % target)
 
 
+def _select_multi_targets(output, targets):
+    # Selects each target in the list of targets from output, where each
+    # element of targets can be any target accepted by `_select_targets`.
+    # Returns a tensor of size (num_examples, num_targets).
+    num_examples = output.shape[0]
+    selected = []
+    for target in targets:
+        target_output = _select_targets(output, target)
+        assert target_output[0].numel() == 1, (
+            "Target not provided when necessary, cannot"
+            " take gradient with respect to multiple outputs."
+        )
+        selected.append(target_output.reshape(num_examples))
+    return torch.stack(selected, dim=1)
+
+
+def _format_multi_targets(targets):
+    # Multiple targets can be provided either as a list with one element per
+    # target, each of which can be any target accepted by `_select_targets`,
+    # or as a 2D tensor of size (num_examples, num_targets) containing one
+    # column of targets per target.
+    if isinstance(targets, torch.Tensor):
+        assert len(targets.shape) == 2, (
+            "Multiple targets provided as a tensor must have 2 dimensions,"
+            " (num_examples, num_targets), but found {}".format(targets.shape)
+        )
+        return list(targets.unbind(dim=1))
+    assert isinstance(targets, list) and len(targets) > 0, (
+        "Multiple targets must be provided as a non-empty list or a 2D tensor,"
+        " but found {}".format(targets)
+    )
+    return targets
+
+
 def _run_forward(forward_func, inputs, target=None, additional_forward_args=None):
     # make everything a tuple so that it is easy to unpack without
     # using if-statements
@@ -283,6 +340,39 @@ def _run_forward(forward_func, inputs, target=None, additional_forward_args=None
     return _select_targets(output, target)
 
 
+class _ForwardOutputRecorder:
+    r"""
+    Wraps a forward function and records the detached outputs of all its calls,
+    so that outputs which are computed anyway as part of an attribution pass,
+    e.g. at the endpoints of an integration path, can be reused instead of
+    rerunning the forward function. Attribute lookups are delegated to the
+    wrapped forward function, e.g. `device_ids` of DataParallel models.
+    """
+
+    def __init__(self, forward_func):
+        self.forward_func = forward_func
+        self.outputs = []
+
+    def __call__(self, *args, **kwargs):
+        output = self.forward_func(*args, **kwargs)
+        self.outputs.append(output.detach())
+        return output
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__["forward_func"], name)
+
+    def pop(self, target=None):
+        r"""
+        Removes and returns the most recently recorded output with given target
+        selected.
+        """
+        return _select_targets(self.outputs.pop(), target)
+
+
+def _sum_rows(input):
+    return input.reshape(input.shape[0], -1).sum(1)
+
+
 def _expand_additional_forward_args(
     additional_forward_args, n_steps, expansion_type=ExpansionTypes.repeat
 ):
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
+import inspect
 import threading
 import torch
 import warnings
 
-from .common import _run_forward, _verify_select_column
+from .common import _run_forward, _select_multi_targets, _verify_select_column
 from .batching import _reduce_list, _sort_key_list
 
 
@@ -93,6 +94,91 @@ def compute_gradients(
     return grads
 
 
+# batched vector-Jacobian products are available from PyTorch 1.11 on
+_GRADS_BATCHED_SUPPORTED = (
+    "is_grads_batched" in inspect.signature(torch.autograd.grad).parameters
+)
+
+
+def _is_unsupported_batching_error(error):
+    # operations without a batching rule raise errors, which mention vmap or
+    # the missing batching rule
+    message = str(error).lower()
+    return "vmap" in message or "batching rule" in message
+
+
+def compute_multi_target_gradients(
+    forward_fn, inputs, targets, additional_forward_args=None
+):
+    r"""
+        Computes gradients of multiple outputs, one per target, with respect to
+        inputs for an arbitrary forward function. The forward pass is run only
+        once and the gradients for all targets are computed in one batched
+        vector-Jacobian product.
+
+        Args:
+
+            forward_fn: forward function. This can be for example model's
+                        forward function.
+            input:      Input at which gradients are evaluated,
+                        will be passed to forward_fn.
+            targets:    List of targets, each of which can be any target index
+                        accepted by `compute_gradients`.
+            args:       Additional input arguments that forward function requires.
+                        It takes an empty tuple (no additional arguments) if no
+                        additional arguments are required
+
+        Returns:
+            tuple of gradient tensors, one per input, each of size
+            (#examples, #targets, *input.shape[1:]).
+    """
+    with torch.autograd.set_grad_enabled(True):
+        # runs forward pass
+        output = _run_forward(
+            forward_fn, inputs, additional_forward_args=additional_forward_args
+        )
+        # selected: dim -> (#examples x #targets)
+        selected = _select_multi_targets(output, targets)
+        num_targets = selected.shape[1]
+        # the k-th batched grad_outputs selects the k-th target of all examples
+        grad_outputs = (
+            torch.eye(num_targets, dtype=selected.dtype, device=selected.device)
+            .unsqueeze(1)
+            .expand(num_targets, selected.shape[0], num_targets)
+        )
+        grads = None
+        if _GRADS_BATCHED_SUPPORTED:
+            try:
+                grads = torch.autograd.grad(
+                    selected,
+                    inputs,
+                    grad_outputs=grad_outputs,
+                    retain_graph=True,
+                    is_grads_batched=True,
+                )
+            except RuntimeError as error:
+                if not _is_unsupported_batching_error(error):
+                    raise
+        if grads is None:
+            # batched vector-Jacobian products are not available for this
+            # version of PyTorch or some operation in the graph, hence the
+            # gradients are computed per target on the same graph
+            grads = tuple(
+                torch.stack(target_grads)
+                for target_grads in zip(
+                    *[
+                        torch.autograd.grad(
+                            torch.unbind(selected[:, k]), inputs, retain_graph=True
+                        )
+                        for k in range(num_targets)
+                    ]
+                )
+            )
+    # grads: dim -> (#targets x #examples x ...) transposed to
+    # (#examples x #targets x ...)
+    return tuple(grad.transpose(0, 1) for grad in grads)
+
+
 def _neuron_gradients(inputs, saved_layer, key_list, gradient_neuron_index):
     with torch.autograd.set_grad_enabled(True):
         gradient_tensors = []
@@ -146,55 +232,78 @@ def _forward_layer_distributed_eval(
     `attribute_to_layer_input` to True or False.
     This is especially useful when we execute forward pass in a distributed setting,
     using `DataParallel`s for example.
+    If `layer` is a list of layers, hooks are set on all layers, which are
+    evaluated in a single forward pass, and the dictionary maps each layer to
+    the dictionary of its results.
     """
-    saved_layer = {}
+    layers = layer if isinstance(layer, list) else [layer]
+    saved_layer = {single_layer: {} for single_layer in layers}
     lock = threading.Lock()
-    # Set a forward hook on specified module and run forward pass to
+    # Set a forward hook on specified modules and run forward pass to
     # get layer output tensor(s).
     # For DataParallel models, each partition adds entry to dictionary
     # with key as device and value as corresponding Tensor.
 
-    def forward_hook(module, inp, out=None):
-        eval_tsr = inp if attribute_to_layer_input else out
-        is_tuple = True if isinstance(eval_tsr, tuple) else False
-        # if `inp` or `out` is a tuple of one tensor, assign that tensor to `eval_tsr`
-        if isinstance(eval_tsr, tuple) and len(eval_tsr) == 1:
-            eval_tsr = eval_tsr[0]
-
-        assert isinstance(
-            eval_tsr, torch.Tensor
-        ), "Layers with multiple inputs or output tensors are not supported yet."
-        with lock:
-            nonlocal saved_layer
-            # TODO we need to think what will be the best way of storing eval
-            # tensors per device for each input per example. This implementation
-            # doesn't support a tuple of inputs
-
-            # Note that cloning behaviour of `eval_tsr` is different
-            # when `forward_hook_with_return` is set to True. This is because
-            # otherwise `backward()` on the last output layer won't execute.
-            if forward_hook_with_return:
-                saved_layer[eval_tsr.device] = eval_tsr
-                eval_tsr_to_return = eval_tsr.clone()
-                return (eval_tsr_to_return,) if is_tuple else eval_tsr_to_return
-            else:
-                saved_layer[eval_tsr.device] = eval_tsr.clone()
-
-    if attribute_to_layer_input:
-        hook = layer.register_forward_pre_hook(forward_hook)
-    else:
-        hook = layer.register_forward_hook(forward_hook)
-    output = _run_forward(
-        forward_fn,
-        inputs,
-        target=target_ind,
-        additional_forward_args=additional_forward_args,
-    )
-    hook.remove()
+    def make_forward_hook(single_layer):
+        # the hooked layer is bound here, since for DataParallel models the
+        # hook is called with the replicas of the layer
+        def forward_hook(module, inp, out=None):
+            eval_tsr = inp if attribute_to_layer_input else out
+            is_tuple = True if isinstance(eval_tsr, tuple) else False
+            # if `inp` or `out` is a tuple of one tensor, assign that tensor to
+            # `eval_tsr`
+            if isinstance(eval_tsr, tuple) and len(eval_tsr) == 1:
+                eval_tsr = eval_tsr[0]
+
+            assert isinstance(
+                eval_tsr, torch.Tensor
+            ), "Layers with multiple inputs or output tensors are not supported yet."
+            with lock:
+                nonlocal saved_layer
+                # TODO we need to think what will be the best way of storing eval
+                # tensors per device for each input per example. This implementation
+                # doesn't support a tuple of inputs
+
+                # Note that cloning behaviour of `eval_tsr` is different
+                # when `forward_hook_with_return` is set to True. This is because
+                # otherwise `backward()` on the last output layer won't execute.
+                if forward_hook_with_return:
+                    saved_layer[single_layer][eval_tsr.device] = eval_tsr
+                    eval_tsr_to_return = eval_tsr.clone()
+                    return (eval_tsr_to_return,) if is_tuple else eval_tsr_to_return
+                else:
+                    saved_layer[single_layer][eval_tsr.device] = eval_tsr.clone()
+
+        return forward_hook
+
+    hooks = []
+    for single_layer in layers:
+        if attribute_to_layer_input:
+            hook = single_layer.register_forward_pre_hook(
+                make_forward_hook(single_layer)
+            )
+        else:
+            hook = single_layer.register_forward_hook(make_forward_hook(single_layer))
+        hooks.append(hook)
+    try:
+        output = _run_forward(
+            forward_fn,
+            inputs,
+            target=target_ind,
+            additional_forward_args=additional_forward_args,
+        )
+    finally:
+        for hook in hooks:
+            hook.remove()
 
-    if len(saved_layer) == 0:
-        raise AssertionError("Forward hook did not obtain any outputs for given layer")
+    for single_layer in layers:
+        if len(saved_layer[single_layer]) == 0:
+            raise AssertionError(
+                "Forward hook did not obtain any outputs for given layer"
+            )
 
+    if not isinstance(layer, list):
+        saved_layer = saved_layer[layer]
     if forward_hook_with_return:
         return saved_layer, output
     return saved_layer
@@ -265,6 +374,9 @@ def _forward_layer_eval_with_neuron_grads(
     can be found in the PyTorch data parallel documentation. We maintain the separate
     evals in a dictionary protected by a lock, analogous to the gather implementation
     for the core PyTorch DataParallel implementation.
+
+    If `layer` is a list of layers, all layers are evaluated in a single forward
+    pass, and a list with the evaluation of each layer is returned.
     """
     saved_layer = _forward_layer_distributed_eval(
         forward_fn,
@@ -273,6 +385,22 @@ def _forward_layer_eval_with_neuron_grads(
         additional_forward_args=additional_forward_args,
         attribute_to_layer_input=attribute_to_layer_input,
     )
+    if isinstance(layer, list):
+        assert (
+            gradient_neuron_index is None
+        ), "Neuron gradients are not supported for a list of layers."
+        return [
+            _gather_distributed_tensors(
+                saved_layer[single_layer],
+                key_list=_sort_key_list(
+                    list(saved_layer[single_layer].keys()),
+                    _extract_device_ids(
+                        forward_fn, saved_layer[single_layer], device_ids
+                    ),
+                ),
+            )
+            for single_layer in layer
+        ]
     device_ids = _extract_device_ids(forward_fn, saved_layer, device_ids)
     # Identifies correct device ordering based on device ids.
     # key_list is a list of devices in appropriate ordering for concatenation.
@@ -324,6 +452,11 @@ def compute_layer_gradients_and_eval(
         for the final module when computing input gradients, utilize
         _forward_layer_eval_with_neuron_grads instead.
 
+        If `layer` is a list of layers, all layers are evaluated in a single
+        forward pass, and the gradients with respect to all layers are computed
+        in a single backward pass. Lists of the gradients and of the evaluations
+        of each layer are returned in this case.
+
         Args:
 
             forward_fn: forward function. This can be for example model's
@@ -361,6 +494,14 @@ def compute_layer_gradients_and_eval(
             " take gradient with respect to multiple outputs."
         )
 
+        if isinstance(layer, list):
+            assert (
+                gradient_neuron_index is None
+            ), "Neuron gradients are not supported for a list of layers."
+            return _compute_multi_layer_gradients_and_eval(
+                forward_fn, layer, saved_layer, output, device_ids
+            )
+
         device_ids = _extract_device_ids(forward_fn, saved_layer, device_ids)
 
         # Identifies correct device ordering based on device ids.
@@ -380,6 +521,41 @@ def compute_layer_gradients_and_eval(
             return all_grads, all_outputs
 
 
+def _compute_multi_layer_gradients_and_eval(
+    forward_fn, layers, saved_layer, output, device_ids
+):
+    r"""
+    Computes the gradients of the output with respect to each of the given
+    layers with a single call to `torch.autograd.grad`, and returns the lists
+    of the gradients and of the evaluations of the layers. `saved_layer` maps
+    each layer to the dictionary of its results per device.
+    """
+    key_lists = [
+        _sort_key_list(
+            list(saved_layer[layer].keys()),
+            _extract_device_ids(forward_fn, saved_layer[layer], device_ids),
+        )
+        for layer in layers
+    ]
+    grad_inputs = tuple(
+        saved_layer[layer][device_id]
+        for layer, key_list in zip(layers, key_lists)
+        for device_id in key_list
+    )
+    saved_grads = torch.autograd.grad(torch.unbind(output), grad_inputs)
+
+    all_grads = []
+    all_outputs = []
+    offset = 0
+    for layer, key_list in zip(layers, key_lists):
+        all_grads.append(torch.cat(saved_grads[offset : offset + len(key_list)]))
+        all_outputs.append(
+            _reduce_list([saved_layer[layer][device_id] for device_id in key_list])
+        )
+        offset += len(key_list)
+    return all_grads, all_outputs
+
+
 def construct_neuron_grad_fn(
     layer, neuron_index, device_ids=None, attribute_to_neuron_input=False
 ):
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import math
+
+import torch
+from torch.quasirandom import SobolEngine
+
+
+class Sampler:
+    def __init__(self, seed=None):
+        r"""
+        Draws the random numbers of sampling based attribution methods, such as
+        the noise of `NoiseTunnel` and the baselines and path coefficients of
+        `GradientShap`. All methods draw `n` samples of each element of a
+        tensor of the given `shape`, with shape (`n`,) + `shape`. Subclasses
+        implement `uniform`, and may choose the `n` samples of each element
+        jointly, so that they cover the distribution more evenly than
+        independent samples.
+
+        Args:
+
+            seed (int, optional): The seed of the random numbers. If None,
+                        the global random number generator of torch is used.
+                        Default: None
+        """
+        self.seed = seed
+        self._generators = {}
+
+    def uniform(self, n, shape, device=None, dtype=None):
+        r"""
+        Returns `n` samples of each element of a tensor of the given `shape`
+        from the uniform distribution on [0, 1).
+        """
+        raise NotImplementedError
+
+    def normal(self, n, shape, device=None, dtype=None):
+        r"""
+        Returns `n` samples of each element of a tensor of the given `shape`
+        from the standard normal distribution, by transforming the uniform
+        samples with the inverse of the normal distribution function.
+        """
+        if dtype is None:
+            dtype = torch.get_default_dtype()
+        eps = torch.finfo(dtype).eps
+        uniform = self.uniform(n, shape, device=device, dtype=dtype)
+        uniform = uniform.clamp(eps, 1.0 - eps)
+        return math.sqrt(2.0) * torch.erfinv(2.0 * uniform - 1.0)
+
+    def normal_(self, tensor):
+        r"""
+        Fills the given tensor with shape (`n`,) + `shape` in-place with `n`
+        samples of each element of a tensor of the given `shape` from the
+        standard normal distribution.
+        """
+        noise = self.normal(
+            tensor.shape[0], tensor.shape[1:], device=tensor.device, dtype=tensor.dtype
+        )
+        return tensor.copy_(noise)
+
+    def randint(self, high, n, shape, device=None):
+        r"""
+        Returns `n` samples of each element of a tensor of the given `shape`
+        from the uniform distribution on the integers 0, ..., `high` - 1.
+        """
+        uniform = self.uniform(n, shape, device=device, dtype=torch.float64)
+        return (uniform * high).long().clamp(max=high - 1)
+
+    def _generator(self, device):
+        # returns None for the global random number generator, and otherwise
+        # the seeded generator of the device, so that samples are drawn on
+        # the device without copies from the host
+        if self.seed is None:
+            return None
+        device = torch.device("cpu" if device is None else device)
+        if device not in self._generators:
+            generator = torch.Generator(device=device)
+            generator.manual_seed(self.seed)
+            self._generators[device] = generator
+        return self._generators[device]
+
+    def _rand(self, size, device=None, dtype=None):
+        generator = self._generator(device)
+        if generator is None:
+            return torch.rand(size, device=device, dtype=dtype)
+        return torch.rand(size, generator=generator, device=device, dtype=dtype)
+
+
+class RandomSampler(Sampler):
+    def __init__(self, seed=None):
+        r"""
+        Draws independent samples with the random number generator of torch on
+        the device of the attributed inputs.
+
+        Args:
+
+            seed (int, optional): The seed of the random numbers. If None,
+                        the global random number generator of torch is used.
+                        Default: None
+        """
+        Sampler.__init__(self, seed)
+
+    def uniform(self, n, shape, device=None, dtype=None):
+        return self._rand((n,) + tuple(shape), device=device, dtype=dtype)
+
+    def normal(self, n, shape, device=None, dtype=None):
+        size = (n,) + tuple(shape)
+        generator = self._generator(device)
+        if generator is None:
+            return torch.randn(size, device=device, dtype=dtype)
+        return torch.randn(size, generator=generator, device=device, dtype=dtype)
+
+    def normal_(self, tensor):
+        return tensor.normal_(generator=self._generator(tensor.device))
+
+    def randint(self, high, n, shape, device=None):
+        size = (n,) + tuple(shape)
+        generator = self._generator(device)
+        if generator is None:
+            return torch.randint(high, size, device=device)
+        return torch.randint(high, size, generator=generator, device=device)
+
+
+class StratifiedSampler(Sampler):
+    def __init__(self, seed=None):
+        r"""
+        Draws stratified (Latin hypercube) samples. The `n` samples of each
+        element lie in distinct intervals [k / `n`, (k + 1) / `n`) of the
+        uniform distribution, in random order, and are uniformly distributed
+        within their interval. Hence each element is sampled evenly, and the
+        samples of different elements are independent.
+
+        Args:
+
+            seed (int, optional): The seed of the random numbers. If None,
+                        the global random number generator of torch is used.
+                        Default: None
+        """
+        Sampler.__init__(self, seed)
+
+    def uniform(self, n, shape, device=None, dtype=None):
+        size = (n,) + tuple(shape)
+        # the ranks of random keys are a random permutation of the intervals
+        strata = self._rand(size, device=device).argsort(dim=0)
+        offsets = self._rand(size, device=device, dtype=dtype)
+        return (strata.to(offsets.dtype) + offsets) / n
+
+
+class SobolSampler(Sampler):
+    def __init__(self, seed=None):
+        r"""
+        Draws quasi-Monte Carlo samples from a scrambled Sobol sequence. The
+        elements of the given shape are the dimensions of the sequence, and
+        the `n` samples are its first `n` points. For `n` a power of 2, the
+        samples of each element are stratified, and the samples of all
+        elements are jointly more evenly distributed than random samples.
+        Since Sobol sequences have at most `SobolEngine.MAXDIM` dimensions,
+        larger tensors are split into blocks of elements with independently
+        scrambled sequences.
+
+        Args:
+
+            seed (int, optional): The seed of the scrambling. If None, the
+                        global random number generator of torch is used.
+                        Default: None
+        """
+        Sampler.__init__(self, seed)
+
+    def uniform(self, n, shape, device=None, dtype=None):
+        size = (n,) + tuple(shape)
+        num_elements = 1
+        for dim in shape:
+            num_elements *= dim
+        generator = self._generator(None)
+        points = []
+        for start in range(0, num_elements, SobolEngine.MAXDIM):
+            engine_seed = int(torch.randint(2 ** 31, (1,), generator=generator))
+            engine = SobolEngine(
+                min(SobolEngine.MAXDIM, num_elements - start),
+                scramble=True,
+                seed=engine_seed,
+            )
+            points.append(engine.draw(n))
+        if len(points) == 0:
+            return torch.zeros(size, device=device, dtype=dtype)
+        return torch.cat(points, dim=1).reshape(size).to(device=device, dtype=dtype)
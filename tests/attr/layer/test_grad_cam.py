@@ -60,6 +60,27 @@ class Test(BaseTest):
             net, net.conv1, (inp, inp2), [[14.5, 19.0], [32.5, 37.0]]
         )
 
+    def test_multi_layer_single_forward(self):
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(16).view(1, 1, 4, 4).float()
+        num_forwards = [0]
+
+        def count_forward(module, input, output):
+            num_forwards[0] += 1
+
+        hook = net.register_forward_hook(count_forward)
+        layer_gc = LayerGradCam(net, [net.conv1, net.relu1])
+        attributions = layer_gc.attribute(inp, target=0)
+        hook.remove()
+        self.assertEqual(num_forwards[0], 1)
+        self.assertEqual(len(attributions), 2)
+        assertTensorAlmostEqual(
+            self, attributions[0], [[11.25, 13.5], [20.25, 22.5]], delta=0.01
+        )
+        assertTensorAlmostEqual(
+            self, attributions[1], [[0.0, 4.0], [28.0, 32.5]], delta=0.01
+        )
+
     def _grad_cam_test_assert(
         self,
         model,
@@ -26,6 +26,16 @@ class Test(BaseTest):
             net, net.linear1, inp, [90.0, 101.0, 101.0, 101.0]
         )
 
+    def test_multi_layer_activation(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[0.0, 100.0, 0.0]])
+        layer_act = LayerActivation(net, [net.linear0, net.linear1, net.linear2])
+        attributions = layer_act.attribute(inp)
+        self.assertEqual(len(attributions), 3)
+        assertTensorAlmostEqual(self, attributions[0], [0.0, 100.0, 0.0])
+        assertTensorAlmostEqual(self, attributions[1], [90.0, 101.0, 101.0, 101.0])
+        assertTensorAlmostEqual(self, attributions[2], [392.0, 394.0])
+
     def test_simple_relu_activation_input_inplace(self):
         net = BasicModel_MultiLayer(inplace=True)
         inp = torch.tensor([[2.0, -5.0, 4.0]])
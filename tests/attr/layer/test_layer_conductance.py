@@ -114,6 +114,28 @@ class Test(BaseTest):
         baseline = 100 * torch.randn(3, 1, 10, 10, requires_grad=True)
         self._conductance_reference_test_assert(net, net.fc1, inp, baseline)
 
+    def test_convergence_delta_reuses_endpoint_outputs(self):
+        net = BasicModel_MultiLayer()
+        num_forwards = []
+        net.register_forward_hook(lambda *args: num_forwards.append(1))
+        inp = torch.tensor([[0.0, 100.0, 0.0], [10.0, 2.0, 4.0]])
+        cond = LayerConductance(net, net.linear1)
+        attributions, delta = cond.attribute(
+            inp,
+            target=0,
+            n_steps=20,
+            method="riemann_trapezoid",
+            internal_batch_size=5,
+            return_convergence_delta=True,
+        )
+        # endpoints are part of the trapezoid path, hence no additional forward
+        self.assertEqual(len(num_forwards), 9)
+        assertArraysAlmostEqual(
+            delta,
+            cond.compute_convergence_delta((attributions,), 0.0, inp, target=0),
+            0.0001,
+        )
+
     def _conductance_test_assert(
         self,
         model,
@@ -116,6 +116,45 @@ class TestDeepLift(BaseTest):
         assertTensorAlmostEqual(self, attributions, [[15.0]])
         assert_delta(self, delta)
 
+    def test_linear_layer_deepliftshap_internal_batch_size(self):
+        model = ReLULinearDeepLiftModel()
+        (
+            inputs,
+            baselines,
+        ) = _create_inps_and_base_for_deepliftshap_neuron_layer_testing()
+        layer_dl_shap = LayerDeepLiftShap(model, model.l3)
+        attributions, delta = layer_dl_shap.attribute(
+            inputs,
+            baselines,
+            attribute_to_layer_input=True,
+            return_convergence_delta=True,
+            internal_batch_size=1,
+        )
+        assertTensorAlmostEqual(self, attributions, [[0.0, 15.0]])
+        assert_delta(self, delta)
+        self.assertEqual(delta.numel(), inputs[0].shape[0] * baselines[0].shape[0])
+
+    def test_linear_layer_deeplift_reference_cache(self):
+        model = ReLULinearDeepLiftModel()
+        inputs, baselines = _create_inps_and_base_for_deeplift_neuron_layer_testing()
+        layer_dl = LayerDeepLift(model, model.l3, reference_cache_size=2)
+        for attribute_to_layer_input in [True, False, True]:
+            expected, expected_delta = LayerDeepLift(model, model.l3).attribute(
+                inputs,
+                baselines,
+                attribute_to_layer_input=attribute_to_layer_input,
+                return_convergence_delta=True,
+            )
+            attributions, delta = layer_dl.attribute(
+                inputs,
+                baselines,
+                attribute_to_layer_input=attribute_to_layer_input,
+                return_convergence_delta=True,
+            )
+            assertTensorAlmostEqual(self, attributions, expected)
+            assertTensorAlmostEqual(self, delta, expected_delta)
+        self.assertEqual(len(layer_dl._reference_cache.entries), 2)
+
     def test_relu_deepliftshap_with_custom_attr_func(self):
         model = ReLULinearDeepLiftModel()
         (
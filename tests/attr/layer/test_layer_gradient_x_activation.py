@@ -25,6 +25,21 @@ class Test(BaseTest):
             net, net.linear1, inp, [90.0, 101.0, 101.0, 101.0]
         )
 
+    def test_multi_layer_gradient_activation(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[0.0, 100.0, 0.0]])
+        layer_act = LayerGradientXActivation(
+            net, [net.linear0, net.linear1, net.linear2]
+        )
+        attributions = layer_act.attribute(inp, target=0)
+        self.assertEqual(len(attributions), 3)
+        for attribution, expected_activation in zip(
+            attributions, [[0.0, 400.0, 0.0], [90.0, 101.0, 101.0, 101.0], [392.0, 0.0]]
+        ):
+            assertArraysAlmostEqual(
+                attribution.squeeze(0).tolist(), expected_activation, delta=0.01
+            )
+
     def test_simple_relu_gradient_activation(self):
         net = BasicModel_MultiLayer()
         inp = torch.tensor([[3.0, 4.0, 0.0]], requires_grad=True)
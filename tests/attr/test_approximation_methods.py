@@ -2,7 +2,14 @@
 
 import unittest
 
-from captum.attr._utils.approximation_methods import riemann_builders, Riemann
+import torch
+
+from captum.attr._utils.approximation_methods import (
+    approximation_parameters,
+    quadrature_parameters,
+    riemann_builders,
+    Riemann,
+)
 
 from .helpers.utils import assertArraysAlmostEqual
 
@@ -68,6 +75,21 @@ class Test(unittest.TestCase):
             expected_trapezoid,
         )
 
+    def test_quadrature_parameters(self):
+        for method in ["riemann_trapezoid", "gausslegendre"]:
+            step_sizes, alphas = quadrature_parameters(method, 7, torch.float64)
+            step_sizes_func, alphas_func = approximation_parameters(method)
+            self.assertEqual(step_sizes.dtype, torch.float64)
+            assertArraysAlmostEqual(step_sizes.tolist(), step_sizes_func(7))
+            assertArraysAlmostEqual(alphas.tolist(), alphas_func(7))
+            # tables are memoized per (method, n_steps, dtype, device)
+            cached_step_sizes, cached_alphas = quadrature_parameters(
+                method, 7, torch.float64, "cpu"
+            )
+            self.assertIs(cached_step_sizes, step_sizes)
+            self.assertIs(cached_alphas, alphas)
+            self.assertIsNot(quadrature_parameters(method, 7)[1], alphas)
+
     def _assert_steps_and_alphas(
         self,
         n,
@@ -190,6 +190,134 @@ class Test(BaseTest):
         )
         self.assertEqual(attr.shape, rand_seq_data.shape)
 
+    def test_convergence_delta_reuses_outputs(self):
+        model = ReLULinearDeepLiftModel()
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        inputs = (
+            torch.tensor([[-10.0, 1.0, -5.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.0, 1.0]], requires_grad=True),
+        )
+        baselines = (torch.zeros(1, 3), torch.ones(1, 3))
+        dl = DeepLift(model)
+        attributions, delta = dl.attribute(
+            inputs, baselines, return_convergence_delta=True
+        )
+        # one forward pass on baselines and one on inputs
+        self.assertEqual(len(num_forwards), 2)
+        assertArraysAlmostEqual(
+            delta, dl.compute_convergence_delta(attributions, baselines, inputs)
+        )
+
+    def test_reference_cache(self):
+        model = ReLULinearDeepLiftModel()
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        inputs = (
+            torch.tensor([[-10.0, 1.0, -5.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.0, 1.0]], requires_grad=True),
+        )
+        dl = DeepLift(model, reference_cache_size=1)
+        expected, expected_delta = DeepLift(model).attribute(
+            inputs, (torch.zeros(1, 3), 1.0), return_convergence_delta=True
+        )
+        num_forwards.clear()
+        for _ in range(3):
+            # the baselines are identified by their content
+            attributions, delta = dl.attribute(
+                inputs, (torch.zeros(1, 3), 1.0), return_convergence_delta=True
+            )
+            for attribution, expected_attr in zip(attributions, expected):
+                assertTensorAlmostEqual(self, attribution, expected_attr)
+            assertTensorAlmostEqual(self, delta, expected_delta)
+        # one forward pass on baselines and one on inputs per call
+        self.assertEqual(len(num_forwards), 4)
+
+        # other baselines evict the cached activations
+        dl.attribute(inputs, (torch.zeros(1, 3), 2.0))
+        num_forwards.clear()
+        dl.attribute(inputs, (torch.zeros(1, 3), 1.0))
+        self.assertEqual(len(num_forwards), 2)
+
+        # modified parameters invalidate the cached activations
+        with torch.no_grad():
+            model.l1.weight.mul_(2)
+        num_forwards.clear()
+        dl.attribute(inputs, (torch.zeros(1, 3), 1.0))
+        self.assertEqual(len(num_forwards), 2)
+
+        dl.clear_reference_cache()
+        num_forwards.clear()
+        dl.attribute(inputs, (torch.zeros(1, 3), 1.0))
+        self.assertEqual(len(num_forwards), 2)
+
+    def test_single_forward_multi_input(self):
+        model = ReLULinearDeepLiftModel()
+        inputs = (
+            torch.tensor([[-10.0, 1.0, -5.0], [2.0, -1.0, 3.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.0, 1.0], [-2.0, 1.0, 0.5]], requires_grad=True),
+        )
+        baselines = (torch.zeros(1, 3), 0.5)
+        expected = DeepLift(model).attribute(inputs, baselines)
+        attributions, delta = DeepLift(model).attribute(
+            inputs, baselines, return_convergence_delta=True, single_forward=True
+        )
+        for attribution, expected_attr in zip(attributions, expected):
+            assertTensorAlmostEqual(self, attribution, expected_attr)
+        assertTensorAlmostEqual(self, delta, torch.zeros(2))
+
+    def test_relu_deepliftshap_internal_batch_size(self):
+        model = ReLULinearDeepLiftModel()
+        inputs = (
+            torch.tensor([[-10.0, 1.0, -5.0], [2.0, -1.0, 3.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.0, 1.0], [-2.0, 1.0, 0.5]], requires_grad=True),
+        )
+        baselines = (torch.randn(5, 3), torch.randn(5, 3))
+        dls = DeepLiftShap(model)
+        expected, expected_delta = dls.attribute(
+            inputs, baselines, return_convergence_delta=True
+        )
+        for internal_batch_size in [1, 4, 5, 10]:
+            attributions, delta = dls.attribute(
+                inputs,
+                baselines,
+                return_convergence_delta=True,
+                internal_batch_size=internal_batch_size,
+            )
+            for attribution, expected_attr in zip(attributions, expected):
+                assertTensorAlmostEqual(self, attribution, expected_attr)
+            assertTensorAlmostEqual(self, delta, expected_delta)
+
+    def test_prepared_model(self):
+        model = ReLULinearDeepLiftModel()
+        inputs = (
+            torch.tensor([[-10.0, 1.0, -5.0], [2.0, -1.0, 3.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.0, 1.0], [-2.0, 1.0, 0.5]], requires_grad=True),
+        )
+        baselines = (torch.zeros(1, 3), 0.5)
+        dl = DeepLift(model)
+        expected = dl.attribute(inputs, baselines)
+        with dl.prepared_model():
+            num_hooks = len(model.relu._forward_hooks)
+            self.assertGreater(num_hooks, 0)
+            for single_forward in [False, True, False]:
+                attributions, delta = dl.attribute(
+                    inputs,
+                    baselines,
+                    return_convergence_delta=True,
+                    single_forward=single_forward,
+                )
+                for attribution, expected_attr in zip(attributions, expected):
+                    assertTensorAlmostEqual(self, attribution, expected_attr)
+                assertTensorAlmostEqual(self, delta, torch.zeros(2))
+                # hooks are reused across attribute calls
+                self.assertEqual(len(model.relu._forward_hooks), num_hooks)
+            # the hooks are inactive outside of attribute
+            model(*inputs)
+            self.assertFalse(hasattr(model.relu, "input"))
+        self.assertEqual(len(model.relu._forward_hooks), 0)
+        self.assertEqual(len(model.relu._backward_hooks), 0)
+
     def _deeplift_assert(
         self, model, attr_method, inputs, baselines, custom_attr_func=None
     ):
@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 
 import torch
+import torch.nn as nn
+import torch.nn.functional as F
 
+from unittest.mock import patch
+
+from captum.attr._core import deep_lift
 from captum.attr._core.deep_lift import DeepLift, DeepLiftShap
 from captum.attr._core.integrated_gradients import IntegratedGradients
 
-from .helpers.utils import assertAttributionComparision, BaseTest
+from .helpers.utils import (
+    assertAttributionComparision,
+    assertTensorAlmostEqual,
+    BaseTest,
+)
 from .helpers.classification_models import SigmoidDeepLiftModel
 from .helpers.classification_models import SoftmaxDeepLiftModel
 from .helpers.basic_models import BasicModel_ConvNet
@@ -111,6 +120,80 @@ class Test(BaseTest):
 
         self.softmax_classification(model, dl, input, baseline, torch.tensor(2))
 
+    def test_convnet_with_maxpool1d_reuses_forward_indices(self):
+        input = 100 * torch.randn(2, 1, 10, requires_grad=True)
+        baseline = 20 * torch.randn(2, 1, 10)
+
+        model = BasicModel_ConvNet_MaxPool1d()
+        # without recorded state, the rule recomputes the indices from the
+        # inputs of the pooling layers in the backward pass
+        with patch.dict(deep_lift.FORWARD_STATE, clear=True):
+            expected = DeepLift(model).attribute(input, baseline, target=2)
+        with patch.object(F, "max_pool1d", wraps=F.max_pool1d) as max_pool1d:
+            attributions, delta = DeepLift(model).attribute(
+                input, baseline, target=2, return_convergence_delta=True
+            )
+        # the two pooling layers run once at the baselines and once at the
+        # inputs, the indices are not recomputed in the backward pass
+        self.assertEqual(max_pool1d.call_count, 4)
+        assertTensorAlmostEqual(self, attributions, expected)
+        self.assertTrue(all(abs(delta.flatten()) < 0.003))
+
+    def test_maxpool_restored_after_failed_forward(self):
+        pool = nn.MaxPool1d(4)
+        model = nn.Sequential(pool)
+        input = torch.randn(1, 1, 2, requires_grad=True)
+        # the single forward pass prepares the pooling layer for recording its
+        # indices, and fails, since the kernel is larger than the input
+        with self.assertRaises(RuntimeError):
+            DeepLift(model).attribute(input, 0 * input, target=0, single_forward=True)
+        self.assertFalse(pool.return_indices)
+        self.assertFalse(hasattr(pool, "orig_return_indices"))
+
+    def test_single_forward(self):
+        num_in = 40
+        inputs = torch.arange(0.0, num_in * 3.0, requires_grad=True).reshape(3, num_in)
+        baselines = torch.range(1.0, num_in).unsqueeze(0)
+        self._assert_single_forward(
+            SoftmaxDeepLiftModel(num_in, 20, 10),
+            DeepLift,
+            inputs,
+            baselines,
+            torch.tensor([2, 1, 7]),
+        )
+        self._assert_single_forward(
+            BasicModel_ConvNet(),
+            DeepLift,
+            100 * torch.randn(2, 1, 10, 10, requires_grad=True),
+            20 * torch.randn(2, 1, 10, 10),
+            1,
+        )
+        self._assert_single_forward(
+            BasicModel_ConvNet_MaxPool1d(),
+            DeepLiftShap,
+            100 * torch.randn(2, 1, 10, requires_grad=True),
+            20 * torch.randn(3, 1, 10),
+            [2, 1],
+        )
+
+    def _assert_single_forward(self, model, attr_class, inputs, baselines, target):
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        expected, expected_delta = attr_class(model).attribute(
+            inputs, baselines, target=target, return_convergence_delta=True
+        )
+        num_forwards.clear()
+        attributions, delta = attr_class(model).attribute(
+            inputs,
+            baselines,
+            target=target,
+            return_convergence_delta=True,
+            single_forward=True,
+        )
+        self.assertEqual(len(num_forwards), 1)
+        assertTensorAlmostEqual(self, attributions, expected)
+        assertTensorAlmostEqual(self, delta, expected_delta)
+
     def softmax_classification(self, model, attr_method, input, baselines, target):
         # TODO add test cases for multiple different layers
         model.zero_grad()
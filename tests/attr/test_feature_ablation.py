@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
 import unittest
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 import torch
 from captum.attr._core.feature_ablation import FeatureAblation
@@ -13,6 +16,11 @@ from .helpers.basic_models import (
 from .helpers.utils import assertTensorAlmostEqual, BaseTest
 
 
+def _multi_input_forward(*args):
+    # a module-level forward function, which can be pickled for process pools
+    return BasicModel_MultiLayer_MultiInput()(*args)
+
+
 class Test(BaseTest):
     def test_simple_ablation(self):
         net = BasicModel_MultiLayer()
@@ -145,6 +153,197 @@ class Test(BaseTest):
             ablations_per_eval=(1, 2, 3),
         )
 
+    def test_multi_input_ablation_with_encoders(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        mask1 = torch.tensor([[1, 1, 1], [0, 1, 0]])
+        mask2 = torch.tensor([[0, 1, 2]])
+        mask3 = torch.tensor([[0, 1, 2], [0, 0, 0]])
+        encoded_rows = [0, 0, 0]
+
+        def make_encoder(j):
+            def encoder(input):
+                encoded_rows[j] += input.shape[0]
+                return 2 * input
+
+            return encoder
+
+        def fusion_func(enc1, enc2, enc3, scale):
+            return net(enc1, enc2, enc3, scale / 2)
+
+        ablation = FeatureAblation(
+            net,
+            input_encoders=[make_encoder(j) for j in range(3)],
+            fusion_func=fusion_func,
+        )
+        attributions = ablation.attribute(
+            (inp1, inp2, inp3),
+            target=0,
+            additional_forward_args=(1,),
+            feature_mask=(mask1, mask2, mask3),
+            ablations_per_eval=2,
+        )
+        expected = (
+            [[492.0, 492.0, 492.0], [200.0, 200.0, 200.0]],
+            [[80.0, 200.0, 120.0], [0.0, 400.0, 0.0]],
+            [[0.0, 400.0, 40.0], [60.0, 60.0, 60.0]],
+        )
+        for i in range(len(expected)):
+            assertTensorAlmostEqual(self, attributions[i], expected[i])
+        # each input is encoded once unablated and once per ablated feature
+        self.assertEqual(encoded_rows, [2 + 2 * 2, 2 + 2 * 3, 2 + 2 * 3])
+
+    def test_multi_input_ablation_with_executor(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        mask1 = torch.tensor([[1, 1, 1], [0, 1, 0]])
+        mask2 = torch.tensor([[0, 1, 2]])
+        mask3 = torch.tensor([[0, 1, 2], [0, 0, 0]])
+        expected = (
+            [[492.0, 492.0, 492.0], [200.0, 200.0, 200.0]],
+            [[80.0, 200.0, 120.0], [0.0, 400.0, 0.0]],
+            [[0.0, 400.0, 40.0], [60.0, 60.0, 60.0]],
+        )
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            self._ablation_test_assert(
+                net,
+                (inp1, inp2, inp3),
+                expected,
+                additional_input=(1,),
+                feature_mask=(mask1, mask2, mask3),
+                ablations_per_eval=(1, 2, 3),
+                executor=executor,
+            )
+
+    def test_multi_input_ablation_with_process_pool(self):
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        mask1 = torch.tensor([[1, 1, 1], [0, 1, 0]])
+        mask2 = torch.tensor([[0, 1, 2]])
+        mask3 = torch.tensor([[0, 1, 2], [0, 0, 0]])
+        expected = (
+            [[492.0, 492.0, 492.0], [200.0, 200.0, 200.0]],
+            [[80.0, 200.0, 120.0], [0.0, 400.0, 0.0]],
+            [[0.0, 400.0, 40.0], [60.0, 60.0, 60.0]],
+        )
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            attributions = FeatureAblation(_multi_input_forward).attribute(
+                (inp1, inp2, inp3),
+                target=0,
+                additional_forward_args=(1,),
+                feature_mask=(mask1, mask2, mask3),
+                executor=executor,
+                max_pending=4,
+            )
+        for i in range(len(expected)):
+            assertTensorAlmostEqual(self, attributions[i], expected[i])
+
+    def test_executor_pending_batches_bounded(self):
+        class LazyExecutor(Executor):
+            # runs each submitted evaluation when its result is requested,
+            # and records the largest number of unevaluated batches
+            def __init__(self):
+                self.num_pending = 0
+                self.max_pending = 0
+
+            def submit(self, fn, *args, **kwargs):
+                executor = self
+                executor.num_pending += 1
+                executor.max_pending = max(executor.max_pending, executor.num_pending)
+
+                class LazyFuture:
+                    def result(self):
+                        executor.num_pending -= 1
+                        return fn(*args, **kwargs)
+
+                return LazyFuture()
+
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        executor = LazyExecutor()
+        attributions = FeatureAblation(net).attribute(
+            inp, target=0, executor=executor, max_pending=2
+        )
+        assertTensorAlmostEqual(self, attributions, [80.0, 200.0, 120.0])
+        # the three ablated batches are never built at once
+        self.assertEqual(executor.max_pending, 2)
+
+    def test_ablation_iter_partial_results(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        ablation = FeatureAblation(net)
+        partial_attributions = list(
+            ablation.attribute_iter(inp, target=0, ablations_per_eval=2)
+        )
+        self.assertEqual(len(partial_attributions), 2)
+        assertTensorAlmostEqual(self, partial_attributions[0], [80.0, 200.0, 0.0])
+        assertTensorAlmostEqual(self, partial_attributions[1], [80.0, 200.0, 120.0])
+
+    def test_ablation_iter_resume_from_checkpoint(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        mask1 = torch.tensor([[1, 1, 1], [0, 1, 0]])
+        mask2 = torch.tensor([[0, 1, 2]])
+        mask3 = torch.tensor([[0, 1, 2], [0, 0, 0]])
+        num_calls = [0]
+
+        def forward_func(*args):
+            num_calls[0] += 1
+            return net(*args)
+
+        ablation = FeatureAblation(forward_func)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "ablation.pt")
+            kwargs = dict(
+                target=0,
+                additional_forward_args=(1,),
+                feature_mask=(mask1, mask2, mask3),
+                checkpoint_path=checkpoint_path,
+            )
+            # the first run is interrupted after 3 of the 8 ablated features
+            for num_batches, _ in enumerate(
+                ablation.attribute_iter((inp1, inp2, inp3), **kwargs), 1
+            ):
+                if num_batches == 3:
+                    break
+            num_calls[0] = 0
+            for attributions in ablation.attribute_iter((inp1, inp2, inp3), **kwargs):
+                pass
+        # the initial evaluation and the 5 remaining ablated features
+        self.assertEqual(num_calls[0], 1 + 5)
+        expected = (
+            [[492.0, 492.0, 492.0], [200.0, 200.0, 200.0]],
+            [[80.0, 200.0, 120.0], [0.0, 400.0, 0.0]],
+            [[0.0, 400.0, 40.0], [60.0, 60.0, 60.0]],
+        )
+        for i in range(len(expected)):
+            assertTensorAlmostEqual(self, attributions[i], expected[i])
+
+    def test_ablation_iter_resume_from_checkpoint_of_module(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        ablation = FeatureAblation(net)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "ablation.pt")
+            for _ in ablation.attribute_iter(
+                inp, target=0, checkpoint_path=checkpoint_path
+            ):
+                break
+            state = torch.load(checkpoint_path)
+            self.assertFalse(state["total_attrib"][0].requires_grad)
+            for attributions in ablation.attribute_iter(
+                inp, target=0, checkpoint_path=checkpoint_path
+            ):
+                pass
+        assertTensorAlmostEqual(self, attributions, [80.0, 200.0, 120.0])
+
     def test_simple_multi_input_conv(self):
         net = BasicModel_ConvNet_One_Conv()
         inp = torch.arange(16).view(1, 1, 4, 4).type(torch.FloatTensor)
@@ -257,6 +456,33 @@ class Test(BaseTest):
             lambda *inp: int(torch.sum(net(*inp)).item())
         )
 
+    def test_construct_ablated_input(self):
+        ablation = FeatureAblation(lambda inp: inp)
+        feature_tensor = torch.tensor([[[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]] * 2)
+        input_mask = torch.tensor([[0, 1, 1]])
+        baseline = torch.tensor([[[-1.0, -2.0, -3.0]]])
+        ablated, mask = ablation._construct_ablated_input(
+            feature_tensor, input_mask, baseline, 0, 2
+        )
+        self.assertEqual(mask.dtype, torch.bool)
+        self.assertEqual(mask.shape, (2, 1, 3))
+        assertTensorAlmostEqual(
+            self,
+            ablated,
+            [
+                [[-1.0, 2.0, 3.0], [-1.0, 5.0, 6.0]],
+                [[1.0, -2.0, -3.0], [4.0, -2.0, -3.0]],
+            ],
+        )
+        # the given feature tensor is not modified
+        assertTensorAlmostEqual(
+            self, feature_tensor, [[[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]] * 2
+        )
+        ablated, _ = ablation._construct_ablated_input(
+            feature_tensor[:1], input_mask, 0.5, 1, 2
+        )
+        assertTensorAlmostEqual(self, ablated, [[[1.0, 0.5, 0.5], [4.0, 0.5, 0.5]]])
+
     def _single_input_one_sample_batch_scalar_ablation_assert(self, func):
         inp = torch.tensor([[2.0, 10.0, 3.0]], requires_grad=True)
         mask = torch.tensor([[0, 0, 1]])
@@ -316,6 +542,7 @@ class Test(BaseTest):
         ablations_per_eval=(1,),
         baselines=None,
         target=0,
+        executor=None,
     ):
         for batch_size in ablations_per_eval:
             ablation = FeatureAblation(model)
@@ -326,6 +553,7 @@ class Test(BaseTest):
                 additional_forward_args=additional_input,
                 baselines=baselines,
                 ablations_per_eval=batch_size,
+                executor=executor,
             )
             if isinstance(expected_ablation, tuple):
                 for i in range(len(expected_ablation)):
@@ -2,14 +2,18 @@
 
 import torch
 
+from unittest.mock import patch
+
+from captum.attr._utils import gradient
 from captum.attr._utils.gradient import (
     compute_gradients,
+    compute_multi_target_gradients,
     compute_layer_gradients_and_eval,
     apply_gradient_requirements,
     undo_gradient_requirements,
 )
 
-from .helpers.utils import assertArraysAlmostEqual, BaseTest
+from .helpers.utils import assertArraysAlmostEqual, assertTensorAlmostEqual, BaseTest
 from .helpers.basic_models import (
     BasicModel,
     BasicModel6_MultiTensor,
@@ -123,3 +127,32 @@ class Test(BaseTest):
         )
         assertArraysAlmostEqual(grads.squeeze(0).tolist(), [0.0, 1.0], delta=0.01)
         assertArraysAlmostEqual(eval.squeeze(0).tolist(), [26.0, 28.0], delta=0.01)
+
+    def test_multi_target_gradients_batching_errors(self):
+        model = BasicModel_MultiLayer()
+        inp = torch.tensor([[3.0, 4.0, 0.0]], requires_grad=True)
+        grad = torch.autograd.grad
+
+        def failing_grad(message):
+            def grad_func(*args, **kwargs):
+                if kwargs.get("is_grads_batched"):
+                    raise RuntimeError(message)
+                return grad(*args, **kwargs)
+
+            return grad_func
+
+        # only errors of unsupported batching fall back to one product per
+        # target, other errors are raised
+        with patch.object(gradient, "_GRADS_BATCHED_SUPPORTED", True):
+            with patch.object(
+                torch.autograd,
+                "grad",
+                side_effect=failing_grad("Batching rule not implemented for op"),
+            ):
+                (grads,) = compute_multi_target_gradients(model, (inp,), [0, 1])
+            assertTensorAlmostEqual(self, grads, [[3.0] * 3] * 2)
+            with patch.object(
+                torch.autograd, "grad", side_effect=failing_grad("out of memory")
+            ):
+                with self.assertRaises(RuntimeError):
+                    compute_multi_target_gradients(model, (inp,), [0, 1])
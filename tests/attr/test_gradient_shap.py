@@ -6,8 +6,9 @@ import numpy as np
 from .helpers.utils import assertArraysAlmostEqual, assertTensorAlmostEqual, BaseTest
 from .helpers.classification_models import SoftmaxModel
 from .helpers.basic_models import BasicModel2, BasicLinearModel
-from captum.attr._core.gradient_shap import GradientShap
+from captum.attr._core.gradient_shap import GradientShap, InputBaselineXGradient
 from captum.attr._core.integrated_gradients import IntegratedGradients
+from captum.attr._utils.sampling import SobolSampler, StratifiedSampler
 
 
 class Test(BaseTest):
@@ -198,6 +199,39 @@ class Test(BaseTest):
         attributions_ig = ig.attribute(inputs, baselines=baselines)
         self._assert_shap_ig_comparision(attributions, attributions_ig)
 
+    def test_basic_relu_multi_input_low_discrepancy(self):
+        model = BasicModel2()
+
+        inputs = (torch.tensor([[3.0]]), torch.tensor([[1.0]]))
+        baselines = (torch.tensor([[0.0]]), torch.tensor([[0.0]]))
+
+        # the output is positive on the second half of the path, which contains
+        # exactly half of the 64 stratified points on the path
+        for sampler in (StratifiedSampler(seed=0), SobolSampler(seed=0)):
+            gs = GradientShap(model)
+            n_samples = 64
+            attributions, delta = gs.attribute(
+                inputs,
+                baselines=baselines,
+                n_samples=n_samples,
+                return_convergence_delta=True,
+                sampler=sampler,
+            )
+            _assert_attribution_delta(self, inputs, attributions, n_samples, delta)
+            assertTensorAlmostEqual(self, attributions[0], [[1.5]])
+            assertTensorAlmostEqual(self, attributions[1], [[-0.5]])
+
+    def test_default_coefficients_follow_numpy_seed(self):
+        inputs = (torch.tensor([[1.0], [2.0], [3.0]]),)
+        np.random.seed(1)
+        coefficient = InputBaselineXGradient(BasicModel2())._sample_coefficient(
+            inputs, None
+        )
+        np.random.seed(1)
+        assertArraysAlmostEqual(
+            coefficient.tolist(), np.random.uniform(0.0, 1.0, 3), delta=1e-6
+        )
+
     def _assert_shap_ig_comparision(self, attributions1, attributions2):
         for attribution1, attribution2 in zip(attributions1, attributions2):
             for attr_row1, attr_row2 in zip(
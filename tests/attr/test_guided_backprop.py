@@ -4,6 +4,7 @@ import unittest
 
 import torch
 from captum.attr._core.guided_backprop_deconvnet import GuidedBackprop
+from captum.attr._core.saliency import Saliency
 from captum.attr._core.neuron.neuron_guided_backprop_deconvnet import (
     NeuronGuidedBackprop,
 )
@@ -66,6 +67,25 @@ class Test(BaseTest):
         inp = 100.0 * torch.randn(1, 1, 4, 4)
         self._guided_backprop_matching_assert(net, net.relu2, inp)
 
+    def test_prepared_model_gb(self):
+        net = BasicModel_ConvNet_One_Conv()
+        inp = 1.0 * torch.arange(16).view(1, 1, 4, 4).type(torch.FloatTensor)
+        gbp = GuidedBackprop(net)
+        expected = gbp.attribute(inp, target=0)
+        expected_grad = Saliency(net).attribute(inp, target=0, abs=False)
+        with gbp.prepared_model():
+            num_hooks = len(net.relu1._backward_hooks)
+            self.assertGreater(num_hooks, 0)
+            for _ in range(2):
+                assertTensorAlmostEqual(self, gbp.attribute(inp, target=0), expected)
+                # hooks are reused across attribute calls
+                self.assertEqual(len(net.relu1._backward_hooks), num_hooks)
+            # the hooks are inactive outside of attribute
+            inp.requires_grad_()
+            (grad,) = torch.autograd.grad(net(inp)[:, 0].sum(), inp)
+            assertTensorAlmostEqual(self, grad, expected_grad)
+        self.assertEqual(len(net.relu1._backward_hooks), 0)
+
     def _guided_backprop_test_assert(
         self, model, test_input, expected, additional_input=None
     ):
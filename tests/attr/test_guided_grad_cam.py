@@ -4,6 +4,9 @@ import unittest
 
 import torch
 from captum.attr._core.guided_grad_cam import GuidedGradCam
+from captum.attr._core.guided_backprop_deconvnet import GuidedBackprop
+from captum.attr._core.layer.grad_cam import LayerGradCam
+from captum.attr._utils.attribution import LayerAttribution
 
 from .helpers.basic_models import BasicModel_ConvNet_One_Conv
 from .helpers.utils import assertTensorAlmostEqual, BaseTest
@@ -79,6 +82,30 @@ class Test(BaseTest):
             net, net.conv1, (inp, inp2), (None, None), interpolate_mode="triilinear"
         )
 
+    def test_single_forward_matches_separate_attributions(self):
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(32).view(2, 1, 4, 4).type(torch.FloatTensor)
+        num_forwards = [0]
+
+        def count_forward(module, input, output):
+            num_forwards[0] += 1
+
+        hook = net.register_forward_hook(count_forward)
+        attributions = GuidedGradCam(net, net.conv1).attribute(inp, target=0)
+        self.assertEqual(num_forwards[0], 1)
+        hook.remove()
+
+        # the ReLU after conv1 has a negative gradient, which is overridden
+        # only for the guided backprop gradients
+        grad_cam_attr = LayerGradCam(net, net.conv1).attribute(
+            inp, target=0, relu_attributions=True
+        )
+        guided_backprop_attr = GuidedBackprop(net).attribute(inp, target=0)
+        expected = guided_backprop_attr * LayerAttribution.interpolate(
+            grad_cam_attr, inp.shape[2:]
+        )
+        assertTensorAlmostEqual(self, attributions, expected.squeeze(), delta=0.01)
+
     def _guided_grad_cam_test_assert(
         self,
         model,
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import torch
+from captum.attr._core.hierarchical_feature_ablation import (
+    HierarchicalFeatureAblation,
+)
+
+from .helpers.basic_models import (
+    BasicModel_MultiLayer,
+    BasicModel_MultiLayer_MultiInput,
+)
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_sparse_ablation(self):
+        weights = torch.zeros(1, 64)
+        weights[0, 3] = 5.0
+        weights[0, 40] = -2.0
+        num_evals = [0]
+
+        def forward_func(inp):
+            num_evals[0] += inp.shape[0]
+            return (inp * weights).sum(dim=1)
+
+        inp = torch.ones(1, 64)
+        expected = weights.clone()
+        self._hierarchical_test_assert(
+            forward_func, inp, expected, target=None, ablations_per_eval=(1, 4)
+        )
+        num_evals[0] = 0
+        ablator = HierarchicalFeatureAblation(forward_func)
+        ablator.attribute(inp)
+        # the initial evaluation, the root group, its two halves and then
+        # two groups for each of the two important features on each of the
+        # remaining five levels, instead of one evaluation per feature
+        self.assertEqual(num_evals[0], 1 + 1 + 2 + 4 * 5)
+
+    def test_ablation_top_k(self):
+        weights = torch.zeros(1, 16)
+        weights[0, 3] = 5.0
+        weights[0, 12] = 1.0
+        expected = torch.zeros(1, 16)
+        expected[0, 3] = 5.0
+        # the less important feature is only found as part of its group
+        expected[0, 8:] = 1.0
+        self._hierarchical_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            torch.ones(1, 16),
+            expected,
+            target=None,
+            top_k=1,
+            ablations_per_eval=(1, 2),
+        )
+
+    def test_ablation_threshold(self):
+        weights = torch.tensor([[4.0, 0.5, 0.0, 0.5]])
+        # the group of the last two features is not split
+        self._hierarchical_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            torch.ones(1, 4),
+            [[4.0, 0.5, 0.5, 0.5]],
+            target=None,
+            threshold=1.0,
+        )
+
+    def test_multi_sample_ablation(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        self._hierarchical_test_assert(
+            net,
+            inp,
+            [[8.0, 35.0, 12.0], [80.0, 200.0, 120.0]],
+            ablations_per_eval=(1, 2, 3),
+            branching_factor=(2, 3),
+        )
+
+    def test_multi_input_ablation_with_mask(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        mask1 = torch.tensor([[1, 1, 1], [0, 1, 0]])
+        mask2 = torch.tensor([[0, 1, 2]])
+        mask3 = torch.tensor([[0, 1, 2], [0, 0, 0]])
+        # all important features are reached, hence the attributions equal
+        # the FeatureAblation attributions
+        expected = (
+            [[492.0, 492.0, 492.0], [200.0, 200.0, 200.0]],
+            [[80.0, 200.0, 120.0], [0.0, 400.0, 0.0]],
+            [[0.0, 400.0, 40.0], [60.0, 60.0, 60.0]],
+        )
+        self._hierarchical_test_assert(
+            net,
+            (inp1, inp2, inp3),
+            expected,
+            additional_input=(1,),
+            feature_mask=(mask1, mask2, mask3),
+            ablations_per_eval=(1, 2, 3),
+        )
+
+    def test_ablation_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        self._hierarchical_test_assert(
+            lambda inp: torch.sum(net(inp)).item(),
+            inp,
+            [[176.0, 470.0, 264.0]],
+            target=None,
+        )
+
+    def _hierarchical_test_assert(
+        self,
+        model,
+        test_input,
+        expected_ablation,
+        feature_mask=None,
+        additional_input=None,
+        ablations_per_eval=(1,),
+        baselines=None,
+        target=0,
+        top_k=None,
+        threshold=0.0,
+        branching_factor=(2,),
+    ):
+        for batch_size in ablations_per_eval:
+            for factor in branching_factor:
+                ablator = HierarchicalFeatureAblation(model)
+                attributions = ablator.attribute(
+                    test_input,
+                    target=target,
+                    feature_mask=feature_mask,
+                    additional_forward_args=additional_input,
+                    baselines=baselines,
+                    top_k=top_k,
+                    threshold=threshold,
+                    branching_factor=factor,
+                    ablations_per_eval=batch_size,
+                )
+                if isinstance(expected_ablation, tuple):
+                    for i in range(len(expected_ablation)):
+                        assertTensorAlmostEqual(
+                            self, attributions[i], expected_ablation[i]
+                        )
+                else:
+                    assertTensorAlmostEqual(self, attributions, expected_ablation)
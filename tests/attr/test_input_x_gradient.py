@@ -5,6 +5,7 @@ import torch
 from captum.attr._core.input_x_gradient import InputXGradient
 from captum.attr._core.noise_tunnel import NoiseTunnel
 
+from .helpers.basic_models import BasicModel_MultiLayer_MultiInput
 from .helpers.classification_models import SoftmaxModel
 from .helpers.utils import assertArraysAlmostEqual, BaseTest
 from .test_saliency import _get_basic_config, _get_multiargs_basic_config
@@ -42,6 +43,32 @@ class Test(BaseTest):
     def test_input_x_gradient_classification_vargrad(self):
         self._input_x_gradient_classification_assert(nt_type="vargrad")
 
+    def test_input_x_gradient_multi_targets(self):
+        model = BasicModel_MultiLayer_MultiInput()
+        inputs = (
+            torch.tensor([[1.5, 2.0, 3.3], [3.4, 1.2, 2.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.5, 2.2], [2.3, 1.2, 0.3]], requires_grad=True),
+            torch.tensor([[0.5, -2.0, 1.0], [0.1, 0.2, -0.3]], requires_grad=True),
+        )
+        additional_forward_args = (2,)
+        targets = torch.tensor([[0, 1], [1, 0]])
+        input_x_grad = InputXGradient(model)
+        attributions = input_x_grad.attribute(
+            inputs, additional_forward_args=additional_forward_args, targets=targets
+        )
+        for k in range(2):
+            expected = input_x_grad.attribute(
+                inputs,
+                target=targets[:, k],
+                additional_forward_args=additional_forward_args,
+            )
+            for attribution, expected_attr in zip(attributions, expected):
+                self.assertEqual(attribution.shape, (2, 2, 3))
+                assertArraysAlmostEqual(
+                    attribution[:, k].detach().numpy().flatten().tolist(),
+                    expected_attr.detach().numpy().flatten().tolist(),
+                )
+
     def _input_x_gradient_base_assert(
         self,
         model,
@@ -92,6 +92,158 @@ class Test(BaseTest):
     def test_batched_multi_input_vargrad(self):
         self._assert_batched_tensor_multi_input("vargrad", "riemann_trapezoid")
 
+    def test_adaptive_convergence_delta(self):
+        model = BasicModel4_MultiArgs()
+        inputs = (
+            torch.tensor([[1.5, 2.0, 34.3], [3.4, 1.2, 2.0]], requires_grad=True),
+            torch.tensor([[3.0, 3.5, 23.2], [2.3, 1.2, 0.3]], requires_grad=True),
+        )
+        additional_forward_args = (torch.arange(1.0, 7.0).reshape(2, 3), 1)
+        ig = IntegratedGradients(model)
+        attributions, delta = ig.attribute(
+            inputs,
+            baselines=(torch.zeros((1, 3)), 0.0),
+            additional_forward_args=additional_forward_args,
+            method="riemann_trapezoid",
+            n_steps=3,
+            internal_batch_size=3,
+            return_convergence_delta=True,
+            convergence_delta_tolerance=0.005,
+        )
+        self.assertTrue(all(abs(delta.numpy().flatten()) <= 0.005))
+        expected = ig.attribute(
+            inputs,
+            additional_forward_args=additional_forward_args,
+            method="gausslegendre",
+            n_steps=500,
+        )
+        for attribution, expected_attribution in zip(attributions, expected):
+            assertTensorAlmostEqual(self, attribution, expected_attribution, 0.05)
+        assertArraysAlmostEqual(
+            delta,
+            ig.compute_convergence_delta(
+                attributions,
+                (0.0, 0.0),
+                inputs,
+                additional_forward_args=additional_forward_args,
+            ),
+            0.0001,
+        )
+
+    def test_adaptive_refines_unconverged_examples_only(self):
+        num_evaluated = []
+
+        def forward_func(input):
+            num_evaluated.append(input.shape[0])
+            # linear for the first example and nonlinear for the second one
+            return torch.sum(input * torch.relu(input[:, :1] - 0.5), dim=1)
+
+        inputs = torch.tensor([[-1.0, 2.0], [1.0, 3.0]])
+        attributions, delta = IntegratedGradients(forward_func).attribute(
+            inputs,
+            method="riemann_trapezoid",
+            n_steps=5,
+            return_convergence_delta=True,
+            convergence_delta_tolerance=0.0001,
+            max_n_steps=33,
+        )
+        # 5 initial steps, including both endpoints, and 4 + 8 + 16 midpoints
+        # for the nonlinear example
+        self.assertEqual(sum(num_evaluated), 5 * 2 + 4 + 8 + 16)
+        self.assertEqual(list(delta.shape), [2])
+        assertTensorAlmostEqual(self, attributions[0], [0.0, 0.0])
+
+    def test_convergence_delta_reuses_endpoint_outputs(self):
+        model = BasicModel_MultiLayer()
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        inputs = torch.tensor([[1.5, 2.0, 1.3], [0.5, 0.1, 2.3]], requires_grad=True)
+        ig = IntegratedGradients(model)
+        attributions, delta = ig.attribute(
+            inputs,
+            target=0,
+            method="riemann_trapezoid",
+            n_steps=20,
+            internal_batch_size=7,
+            return_convergence_delta=True,
+        )
+        # endpoints are part of the trapezoid path, hence no additional forward
+        self.assertEqual(len(num_forwards), 6)
+        assertArraysAlmostEqual(
+            delta, ig.compute_convergence_delta(attributions, 0.0, inputs, target=0)
+        )
+
+    def test_multi_targets(self):
+        model = BasicModel_MultiLayer()
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        inputs = torch.tensor([[1.5, 2.0, 1.3], [0.5, 0.1, 2.3]], requires_grad=True)
+        targets = [0, torch.tensor([1, 0])]
+        ig = IntegratedGradients(model)
+        for method in ["riemann_trapezoid", "gausslegendre"]:
+            num_forwards.clear()
+            attributions, delta = ig.attribute(
+                inputs,
+                method=method,
+                n_steps=20,
+                internal_batch_size=7,
+                return_convergence_delta=True,
+                targets=targets,
+            )
+            # a single pass over the path for all targets, the endpoints
+            # are evaluated separately only if they are not part of the path
+            expected_forwards = 6 if method == "riemann_trapezoid" else 8
+            self.assertEqual(len(num_forwards), expected_forwards)
+            self.assertEqual(attributions.shape, (2, 2, 3))
+            self.assertEqual(delta.shape, (2, 2))
+            for k, target in enumerate(targets):
+                expected, expected_delta = ig.attribute(
+                    inputs,
+                    target=target,
+                    method=method,
+                    n_steps=20,
+                    return_convergence_delta=True,
+                )
+                assertArraysAlmostEqual(
+                    attributions[:, k].detach().numpy().flatten().tolist(),
+                    expected.detach().numpy().flatten().tolist(),
+                )
+                assertArraysAlmostEqual(delta[:, k], expected_delta)
+
+    def test_auto_internal_batch_size(self):
+        model = BasicModel_MultiLayer()
+        inputs = torch.tensor([[1.5, 2.0, 1.3], [0.5, 0.1, 2.3]], requires_grad=True)
+        ig = IntegratedGradients(model)
+        expected, expected_delta = ig.attribute(
+            inputs, target=0, n_steps=20, return_convergence_delta=True
+        )
+        for memory_budget_bytes in [1, 2 ** 13, 2 ** 30]:
+            attributions, delta = ig.attribute(
+                inputs,
+                target=0,
+                n_steps=20,
+                internal_batch_size="auto",
+                return_convergence_delta=True,
+                memory_budget_bytes=memory_budget_bytes,
+            )
+            assertTensorAlmostEqual(self, attributions, expected)
+            assertTensorAlmostEqual(self, delta, expected_delta)
+
+    def test_adaptive_unsupported_method(self):
+        with self.assertRaises(AssertionError):
+            IntegratedGradients(BasicModel()).attribute(
+                torch.tensor([1.0]), convergence_delta_tolerance=0.01
+            )
+
+    def test_adaptive_single_step(self):
+        with self.assertRaises(AssertionError):
+            IntegratedGradients(BasicModel()).attribute(
+                torch.tensor([1.0]),
+                method="riemann_trapezoid",
+                n_steps=1,
+                convergence_delta_tolerance=0.01,
+            )
+
     def _assert_multi_variable(self, type, approximation_method="gausslegendre"):
         model = BasicModel2()
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import torch
+from captum.attr._core.kernel_shap import KernelShap
+
+from .helpers.basic_models import (
+    BasicModel_MultiLayer,
+    BasicModel_MultiLayer_MultiInput,
+)
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_simple_kernel_shap_additive(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0], [2.0, 10.0, 3.0]])
+        # for an additive function the surrogate model gives the exact values
+        self._kernel_shap_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[20.0, -100.0, 90.0], [2.0, -20.0, 9.0]],
+            target=None,
+            ablations_per_eval=(1, 7, 51),
+        )
+
+    def test_kernel_shap_with_baselines(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        self._kernel_shap_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[19.0, -96.0, 81.0]],
+            target=None,
+            baselines=torch.tensor([[1.0, 2.0, 3.0]]),
+            ablations_per_eval=(1, 16),
+        )
+
+    def test_kernel_shap_single_feature(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        expected = (net(inp)[:, 0] - net(torch.zeros_like(inp))[:, 0]).unsqueeze(1)
+        self._kernel_shap_test_assert(
+            net,
+            inp,
+            expected.expand_as(inp),
+            feature_mask=torch.tensor([[0, 0, 0]]),
+        )
+
+    def test_kernel_shap_efficiency(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        # features 0 and 2 span multiple input tensors
+        feature_mask = (
+            torch.tensor([[0, 0, 1]]),
+            torch.tensor([[2, 3, 4]]),
+            torch.tensor([[0, 4, 2]]),
+        )
+        ks = KernelShap(net)
+        attributions = ks.attribute(
+            (inp1, inp2, inp3),
+            target=0,
+            additional_forward_args=(1,),
+            feature_mask=feature_mask,
+            n_samples=20,
+            ablations_per_eval=8,
+        )
+        # the attributions of each example sum up to the output difference
+        # between the inputs and the baselines
+        output_diff = (
+            net(inp1, inp2, inp3, 1)[:, 0]
+            - net(*(torch.zeros_like(inp) for inp in (inp1, inp2, inp3)), 1)[:, 0]
+        )
+        # each feature is counted once, independent of its number of locations
+        counts = torch.bincount(torch.cat([mask.flatten() for mask in feature_mask]))
+        total = sum(
+            (attribution / counts[mask].float()).sum(dim=1)
+            for attribution, mask in zip(attributions, feature_mask)
+        )
+        assertTensorAlmostEqual(self, total, output_diff, delta=0.05)
+        # locations of the same feature have the same attribution
+        assertTensorAlmostEqual(self, attributions[0][:, 0], attributions[0][:, 1])
+        assertTensorAlmostEqual(self, attributions[0][:, 0], attributions[2][:, 0])
+
+    def test_kernel_shap_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        # with these baselines, all relus are active for every coalition,
+        # hence the summed output is additive
+        self._kernel_shap_test_assert(
+            lambda inp: torch.sum(net(inp)).item(),
+            inp,
+            [[16.0, 320.0, 104.0]],
+            feature_mask=torch.tensor([[0, 1, 2]]),
+            baselines=10.0,
+            target=None,
+            delta=0.1,
+        )
+
+    def test_error_ablations_per_eval_limit_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        ks = KernelShap(lambda inp: torch.sum(net(inp)).item())
+        with self.assertRaises(AssertionError):
+            ks.attribute(inp, ablations_per_eval=2)
+
+    def _kernel_shap_test_assert(
+        self,
+        model,
+        test_input,
+        expected_attr,
+        feature_mask=None,
+        additional_input=None,
+        ablations_per_eval=(1,),
+        baselines=None,
+        target=0,
+        n_samples=50,
+        delta=0.05,
+    ):
+        for batch_size in ablations_per_eval:
+            ks = KernelShap(model)
+            attributions = ks.attribute(
+                test_input,
+                target=target,
+                feature_mask=feature_mask,
+                additional_forward_args=additional_input,
+                baselines=baselines,
+                ablations_per_eval=batch_size,
+                n_samples=n_samples,
+            )
+            assertTensorAlmostEqual(self, attributions, expected_attr, delta=delta)
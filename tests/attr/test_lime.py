@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+from unittest.mock import patch
+
+import torch
+from captum.attr._core.lime import Lime
+
+from .helpers.basic_models import (
+    BasicModel_MultiLayer,
+    BasicModel_MultiLayer_MultiInput,
+)
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_simple_lime_additive(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0], [2.0, 10.0, 3.0]])
+        # the surrogate model of an additive function is exact
+        self._lime_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[20.0, -100.0, 90.0], [2.0, -20.0, 9.0]],
+            target=None,
+            ablations_per_eval=(1, 7, 50),
+        )
+
+    def test_lime_additive_with_baselines_and_mask(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        self._lime_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[-77.0, -77.0, 81.0]],
+            target=None,
+            baselines=torch.tensor([[1.0, 2.0, 3.0]]),
+            feature_mask=torch.tensor([[0, 0, 1]]),
+            ablations_per_eval=(1, 16),
+        )
+
+    def test_lime_uses_initial_eval(self):
+        inp = torch.tensor([[2.0, 3.0]])
+        num_calls = [0]
+
+        def forward_func(inp):
+            num_calls[0] += 1
+            return inp.sum(dim=1)
+
+        lime = Lime(forward_func)
+        # the only sampled coalition drops all features, the evaluation of
+        # the original input adds the coalition keeping them
+        with patch.object(
+            lime,
+            "_sample_coalitions",
+            return_value=(torch.tensor([[False]]), torch.tensor([1.0])),
+        ):
+            attributions = lime.attribute(
+                inp, feature_mask=torch.tensor([[0, 0]]), n_samples=1
+            )
+        self.assertEqual(num_calls[0], 2)
+        assertTensorAlmostEqual(self, attributions, [[5.0, 5.0]])
+
+    def test_lime_multi_input(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 0.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 0.0, 50.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        # features 0 and 1 span multiple input tensors
+        feature_mask = (
+            torch.tensor([[0, 1, 2]]),
+            torch.tensor([[0, 1, 2]]),
+            torch.tensor([[0, 1, 2]]),
+        )
+        lime = Lime(net)
+        attributions = lime.attribute(
+            (inp1, inp2, inp3),
+            baselines=(5.0, 5.0, 5.0),
+            target=0,
+            additional_forward_args=(1,),
+            feature_mask=feature_mask,
+            n_samples=100,
+            ablations_per_eval=10,
+        )
+        # locations of the same feature have the same attribution
+        for attribution in attributions[1:]:
+            assertTensorAlmostEqual(self, attribution, attributions[0])
+        # with these baselines, all relus are active for every coalition,
+        # hence the model is additive
+        assertTensorAlmostEqual(
+            self,
+            attributions[0],
+            [[112.0, 340.0, 180.0], [28.0, 580.0, 72.0]],
+            delta=0.1,
+        )
+
+    def test_lime_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        self._lime_test_assert(
+            lambda inp: torch.sum(net(inp)).item(),
+            inp,
+            [[16.0, 320.0, 104.0]],
+            feature_mask=torch.tensor([[0, 1, 2]]),
+            baselines=10.0,
+            target=None,
+            delta=0.1,
+        )
+
+    def test_error_ablations_per_eval_limit_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        lime = Lime(lambda inp: torch.sum(net(inp)).item())
+        with self.assertRaises(AssertionError):
+            lime.attribute(inp, ablations_per_eval=2)
+
+    def _lime_test_assert(
+        self,
+        model,
+        test_input,
+        expected_attr,
+        feature_mask=None,
+        additional_input=None,
+        ablations_per_eval=(1,),
+        baselines=None,
+        target=0,
+        n_samples=50,
+        delta=0.05,
+    ):
+        for batch_size in ablations_per_eval:
+            lime = Lime(model)
+            attributions = lime.attribute(
+                test_input,
+                target=target,
+                feature_mask=feature_mask,
+                additional_forward_args=additional_input,
+                baselines=baselines,
+                ablations_per_eval=batch_size,
+                n_samples=n_samples,
+            )
+            assertTensorAlmostEqual(self, attributions, expected_attr, delta=delta)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import torch
+from captum.attr._core.noise_tunnel import NoiseTunnel
+from captum.attr._core.saliency import Saliency
+from captum.attr._utils.attribution import Attribution
+from captum.attr._utils.sampling import RandomSampler, StratifiedSampler
+
+from .helpers.basic_models import BasicModel_MultiLayer
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class RecordingAttribution(Attribution):
+    r"""
+    Attributes each input to twice its value and records all attributed
+    inputs.
+    """
+
+    def __init__(self):
+        Attribution.__init__(self, None)
+        self.recorded_inputs = []
+        self.recorded_kwargs = []
+
+    def attribute(self, inputs, **kwargs):
+        self.recorded_inputs.append(inputs)
+        self.recorded_kwargs.append(kwargs)
+        return tuple(2 * input for input in inputs)
+
+
+class Test(BaseTest):
+    def test_chunked_statistics(self):
+        inputs = (
+            torch.tensor([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]),
+            torch.tensor([[-1.0], [1.0]]),
+        )
+        for nt_type in ("smoothgrad", "smoothgrad_sq", "vargrad"):
+            for nt_samples_batch_size in (None, 1, 3, 7, 10):
+                recording = RecordingAttribution()
+                attributions = NoiseTunnel(recording).attribute(
+                    inputs,
+                    nt_type=nt_type,
+                    n_samples=7,
+                    stdevs=(1.0, 2.0),
+                    nt_samples_batch_size=nt_samples_batch_size,
+                )
+                for i, attribution in enumerate(attributions):
+                    # samples: dim -> (#examples, n_samples, ...)
+                    samples = torch.cat(
+                        [
+                            2 * chunk[i].reshape((2, -1) + chunk[i].shape[1:])
+                            for chunk in recording.recorded_inputs
+                        ],
+                        dim=1,
+                    )
+                    self.assertEqual(samples.shape[1], 7)
+                    if nt_type == "smoothgrad":
+                        expected = samples.mean(dim=1)
+                    elif nt_type == "smoothgrad_sq":
+                        expected = (samples ** 2).mean(dim=1)
+                    else:
+                        expected = samples.var(dim=1, unbiased=False)
+                    assertTensorAlmostEqual(
+                        self, attribution, expected.squeeze(), delta=0.001
+                    )
+
+    def test_adaptive_sample_count(self):
+        # the mean attribution of the first example is large compared to the
+        # noise, and the mean attribution of the second example is 0
+        inp = torch.tensor([[100.0, 100.0], [0.0, 0.0]])
+        recording = RecordingAttribution()
+        attributions = NoiseTunnel(recording).attribute(
+            inp,
+            n_samples=50,
+            stdevs=1.0,
+            target=[0, 1],
+            nt_samples_batch_size=5,
+            nt_rtol=0.05,
+        )
+        # the first example stops after the first round
+        self.assertEqual(len(recording.recorded_inputs), 10)
+        self.assertEqual(recording.recorded_inputs[0][0].shape[0], 10)
+        for inputs, kwargs in zip(
+            recording.recorded_inputs[1:], recording.recorded_kwargs[1:]
+        ):
+            self.assertEqual(inputs[0].shape[0], 5)
+            self.assertEqual(kwargs["target"], [1] * 5)
+        first_samples = 2 * recording.recorded_inputs[0][0][:5]
+        second_samples = torch.cat(
+            [2 * recording.recorded_inputs[0][0][5:]]
+            + [2 * inputs[0] for inputs in recording.recorded_inputs[1:]]
+        )
+        assertTensorAlmostEqual(self, attributions[0], first_samples.mean(dim=0))
+        assertTensorAlmostEqual(self, attributions[1], second_samples.mean(dim=0))
+
+    def test_stratified_baselines(self):
+        inp = torch.tensor([[1.0, 2.0], [3.0, 4.0]])
+        baselines = torch.tensor([[0.0, 0.0], [1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+        recording = RecordingAttribution()
+        attributions = NoiseTunnel(recording).attribute(
+            inp,
+            n_samples=4,
+            stdevs=0.0,
+            draw_baseline_from_distrib=True,
+            baselines=baselines,
+            nt_sampler=StratifiedSampler(seed=0),
+        )
+        assertTensorAlmostEqual(self, attributions, 2 * inp)
+        # each example is paired with each baseline exactly once
+        drawn = recording.recorded_kwargs[0]["baselines"][0]
+        self.assertEqual(drawn.shape, (8, 2))
+        for example_baselines in drawn.reshape(2, 4, 2):
+            assertTensorAlmostEqual(
+                self, example_baselines[:, 0].sort()[0], [0.0, 1.0, 2.0, 3.0]
+            )
+
+    def test_reused_noise_buffers(self):
+        inputs = (torch.tensor([[1.0, 2.0], [3.0, 4.0]]), torch.tensor([[5.0], [6.0]]))
+        expected = NoiseTunnel(RecordingAttribution()).attribute(
+            inputs,
+            nt_type="vargrad",
+            n_samples=5,
+            stdevs=(1.0, 0.5),
+            nt_samples_batch_size=2,
+            nt_sampler=RandomSampler(seed=0),
+        )
+        recording = RecordingAttribution()
+        nt = NoiseTunnel(recording)
+        for _ in range(2):
+            attributions = nt.attribute(
+                inputs,
+                nt_type="vargrad",
+                n_samples=5,
+                stdevs=(1.0, 0.5),
+                nt_samples_batch_size=2,
+                nt_sampler=RandomSampler(seed=0),
+                nt_reuse_buffers=True,
+            )
+            for attribution, expected_attribution in zip(attributions, expected):
+                assertTensorAlmostEqual(
+                    self, attribution, expected_attribution.squeeze()
+                )
+        # all rounds of both calls write into the same buffers
+        self.assertEqual(len(recording.recorded_inputs), 6)
+        for i in range(2):
+            data_ptrs = set(
+                recorded[i].data_ptr() for recorded in recording.recorded_inputs
+            )
+            self.assertEqual(data_ptrs, {nt._noise_buffers[i].data_ptr()})
+
+    def test_chunked_saliency_shapes(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        nt = NoiseTunnel(Saliency(net))
+        attributions = nt.attribute(
+            inp, n_samples=5, stdevs=0.1, target=[0, 1], nt_samples_batch_size=2
+        )
+        self.assertEqual(attributions.shape, inp.shape)
+        # the gradients do not depend on small noise for this input
+        assertTensorAlmostEqual(self, attributions, [[4.0, 4.0, 4.0]] * 2)
+
+    def test_invalid_nt_samples_batch_size(self):
+        net = BasicModel_MultiLayer()
+        nt = NoiseTunnel(Saliency(net))
+        with self.assertRaises(AssertionError):
+            nt.attribute(torch.ones(1, 3), target=0, nt_samples_batch_size=0)
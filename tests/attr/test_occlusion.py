@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import torch
+from captum.attr._core.feature_ablation import FeatureAblation
+from captum.attr._core.occlusion import Occlusion
+
+from .helpers.basic_models import (
+    BasicModel_ConvNet_One_Conv,
+    BasicModel_MultiLayer,
+    BasicModel_MultiLayer_MultiInput,
+)
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_simple_occlusion(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]], requires_grad=True)
+        self._occlusion_test_assert(
+            net,
+            inp,
+            [80.0, 200.0, 120.0],
+            sliding_window_shapes=((1,),),
+            ablations_per_eval=(1, 2, 3),
+        )
+
+    def test_simple_occlusion_with_overlap(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]], requires_grad=True)
+        self._occlusion_test_assert(
+            net,
+            inp,
+            [280.0, 300.0, 320.0],
+            sliding_window_shapes=(2,),
+            ablations_per_eval=(1, 2),
+        )
+
+    def test_multi_sample_occlusion_with_baselines(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]], requires_grad=True)
+        expected = FeatureAblation(net).attribute(
+            inp, baselines=torch.tensor([[1.0, 2.0, 3.0]]), target=0
+        )
+        self._occlusion_test_assert(
+            net,
+            inp,
+            expected,
+            sliding_window_shapes=(1,),
+            baselines=torch.tensor([[1.0, 2.0, 3.0]]),
+            ablations_per_eval=(1, 2, 3),
+        )
+
+    def test_multi_input_occlusion(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        # windows of shape (2,) with stride 2 do not overlap and are equivalent
+        # to grouping pairs of features in a feature mask
+        expected = FeatureAblation(net).attribute(
+            (inp1, inp2, inp3),
+            additional_forward_args=(1,),
+            feature_mask=(
+                torch.tensor([[0, 0, 1]]),
+                torch.tensor([[0, 1, 2]]),
+                torch.tensor([[0, 0, 1]]),
+            ),
+            target=0,
+        )
+        self._occlusion_test_assert(
+            net,
+            (inp1, inp2, inp3),
+            expected,
+            sliding_window_shapes=((2,), (1,), (2,)),
+            strides=(2, 1, 2),
+            additional_input=(1,),
+            ablations_per_eval=(1, 2, 3),
+        )
+
+    def test_simple_multi_input_conv(self):
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(16).view(1, 1, 4, 4).type(torch.FloatTensor)
+        inp2 = torch.ones((1, 1, 4, 4))
+        self._occlusion_test_assert(
+            net,
+            (inp, inp2),
+            (67 * torch.ones_like(inp), 13 * torch.ones_like(inp2)),
+            sliding_window_shapes=((1, 4, 4), (1, 4, 4)),
+            ablations_per_eval=(1, 2),
+        )
+
+    def test_strided_occlusion_with_gaps(self):
+        net = BasicModel_ConvNet_One_Conv()
+        inp = torch.arange(16).view(1, 1, 4, 4).type(torch.FloatTensor)
+        # the third row and column are not covered by any window
+        self._occlusion_test_assert(
+            net,
+            inp,
+            [
+                [
+                    [7.0, 7.0, 0.0, 4.0],
+                    [7.0, 7.0, 0.0, 4.0],
+                    [0.0, 0.0, 0.0, 0.0],
+                    [19.0, 19.0, 0.0, 0.0],
+                ]
+            ],
+            sliding_window_shapes=(1, 2, 2),
+            strides=(1, 3, 3),
+            ablations_per_eval=(1, 2, 4),
+        )
+
+    def test_occlusion_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]], requires_grad=True)
+        self._occlusion_test_assert(
+            lambda inp: torch.sum(net(inp)).item(),
+            inp,
+            [[642.0, 642.0, 264.0]],
+            sliding_window_shapes=(2,),
+            strides=2,
+            target=None,
+        )
+
+    def test_invalid_sliding_window_shape(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]], requires_grad=True)
+        occlusion = Occlusion(net)
+        with self.assertRaises(AssertionError):
+            occlusion.attribute(inp, sliding_window_shapes=(4,), target=0)
+        with self.assertRaises(AssertionError):
+            occlusion.attribute(inp, sliding_window_shapes=(1, 1), target=0)
+
+    def test_occlusion_iter(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        occlusion = Occlusion(net)
+        partial_attributions = list(
+            occlusion.attribute_iter(inp, sliding_window_shapes=(2,), target=0)
+        )
+        # the windows at positions 0 and 1 are occluded in separate batches
+        self.assertEqual(len(partial_attributions), 2)
+        assertTensorAlmostEqual(self, partial_attributions[0], [280.0, 280.0, 0.0])
+        assertTensorAlmostEqual(self, partial_attributions[1], [280.0, 300.0, 320.0])
+
+    def _occlusion_test_assert(
+        self,
+        model,
+        test_input,
+        expected_ablation,
+        sliding_window_shapes=None,
+        strides=None,
+        additional_input=None,
+        ablations_per_eval=(1,),
+        baselines=None,
+        target=0,
+    ):
+        for batch_size in ablations_per_eval:
+            occlusion = Occlusion(model)
+            attributions = occlusion.attribute(
+                test_input,
+                sliding_window_shapes=sliding_window_shapes,
+                target=target,
+                additional_forward_args=additional_input,
+                baselines=baselines,
+                ablations_per_eval=batch_size,
+                strides=strides,
+            )
+            if isinstance(expected_ablation, tuple):
+                for i in range(len(expected_ablation)):
+                    assertTensorAlmostEqual(self, attributions[i], expected_ablation[i])
+            else:
+                assertTensorAlmostEqual(self, attributions, expected_ablation)
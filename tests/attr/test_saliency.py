@@ -59,6 +59,26 @@ class Test(BaseTest):
     def test_saliency_classification_vargrad(self):
         self._saliency_classification_assert(nt_type="vargrad")
 
+    def test_saliency_multi_targets(self):
+        model = SoftmaxModel(5, 20, 10)
+        num_forwards = []
+        model.register_forward_hook(lambda *args: num_forwards.append(1))
+        input = torch.randn(3, 5, requires_grad=True)
+        targets = [torch.tensor([1, 2, 3]), 4, torch.tensor([9, 0, 9])]
+        saliency = Saliency(model)
+        attributions = saliency.attribute(input, targets=targets, abs=False)
+        self.assertEqual(len(num_forwards), 1)
+        self.assertEqual(attributions.shape, (3, 3, 5))
+        for k, target in enumerate(targets):
+            assertArraysAlmostEqual(
+                attributions[:, k].detach().numpy().flatten().tolist(),
+                saliency.attribute(input, target=target, abs=False)
+                .detach()
+                .numpy()
+                .flatten()
+                .tolist(),
+            )
+
     def _saliency_base_assert(
         self, model, inputs, expected, additional_forward_args=None, nt_type="vanilla"
     ):
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import torch
+from captum.attr._utils.sampling import (
+    RandomSampler,
+    StratifiedSampler,
+    SobolSampler,
+)
+
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_stratified_sampler_strata(self):
+        self._assert_stratified(StratifiedSampler(seed=0), 8)
+        self._assert_stratified(StratifiedSampler(), 5)
+
+    def test_sobol_sampler_strata(self):
+        # the first 2^m points of each dimension are stratified
+        self._assert_stratified(SobolSampler(seed=0), 8)
+        self._assert_stratified(SobolSampler(), 16)
+
+    def test_seeded_samplers(self):
+        for sampler_class in (RandomSampler, StratifiedSampler, SobolSampler):
+            noise1 = sampler_class(seed=3).normal(4, (2, 3))
+            noise2 = sampler_class(seed=3).normal(4, (2, 3))
+            self.assertEqual(noise1.shape, (4, 2, 3))
+            assertTensorAlmostEqual(self, noise1, noise2, delta=0.0)
+            indices = sampler_class(seed=3).randint(5, 10, (2,))
+            self.assertEqual(indices.shape, (10, 2))
+            self.assertTrue(((indices >= 0) & (indices < 5)).all())
+
+    def test_normal_moments(self):
+        for sampler in (StratifiedSampler(seed=0), SobolSampler(seed=0)):
+            noise = sampler.normal(1024, (3,), dtype=torch.float64)
+            assertTensorAlmostEqual(self, noise.mean(dim=0), [0.0] * 3, delta=0.01)
+            assertTensorAlmostEqual(self, noise.std(dim=0), [1.0] * 3, delta=0.05)
+
+    def _assert_stratified(self, sampler, n):
+        uniform = sampler.uniform(n, (3, 2))
+        self.assertEqual(uniform.shape, (n, 3, 2))
+        strata = (uniform * n).long().sort(dim=0)[0]
+        expected = torch.arange(n).reshape(n, 1, 1).expand(n, 3, 2)
+        self.assertTrue((strata == expected).all())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import itertools
+
+import torch
+from captum.attr._core.shapley_value import ShapleyValueSampling
+
+from .helpers.basic_models import (
+    BasicModel_MultiLayer,
+    BasicModel_MultiLayer_MultiInput,
+)
+from .helpers.utils import assertTensorAlmostEqual, BaseTest
+
+
+class Test(BaseTest):
+    def test_simple_shapley_sampling_additive(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0], [2.0, 10.0, 3.0]])
+        # for an additive function each permutation gives the exact values
+        self._shapley_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[20.0, -100.0, 90.0], [2.0, -20.0, 9.0]],
+            target=None,
+            n_samples=3,
+            ablations_per_eval=(1, 2, 3),
+        )
+
+    def test_simple_shapley_sampling(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[20.0, 50.0, 30.0], [2.0, 10.0, 3.0]])
+        expected = _exact_shapley_values(
+            lambda inp: net(inp)[:, 0], inp, torch.tensor([[0, 1, 2]])
+        )
+        self._shapley_test_assert(
+            net,
+            inp,
+            expected,
+            n_samples=200,
+            ablations_per_eval=(1, 2),
+            delta=2.0,
+        )
+
+    def test_shapley_sampling_efficiency(self):
+        net = BasicModel_MultiLayer_MultiInput()
+        inp1 = torch.tensor([[23.0, 100.0, 0.0], [20.0, 50.0, 30.0]])
+        inp2 = torch.tensor([[20.0, 50.0, 30.0], [0.0, 100.0, 0.0]])
+        inp3 = torch.tensor([[0.0, 100.0, 10.0], [2.0, 10.0, 3.0]])
+        # features 0 and 2 span multiple input tensors
+        feature_mask = (
+            torch.tensor([[0, 0, 1]]),
+            torch.tensor([[2, 3, 4]]),
+            torch.tensor([[0, 4, 2]]),
+        )
+        svs = ShapleyValueSampling(net)
+        attributions = svs.attribute(
+            (inp1, inp2, inp3),
+            target=0,
+            additional_forward_args=(1,),
+            feature_mask=feature_mask,
+            n_samples=5,
+            ablations_per_eval=2,
+        )
+        # the attributions of each example sum up to the output difference
+        # between the inputs and the baselines for every permutation
+        output_diff = (
+            net(inp1, inp2, inp3, 1)[:, 0]
+            - net(*(torch.zeros_like(inp) for inp in (inp1, inp2, inp3)), 1)[:, 0]
+        )
+        # each feature is counted once, independent of its number of locations
+        counts = torch.bincount(torch.cat([mask.flatten() for mask in feature_mask]))
+        total = sum(
+            (attribution / counts[mask].float()).sum(dim=1)
+            for attribution, mask in zip(attributions, feature_mask)
+        )
+        assertTensorAlmostEqual(self, total, output_diff, delta=0.01)
+        # locations of the same feature have the same attribution
+        assertTensorAlmostEqual(self, attributions[0][:, 0], attributions[0][:, 1])
+        assertTensorAlmostEqual(self, attributions[0][:, 0], attributions[2][:, 0])
+
+    def test_shapley_sampling_with_baselines(self):
+        weights = torch.tensor([[1.0, -2.0, 3.0]])
+        inp = torch.tensor([[20.0, 50.0, 30.0]])
+        self._shapley_test_assert(
+            lambda inp: (inp * weights).sum(dim=1),
+            inp,
+            [[19.0, -96.0, 81.0]],
+            target=None,
+            baselines=torch.tensor([[1.0, 2.0, 3.0]]),
+            ablations_per_eval=(1, 2),
+        )
+
+    def test_shapley_sampling_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        mask = torch.tensor([[0, 0, 1]])
+        expected = _exact_shapley_values(
+            lambda inp: net(inp).sum(dim=(0, 1), keepdim=True).squeeze(0),
+            inp,
+            mask,
+        )
+        self._shapley_test_assert(
+            lambda inp: torch.sum(net(inp)).item(),
+            inp,
+            expected,
+            feature_mask=mask,
+            target=None,
+            n_samples=100,
+            delta=5.0,
+        )
+
+    def test_error_ablations_per_eval_limit_batch_scalar(self):
+        net = BasicModel_MultiLayer()
+        inp = torch.tensor([[2.0, 10.0, 3.0], [20.0, 50.0, 30.0]])
+        svs = ShapleyValueSampling(lambda inp: torch.sum(net(inp)).item())
+        with self.assertRaises(AssertionError):
+            svs.attribute(inp, ablations_per_eval=2)
+
+    def _shapley_test_assert(
+        self,
+        model,
+        test_input,
+        expected_attr,
+        feature_mask=None,
+        additional_input=None,
+        ablations_per_eval=(1,),
+        baselines=None,
+        target=0,
+        n_samples=25,
+        delta=0.0001,
+    ):
+        for batch_size in ablations_per_eval:
+            svs = ShapleyValueSampling(model)
+            attributions = svs.attribute(
+                test_input,
+                target=target,
+                feature_mask=feature_mask,
+                additional_forward_args=additional_input,
+                baselines=baselines,
+                ablations_per_eval=batch_size,
+                n_samples=n_samples,
+            )
+            assertTensorAlmostEqual(self, attributions, expected_attr, delta=delta)
+
+
+def _exact_shapley_values(func, inp, feature_mask):
+    # enumerates all permutations of the features of a single input tensor
+    # with zero baselines
+    num_features = feature_mask.max().item() + 1
+    total = 0.0
+    permutations = list(itertools.permutations(range(num_features)))
+    for permutation in permutations:
+        added = torch.zeros_like(feature_mask, dtype=torch.bool)
+        prev_eval = func(torch.zeros_like(inp))
+        for feature in permutation:
+            added = added | (feature_mask == feature)
+            curr_eval = func(torch.where(added, inp, torch.zeros_like(inp)))
+            total = total + (curr_eval - prev_eval).unsqueeze(1) * (
+                feature_mask == feature
+            )
+            prev_eval = curr_eval
+    return total / len(permutations)
@@ -8,8 +8,16 @@ from captum.attr._utils.batching import (
     _sort_key_list,
     _batched_operator,
     _batched_generator,
+    _auto_internal_batch_size,
+    _batched_path_generator,
+    _call_with_batch_size_backoff,
+    _scaled_path_inputs,
+    _step_ranges,
 )
 
+from captum.attr._utils.gradient import compute_gradients
+
+from .helpers.basic_models import BasicModel_MultiLayer
 from .helpers.utils import BaseTest, assertTensorAlmostEqual
 
 
@@ -121,3 +129,125 @@ class Test(BaseTest):
         assertTensorAlmostEqual(
             self, batched_result[1], [[0, 2, 4], [1, 1, 1], [2, 2, 2]]
         )
+
+    def test_batched_path_generator(self):
+        inp1 = torch.tensor([[0.0, 1.0, 2.0], [3.0, 4.0, 5.0], [6.0, 7.0, 8.0]])
+        inp2 = torch.tensor([[6.0, 7.0], [0.0, 1.0], [3.0, 4.0]])
+        base1 = torch.tensor([[1.0, 1.0, 1.0]])
+        add = torch.tensor([[0, 1], [2, 3], [4, 5]])
+        alphas = [0.0, 0.5, 1.0]
+        expected1 = torch.cat([base1 + alpha * (inp1 - base1) for alpha in alphas])
+        expected2 = torch.cat([alpha * inp2 for alpha in alphas])
+        chunks = list(
+            _batched_path_generator(
+                (inp1, inp2), (base1, 0.0), alphas, (add, 5), [0, 1, 2], 4
+            )
+        )
+        self.assertEqual(len(chunks), 3)
+        scaled1 = torch.cat([chunk[0][0] for chunk in chunks])
+        scaled2 = torch.cat([chunk[0][1] for chunk in chunks])
+        assertTensorAlmostEqual(self, scaled1, expected1)
+        assertTensorAlmostEqual(self, scaled2, expected2)
+        self.assertTrue(all(chunk[0][0].requires_grad for chunk in chunks))
+        assertTensorAlmostEqual(
+            self, torch.cat([chunk[1][0] for chunk in chunks]), torch.cat([add] * 3)
+        )
+        self.assertEqual(chunks[0][1][1], 5)
+        self.assertEqual(sum([chunk[2] for chunk in chunks], []), [0, 1, 2] * 3)
+        assertTensorAlmostEqual(
+            self,
+            torch.cat([chunk[3] for chunk in chunks]),
+            [0, 0, 0, 1, 1, 1, 2, 2, 2],
+        )
+        assertTensorAlmostEqual(
+            self,
+            torch.cat([chunk[4] for chunk in chunks]),
+            [0, 1, 2, 0, 1, 2, 0, 1, 2],
+        )
+
+    def test_batched_path_generator_whole_steps(self):
+        inp = torch.tensor([[0.0, 1.0], [3.0, 4.0]])
+        base = torch.tensor([[1.0, 1.0], [2.0, 0.0]])
+        alphas = torch.tensor([0.0, 0.25, 0.5, 1.0])
+        expected = torch.cat([base + alpha * (inp - base) for alpha in alphas])
+        for batch_size in [3, 4, None]:
+            chunks = list(
+                _batched_path_generator((inp,), (base,), alphas, None, 0, batch_size)
+            )
+            assertTensorAlmostEqual(
+                self, torch.cat([chunk[0][0] for chunk in chunks]), expected
+            )
+            self.assertTrue(all(chunk[0][0].requires_grad for chunk in chunks))
+
+    def test_batched_path_generator_float64_alphas(self):
+        inp = torch.tensor([[0.0, 1.0], [3.0, 4.0]], dtype=torch.float64)
+        alphas = [1.0 / 3.0, 2.0 / 3.0]
+        expected = torch.cat([alpha * inp for alpha in alphas])
+        for batch_size in [3, None]:
+            chunks = list(
+                _batched_path_generator((inp,), (0.0,), alphas, None, 0, batch_size)
+            )
+            scaled = torch.cat([chunk[0][0] for chunk in chunks])
+            self.assertEqual(scaled.dtype, torch.float64)
+            self.assertTrue(torch.equal(scaled, expected))
+
+    def test_scaled_path_inputs(self):
+        inp1 = torch.tensor([[[0.0, 1.0], [2.0, 3.0]], [[4.0, 5.0], [6.0, 7.0]]])
+        inp2 = torch.tensor([[1.0, -1.0], [2.0, 0.0]])
+        base1 = torch.tensor([[[1.0, 1.0], [1.0, 1.0]]])
+        alphas = torch.tensor([0.1, 0.6, 1.0])
+        scaled1, scaled2 = _scaled_path_inputs((inp1, inp2), (base1, 0.5), alphas)
+        assertTensorAlmostEqual(
+            self,
+            scaled1,
+            torch.cat([base1 + alpha * (inp1 - base1) for alpha in alphas]),
+        )
+        assertTensorAlmostEqual(
+            self, scaled2, torch.cat([0.5 + alpha * (inp2 - 0.5) for alpha in alphas])
+        )
+
+    def test_step_ranges(self):
+        self.assertEqual(
+            _step_ranges(torch.tensor([1, 1, 2, 2, 2, 3])), [(0, 2), (2, 5), (5, 6)]
+        )
+
+    def test_auto_internal_batch_size(self):
+        model = BasicModel_MultiLayer()
+        inputs = torch.randn(3, 3)
+        alphas = torch.linspace(0, 1, 50)
+
+        def _gradients(scaled_inputs, additional_args, target_ind, *ids):
+            return compute_gradients(model, scaled_inputs, target_ind)
+
+        batch_sizes = [
+            _auto_internal_batch_size(
+                _gradients, (inputs,), (0.0,), alphas, None, 0, memory_budget_bytes
+            )
+            for memory_budget_bytes in [1, 2 ** 10, 2 ** 12, 2 ** 30]
+        ]
+        self.assertEqual(batch_sizes[0], 1)
+        self.assertEqual(batch_sizes[-1], 150)
+        self.assertTrue(1 < batch_sizes[1] < batch_sizes[2] < 150)
+        # batch sizes of at least #examples are rounded down to whole steps
+        self.assertEqual(batch_sizes[2] % 3, 0)
+
+    def test_call_with_batch_size_backoff(self):
+        batch_sizes = []
+
+        def _attribute(batch_size):
+            batch_sizes.append(batch_size)
+            if batch_size > 3:
+                raise RuntimeError("CUDA out of memory. Tried to allocate 2 GiB")
+            return batch_size
+
+        with self.assertWarns(UserWarning):
+            self.assertEqual(_call_with_batch_size_backoff(_attribute, 16), 2)
+        self.assertEqual(batch_sizes, [16, 8, 4, 2])
+        with self.assertRaises(RuntimeError):
+            _call_with_batch_size_backoff(_attribute, 16, backoff=False)
+
+        def _fail(batch_size):
+            raise RuntimeError("size mismatch")
+
+        with self.assertRaises(RuntimeError):
+            _call_with_batch_size_backoff(_fail, 16)